@@ -0,0 +1,376 @@
+##############################################################################
+## File:  aiosedna.py
+##
+## Apache License 2.0
+##
+## asyncio front-end of the Sedna Python driver (Python 3.5 or later).
+##############################################################################
+
+""" Access to the Sedna XML database from asyncio coroutines.
+
+Every session runs on its own SednaConnectionThread. Calls are handed to
+that thread and their results are passed back to the event loop with
+loop.call_soon_threadsafe, so coroutines never block on the server.
+
+This exports:
+
+connect - open an AsyncSednaConnection.
+
+AsyncSednaConnection - one session used from coroutines; calls run one at
+a time in the order they were made.
+
+AsyncSednaPool - pool of AsyncSednaConnection sessions.
+"""
+
+import asyncio
+import threading
+import sedna
+
+def _wrap(future, loop):
+	"""asyncio future completed on loop when the SednaFuture is. Cancelling
+		it cancels the call unless the call already started."""
+	result = loop.create_future()
+	def copy(done):
+		if result.cancelled():
+			return
+		if done.cancelled():
+			result.cancel()
+			return
+		ex = done.exception()
+		if ex != None:
+			result.set_exception(ex)
+		else:
+			result.set_result(done.result())
+	def transfer(done):
+		# runs on the session thread
+		try:
+			loop.call_soon_threadsafe(copy, done)
+		except RuntimeError:
+			pass # the loop was closed, nobody waits any more
+	future.addDoneCallback(transfer)
+	result.add_done_callback(lambda result: result.cancelled() and future.cancel())
+	return result
+
+def _ignoreResult(future):
+	# keeps asyncio from reporting exceptions nobody asked for
+	if not future.cancelled():
+		future.exception()
+
+_end = object()
+
+class _AsyncResults:
+	"""Asynchronous iterator over the result of a query, see AsyncSednaConnection.results."""
+
+	def __init__(self, conn, query, maxItems, kwargs):
+		self.__conn = conn
+		self.__query = query
+		self.__kwargs = kwargs
+		self.__credits = threading.Semaphore(maxItems) # items the session thread may send ahead
+		self.__stop = threading.Event()
+		self.__items = None # asyncio.Queue, created when the iteration starts
+		self.__future = None
+		self.__finished = False
+
+	def __aiter__(self):
+		return self
+
+	async def __anext__(self):
+		if self.__finished:
+			raise StopAsyncIteration
+		if self.__items == None:
+			self.__items = asyncio.Queue()
+			self.__future = await self.__conn._submit(self.__fetch, (asyncio.get_event_loop(),), {})
+			self.__future.add_done_callback(_ignoreResult)
+		item = await self.__items.get()
+		self.__credits.release()
+		if item is _end:
+			self.__finished = True
+			raise StopAsyncIteration
+		if isinstance(item, Exception):
+			self.__finished = True
+			raise item
+		return item
+
+	async def aclose(self):
+		"""Stop fetching the rest of the result."""
+		self.__finished = True
+		self.__stop.set()
+		if self.__future != None:
+			self.__future.cancel()
+
+	def __del__(self):
+		self.__stop.set()
+
+	def __fetch(self, conn, loop):
+		def offer(item):
+			while not self.__stop.is_set():
+				if self.__credits.acquire(True, 0.1):
+					loop.call_soon_threadsafe(self.__items.put_nowait, item)
+					return True
+			return False
+		try:
+			for item in conn.execute(self.__query, **self.__kwargs).resultSequence():
+				if not offer(item):
+					return
+		except Exception as ex:
+			offer(ex)
+			return
+		offer(_end)
+
+class _AsyncTransaction:
+	"""Asynchronous context manager running SednaConnection.transaction on the session thread."""
+
+	def __init__(self, conn, readonly):
+		self.__conn = conn
+		self.__readonly = readonly
+		self.__manager = None
+
+	async def __aenter__(self):
+		def enter(conn):
+			self.__manager = conn.transaction(self.__readonly)
+			self.__manager.__enter__()
+		await self.__conn.submit(enter)
+		return self.__conn
+
+	async def __aexit__(self, excType, ex, tb):
+		# Shielded, so that a cancelled task still ends its transaction.
+		return await asyncio.shield(self.__conn.submit(lambda conn: self.__manager.__exit__(excType, ex, tb)))
+
+class AsyncSednaConnection:
+
+	def __init__(self,host,db,login="SYSTEM",passwd="MANAGER",maxPending=16):
+		"""Initializes new AsyncSednaConnection and starts connecting in the
+			background. Use connect() to wait until the session is open.
+
+			host, db, login, passwd: passed to SednaConnection
+			maxPending: number of calls handed to the session thread at once;
+			            further calls wait without blocking the event loop"""
+		# The thread's own queue is unbounded, as waiting for room in it
+		# would block the event loop; the semaphore limits the calls instead.
+		self.thread = sedna.SednaConnectionThread(host, db, login, passwd, 0)
+		self.__pending = asyncio.Semaphore(maxPending)
+
+	async def connected(self):
+		"""Wait until the session is open. Raises SednaException if it could not be opened."""
+		await _wrap(self.thread.connected, asyncio.get_event_loop())
+		return self
+
+	async def _submit(self, fn, args, kwargs):
+		"""asyncio future of fn(connection, *args, **kwargs) called on the session thread."""
+		await self.__pending.acquire()
+		try:
+			future = self.thread.submit(fn, *args, **kwargs)
+		except:
+			self.__pending.release()
+			raise
+		result = _wrap(future, asyncio.get_event_loop())
+		result.add_done_callback(lambda result: self.__pending.release())
+		return result
+
+	async def submit(self, fn, *args, **kwargs):
+		"""Call fn(connection, *args, **kwargs) on the session thread and return its result."""
+		return await (await self._submit(fn, args, kwargs))
+
+	async def execute(self, query, **kwargs):
+		"""Execute query and return the list of its items.
+
+			query, kwargs: as for SednaConnection.execute"""
+		return await self.submit(lambda conn: list(conn.execute(query, **kwargs).resultSequence()))
+
+	async def update(self, query, **kwargs):
+		"""Run SednaConnection.update on the session thread."""
+		await self.submit(lambda conn: conn.update(query, **kwargs))
+		return self
+
+	async def loadDocument(self, data, doc, collection=None, chunkSize=1048576):
+		"""Run SednaConnection.loadDocument on the session thread."""
+		await self.submit(lambda conn: conn.loadDocument(data, doc, collection, chunkSize))
+		return self
+
+	def results(self, query, maxItems=64, **kwargs):
+		"""Asynchronous iterator over the items of query while they are fetched:
+
+			async for item in conn.results(query):
+			    ...
+
+			maxItems: number of items fetched ahead; fetching pauses when the
+			          consumer falls behind
+
+			Call aclose() on the iterator to stop fetching early."""
+		return _AsyncResults(self, query, maxItems, kwargs)
+
+	def transaction(self, readonly=False):
+		"""Asynchronous context manager running the block in a transaction,
+			see SednaConnection.transaction:
+
+			async with conn.transaction():
+			    await conn.update(...)"""
+		return _AsyncTransaction(self, readonly)
+
+	async def close(self):
+		"""Close the session once the pending calls are done."""
+		await self.__pending.acquire()
+		try:
+			await _wrap(self.thread.close(0), asyncio.get_event_loop())
+		finally:
+			self.__pending.release()
+
+async def connect(host,db,login="SYSTEM",passwd="MANAGER",maxPending=16):
+	"""Open an AsyncSednaConnection, see its constructor."""
+	return await AsyncSednaConnection(host, db, login, passwd, maxPending).connected()
+
+def _isIdle(conn):
+	return conn.status() == 'ok' and conn.transactionStatus() == 'none'
+
+def _reset(conn):
+	if conn.status() != 'ok':
+		return False
+	conn.reset()
+	return True
+
+class _PoolConnection:
+	"""Asynchronous context manager checking out a session, see AsyncSednaPool.connection."""
+
+	def __init__(self, pool, timeout, readonly=None):
+		self.__pool = pool
+		self.__timeout = timeout
+		self.__readonly = readonly # None for no transaction
+		self.__conn = None
+		self.__transaction = None
+
+	async def __aenter__(self):
+		self.__conn = await self.__pool.getConnection(self.__timeout)
+		if self.__readonly != None:
+			self.__transaction = self.__conn.transaction(self.__readonly)
+			try:
+				await self.__transaction.__aenter__()
+			except:
+				await self.__pool.putConnection(self.__conn)
+				raise
+		return self.__conn
+
+	async def __aexit__(self, excType, ex, tb):
+		try:
+			if self.__transaction != None:
+				return await self.__transaction.__aexit__(excType, ex, tb)
+		finally:
+			await self.__pool.putConnection(self.__conn)
+
+class AsyncSednaPool:
+
+	def __init__(self,host,db,login="SYSTEM",passwd="MANAGER",maxSize=10,timeout=None,maxPending=16):
+		"""Initializes new AsyncSednaPool. Sessions are opened when they are
+			first needed. Create it while the event loop is running.
+
+			host, db, login, passwd: passed to SednaConnection
+			maxSize: maximum number of sessions (idle and checked out)
+			timeout: default number of seconds getConnection waits for a free
+			         session (None waits forever)
+			maxPending: passed to AsyncSednaConnection"""
+		if maxSize < 1:
+			raise sedna.SednaException("invalid pool size: max %d" % maxSize)
+		self.host = host
+		self.db = db
+		self.login = login
+		self.passwd = passwd
+		self.maxSize = maxSize
+		self.timeout = timeout
+		self.maxPending = maxPending
+		self.__slots = asyncio.Semaphore(maxSize)
+		self.__idle = [] # most recently used last
+		self.__size = 0
+		self.__closed = False
+
+	def size(self):
+		"""Number of sessions owned by the pool, including checked out ones."""
+		return self.__size
+
+	def idle(self):
+		"""Number of sessions waiting in the pool."""
+		return len(self.__idle)
+
+	async def getConnection(self, timeout=None):
+		"""Check out a session. Idle sessions are validated before being
+			handed out; broken ones are replaced transparently.
+
+			timeout: seconds to wait for a free session (defaults to the pool timeout)
+
+			Raises SednaException if no session became available in time."""
+		if timeout == None:
+			timeout = self.timeout
+		if self.__closed:
+			raise sedna.SednaException("pool is closed")
+		try:
+			await asyncio.wait_for(self.__slots.acquire(), timeout)
+		except asyncio.TimeoutError:
+			raise sedna.SednaException("timed out waiting for a connection")
+		try:
+			while self.__idle:
+				conn = self.__idle.pop()
+				try:
+					if await conn.submit(_isIdle):
+						return conn
+				except sedna.SednaException:
+					pass
+				self.__size -= 1
+				await self.__closeQuietly(conn)
+			self.__size += 1
+			try:
+				return await connect(self.host, self.db, self.login, self.passwd, self.maxPending)
+			except:
+				self.__size -= 1
+				raise
+		except:
+			self.__slots.release()
+			raise
+
+	async def putConnection(self, conn, discard=False):
+		"""Return a session to the pool. An open transaction is rolled back,
+			loaded modules and temporary documents are reset.
+
+			discard: close the session instead of keeping it"""
+		try:
+			if not discard:
+				try:
+					discard = not await conn.submit(_reset)
+				except sedna.SednaException:
+					discard = True
+			if discard or self.__closed:
+				self.__size -= 1
+				await self.__closeQuietly(conn)
+			else:
+				self.__idle.append(conn)
+		finally:
+			self.__slots.release()
+
+	def connection(self, timeout=None):
+		"""Asynchronous context manager checking out a session for the duration of the block."""
+		return _PoolConnection(self, timeout)
+
+	def transaction(self, timeout=None, readonly=False):
+		"""Asynchronous context manager checking out a session and running
+			the block in a transaction, committed on success and rolled back
+			on error.
+
+			readonly: start a read-only transaction, see SednaConnection.beginTransaction"""
+		return _PoolConnection(self, timeout, readonly)
+
+	async def execute(self, query, timeout=None, **kwargs):
+		"""Execute query on a pooled session and return the list of its items."""
+		async with self.transaction(timeout, readonly=True) as conn:
+			return await conn.execute(query, **kwargs)
+
+	async def close(self):
+		"""Close all idle sessions. Sessions still checked out are closed when returned."""
+		self.__closed = True
+		idle = self.__idle
+		self.__idle = []
+		for conn in idle:
+			self.__size -= 1
+			await self.__closeQuietly(conn)
+
+	async def __closeQuietly(self, conn):
+		try:
+			await conn.close()
+		except sedna.SednaException:
+			pass
@@ -0,0 +1,30 @@
+##############################################################################
+## File:  aioconcurrency.py
+##
+## Apache License 2.0
+##
+## asyncio variant of bench_concurrency.py. It uses async syntax, so it
+## lives here and bench_concurrency.py only imports it on Python 3.5 or
+## later.
+##############################################################################
+
+import asyncio
+import aiosedna
+
+async def request(pool):
+    async with pool.connection() as conn:
+        await conn.execute('bench')
+
+async def run(requests, sessions):
+    pool = aiosedna.AsyncSednaPool('localhost', 'bench', maxSize=sessions)
+    await asyncio.gather(*[request(pool) for i in range(requests)])
+    await pool.close()
+
+def pooled(requests, sessions):
+    """Run the requests concurrently from one event loop, over an
+    AsyncSednaPool of at most sessions sessions."""
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(run(requests, sessions))
+    finally:
+        loop.close()
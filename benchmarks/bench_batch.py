@@ -0,0 +1,41 @@
+##############################################################################
+## File:  bench_batch.py
+##
+## Apache License 2.0
+##
+## Statements per second of SednaConnection.executeMany compared with one
+## update() call (SEbegin, SEexecute, SEcommit) per statement, against a
+## fake backend with a fixed round-trip time.
+##
+## Usage: python bench_batch.py [statements] [latency in ms]
+##############################################################################
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakelibsedna
+fakelibsedna.install()
+import sedna
+
+query = "UPDATE insert <item id='%(id)s'/> into doc('bench')/items"
+
+def perCall(conn, statements):
+    for i in range(statements):
+        conn.update(query, id=str(i))
+
+def batched(conn, statements):
+    conn.executeMany(query, ({'id': str(i)} for i in range(statements)))
+
+if __name__ == '__main__':
+    statements = len(sys.argv) > 1 and int(sys.argv[1]) or 500
+    fakelibsedna.latency = (len(sys.argv) > 2 and float(sys.argv[2]) or 1.0) / 1000.0
+    conn = sedna.SednaConnection('localhost', 'bench')
+    for (name, run) in (('update()', perCall), ('executeMany', batched)):
+        start = time.time()
+        run(conn, statements)
+        elapsed = time.time() - start
+        sys.stdout.write("%-12s %10.1f statements/s\n" % (name, statements / elapsed))
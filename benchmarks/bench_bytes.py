@@ -0,0 +1,54 @@
+##############################################################################
+## File:  bench_bytes.py
+##
+## Apache License 2.0
+##
+## Compares the bytes result path of SednaConnection.resultSequence with a
+## processor that turns every chunk into text as it arrives, as a str based
+## driver has to. "decoded" asks resultSequence for text, which decodes each
+## item once after it was joined as bytes.
+##
+## Usage: python bench_bytes.py [item size] [item count]
+##############################################################################
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakelibsedna
+fakelibsedna.install()
+import sedna
+
+class TextProccessor:
+    """Decodes every chunk on arrival and joins the pieces as text."""
+    def initial(self):
+        return []
+    def combine(self, state, value):
+        state.append(value.decode('utf-8', 'replace'))
+        return state
+    def postproccess(self, state):
+        return ([], u''.join(state))
+    def hook(self, value):
+        return value
+
+def run(name, retrieve, itemSize, itemCount):
+    item = u'\u0434' * (itemSize // 2)
+    fakelibsedna.results = lambda query: [item] * itemCount
+    conn = sedna.SednaConnection('localhost', 'bench')
+    conn.execute('bench')
+    start = time.time()
+    total = 0
+    for result in retrieve(conn):
+        total += len(result)
+    elapsed = time.time() - start
+    sys.stdout.write("%-8s %10.1f items/s %6.3f s\n" % (name, itemCount / elapsed, elapsed))
+
+if __name__ == '__main__':
+    itemSize = len(sys.argv) > 1 and int(sys.argv[1]) or 65536
+    itemCount = len(sys.argv) > 2 and int(sys.argv[2]) or 5000
+    run('text', lambda conn: conn.resultSequence(proccessor=TextProccessor()), itemSize, itemCount)
+    run('bytes', lambda conn: conn.resultSequence(), itemSize, itemCount)
+    run('decoded', lambda conn: conn.resultSequence(encoding='utf-8'), itemSize, itemCount)
@@ -0,0 +1,74 @@
+##############################################################################
+## File:  bench_columns.py
+##
+## Apache License 2.0
+##
+## Compares decoding rows of numbers item by item from resultSequence into
+## lists with SednaConnection.fetchColumns, which has the rows joined into
+## one item and parses them in batches into array.array or numpy arrays.
+## With --memory every variant runs a second time under tracemalloc
+## (Python 3) to report its peak memory.
+##
+## Usage: python bench_columns.py [--memory] [rows]
+##############################################################################
+
+import os
+import sys
+import time
+import optparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakelibsedna
+fakelibsedna.install()
+import sedna
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+def itemLoop(conn):
+    ids = []
+    prices = []
+    for item in conn.execute("doc('bench')//row").resultSequence():
+        (i, price) = item.split(b',')
+        ids.append(int(i))
+        prices.append(float(price))
+    return [ids, prices]
+
+variants = [
+    ('items', itemLoop),
+    ('arrays', lambda conn: conn.fetchColumns("doc('bench')//row", ('l', 'd'))),
+    ('numpy', lambda conn: conn.fetchColumns("doc('bench')//row", ('i8', 'f8'), asNumpy=True)),
+]
+
+def run(name, fetch, rows, memory):
+    conn = sedna.SednaConnection('localhost', 'bench')
+    start = time.time()
+    columns = fetch(conn)
+    elapsed = time.time() - start
+    assert len(columns[0]) == rows
+    del columns
+    sys.stdout.write("%-8s %10.1f rows/s %6.3f s" % (name, rows / elapsed, elapsed))
+    if memory and tracemalloc != None:
+        tracemalloc.start()
+        fetch(conn)
+        sys.stdout.write(" %10d KB peak" % (tracemalloc.get_traced_memory()[1] // 1024))
+        tracemalloc.stop()
+    sys.stdout.write("\n")
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser(usage="%prog [options] [rows]")
+    parser.add_option('-m', '--memory', action='store_true', help="also report peak memory (Python 3)")
+    (options, args) = parser.parse_args()
+    rows = args and int(args[0]) or 1000000
+    items = [('%d,%d.25' % (i, i)).encode('ascii') for i in range(rows)]
+    joined = b'\n'.join(items)
+    fakelibsedna.results = lambda query: query.startswith(b'string-join') and [joined] or items
+    for (name, fetch) in variants:
+        try:
+            run(name, fetch, rows, options.memory)
+        except ImportError:
+            sys.stdout.write("%-8s numpy is not installed\n" % name)
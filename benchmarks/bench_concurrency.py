@@ -0,0 +1,63 @@
+##############################################################################
+## File:  bench_concurrency.py
+##
+## Apache License 2.0
+##
+## Measures request throughput of SednaConnectionThread sessions against a
+## fake backend whose queries take a fixed time, compared with running the
+## same requests one after another on a single SednaConnection. On Python
+## 3.5 or later it also measures the same requests issued from coroutines
+## through an aiosedna.AsyncSednaPool (see aioconcurrency.py).
+##
+## Usage: python bench_concurrency.py [requests] [latency in ms]
+##############################################################################
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakelibsedna
+fakelibsedna.install()
+import sedna
+
+if sys.version_info >= (3, 5):
+    from aioconcurrency import pooled
+else:
+    pooled = None
+
+def sequential(requests):
+    conn = sedna.SednaConnection('localhost', 'bench')
+    for i in range(requests):
+        list(conn.execute('bench').resultSequence())
+    conn.close()
+
+def threaded(requests, sessions):
+    threads = [sedna.SednaConnectionThread('localhost', 'bench') for i in range(sessions)]
+    futures = [threads[i % sessions].execute('bench') for i in range(requests)]
+    for future in futures:
+        future.result()
+    for thread in threads:
+        thread.close()
+
+def report(name, requests, elapsed):
+    sys.stdout.write("%-12s %8.1f requests/s\n" % (name, requests / elapsed))
+
+if __name__ == '__main__':
+    requests = len(sys.argv) > 1 and int(sys.argv[1]) or 400
+    fakelibsedna.latency = (len(sys.argv) > 2 and float(sys.argv[2]) or 5.0) / 1000.0
+    fakelibsedna.results = lambda query: ['<item/>'] * 10
+    start = time.time()
+    sequential(requests)
+    report('sequential', requests, time.time() - start)
+    for sessions in (1, 2, 4, 8, 16):
+        start = time.time()
+        threaded(requests, sessions)
+        report('%d sessions' % sessions, requests, time.time() - start)
+    if pooled != None:
+        for sessions in (1, 2, 4, 8, 16):
+            start = time.time()
+            pooled(requests, sessions)
+            report('%d asyncio' % sessions, requests, time.time() - start)
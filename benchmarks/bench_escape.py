@@ -0,0 +1,56 @@
+##############################################################################
+## File:  bench_escape.py
+##
+## Apache License 2.0
+##
+## Compares query escaping and assembly of the _sednaspeedups C extension
+## with the pure Python fallback in sedna.py, and checks that both produce
+## identical query text. Build the extension first (python setup.py build)
+## and make sure it is on sys.path.
+##
+## Usage: python bench_escape.py [iterations]
+##############################################################################
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakelibsedna
+fakelibsedna.install()
+import sedna
+
+try:
+    import _sednaspeedups
+except ImportError:
+    sys.stderr.write("_sednaspeedups is not built, nothing to compare\n")
+    sys.exit(1)
+
+prologue = b"import module namespace m = 'http://example.com/module';\n"
+query = b"doc('%(doc)s')/items/item[@id='%(id)s' and @tag='%(tag)s' and @n=%(n)s]"
+cases = [
+    {'doc': 'bench', 'id': 'plain', 'tag': 'text', 'n': 1},
+    {'doc': 'bench', 'id': "<a & 'b'>", 'tag': '"quoted"', 'n': 2.5},
+    {'doc': u'b\xe9nch', 'id': u'\u0434\u043e\u043a & <x/>', 'tag': 'x' * 200 + '&', 'n': 10 ** 20},
+]
+
+def run(name, assemble, iterations):
+    start = time.time()
+    for i in range(iterations):
+        for kwargs in cases:
+            assemble(prologue, query, kwargs)
+    elapsed = time.time() - start
+    sys.stdout.write("%-8s %10.1f queries/s\n" % (name, iterations * len(cases) / elapsed))
+    return elapsed
+
+if __name__ == '__main__':
+    iterations = len(sys.argv) > 1 and int(sys.argv[1]) or 50000
+    for kwargs in cases:
+        if _sednaspeedups.assemble(prologue, query, kwargs) != sedna._pyAssemble(prologue, query, kwargs):
+            sys.stderr.write("output differs for %r\n" % kwargs)
+            sys.exit(1)
+    python = run('python', sedna._pyAssemble, iterations)
+    c = run('C', _sednaspeedups.assemble, iterations)
+    sys.stdout.write("speedup  %10.2fx\n" % (python / c))
@@ -0,0 +1,79 @@
+##############################################################################
+## File:  bench_import.py
+##
+## Apache License 2.0
+##
+## Measures how long "import sedna" takes in fresh interpreters, and how
+## long it would take if the modules sedna.py imports on first use (the
+## native libsedna, uuid, random, ElementTree, gzip, bz2) were imported up
+## front. The real sedna.py is imported, not the fake libsedna, and the run
+## fails if importing it loaded any of the deferred modules.
+##
+## With --budget the exit status is 1 when the median import time is over
+## the budget, so that the check can run in CI:
+##
+##     python benchmarks/bench_import.py --budget 50
+##############################################################################
+
+import os
+import sys
+import optparse
+import subprocess
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+deferred = ['libsedna', 'uuid', 'random', 'xml.etree.ElementTree', 'gzip', 'bz2']
+
+# Run in a fresh interpreter; prints the import time in seconds and the
+# deferred modules that were loaded.
+script = """
+import sys, time
+sys.path.insert(0, %r)
+start = time.time()
+import sedna
+%s
+elapsed = time.time() - start
+loaded = [name for name in %r if name in sys.modules]
+sys.stdout.write('%%f %%s' %% (elapsed, ','.join(loaded)))
+"""
+
+def measure(eager, runs):
+    """Median import time in seconds, and the deferred modules loaded."""
+    imports = ''
+    if eager:
+        imports = 'for name in %r:\n    try:\n        __import__(name)\n    except ImportError:\n        pass' % deferred
+    code = script % (root, imports, deferred)
+    # The first, untimed run writes the bytecode of sedna.py, so that
+    # compiling it is not measured, as with an installed driver.
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    times = []
+    loaded = ''
+    for i in range(runs + 1):
+        output = subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE, env=env).communicate()[0]
+        if i == 0:
+            continue
+        fields = output.decode('ascii').split(' ')
+        times.append(float(fields[0]))
+        loaded = fields[1]
+    times.sort()
+    return (times[len(times) // 2], loaded)
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser(usage="%prog [options]")
+    parser.add_option('-n', '--runs', type='int', default=21, help="interpreters started per variant")
+    parser.add_option('-b', '--budget', type='float', help="maximum median import time in ms")
+    (options, args) = parser.parse_args()
+    (lazy, loaded) = measure(False, options.runs)
+    (eager, ignored) = measure(True, options.runs)
+    sys.stdout.write("lazy     %8.2f ms\n" % (lazy * 1000))
+    sys.stdout.write("eager    %8.2f ms\n" % (eager * 1000))
+    failed = False
+    if loaded:
+        sys.stderr.write("import sedna loaded %s\n" % loaded)
+        failed = True
+    if options.budget != None and lazy * 1000 > options.budget:
+        sys.stderr.write("import sedna took %.2f ms, over the budget of %.2f ms\n" % (lazy * 1000, options.budget))
+        failed = True
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,85 @@
+##############################################################################
+## File:  bench_load.py
+##
+## Apache License 2.0
+##
+## Compares feeding a document file to SednaConnection.loadDocument through
+## mmap and large chunks with the previous read(4096) loop. Every variant runs
+## in its own process so that the reported peak RSS belongs to it alone.
+##
+## The fake SEloadData reads every byte it is given, as sending it to the
+## server would. The peak RSS of the mmap variants therefore includes the
+## mapped pages of the file, which belong to the page cache and can be
+## dropped by the kernel at any time; the anonymous column (Linux only)
+## shows the memory the process itself allocated.
+##
+## Usage: python bench_load.py [size in MB]
+##############################################################################
+
+import os
+import sys
+import time
+import tempfile
+import resource
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakelibsedna
+fakelibsedna.install()
+import sedna
+
+def legacyLoad(conn, f):
+    """The file branch of _loadDocument as it was before mmap support."""
+    while True:
+        d = f.read(4096)
+        if not d:
+            break
+        conn._feed_data(d, b'bench', None)
+    fakelibsedna.SEendLoadData(conn.sednaConnection)
+
+variants = {
+    'legacy': lambda conn, f: legacyLoad(conn, f),
+    'mmap-64k': lambda conn, f: conn.loadDocument(f, 'bench', chunkSize=65536),
+    'mmap-1m': lambda conn, f: conn.loadDocument(f, 'bench', chunkSize=1048576),
+}
+
+def anonymousKB():
+    """Resident anonymous memory of this process in KB, as a string."""
+    try:
+        for line in open('/proc/self/status'):
+            if line.startswith('RssAnon:'):
+                return line.split()[1]
+    except IOError:
+        pass
+    return '-'
+
+def runVariant(name, path):
+    conn = sedna.SednaConnection('localhost', 'bench')
+    f = open(path, 'rb')
+    start = time.time()
+    variants[name](conn, f)
+    elapsed = time.time() - start
+    f.close()
+    size = os.path.getsize(path)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    sys.stdout.write("%-10s %8.3f s/GB %10d KB peak RSS %10s KB anonymous\n" %
+                     (name, elapsed * (1 << 30) / size, rss, anonymousKB()))
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == '--variant':
+        runVariant(sys.argv[2], sys.argv[3])
+        sys.exit(0)
+    megabytes = len(sys.argv) > 1 and int(sys.argv[1]) or 256
+    (fd, path) = tempfile.mkstemp('.xml')
+    try:
+        f = os.fdopen(fd, 'wb')
+        line = b'<item>' + b'x' * 1017 + b'</item>\n'
+        for i in range(megabytes * 1024):
+            f.write(line)
+        f.close()
+        for name in sorted(variants):
+            subprocess.call([sys.executable, os.path.abspath(__file__), '--variant', name, path])
+    finally:
+        os.unlink(path)
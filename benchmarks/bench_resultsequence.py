@@ -0,0 +1,107 @@
+##############################################################################
+## File:  bench_resultsequence.py
+##
+## Apache License 2.0
+##
+## Compares result retrieval through the reusable bytearray buffer of
+## SednaConnection.resultSequence with the previous implementation, which
+## allocated a fresh string slice for every SEgetData call. The buffer path
+## also grows its buffer for large items, so it needs fewer calls.
+##
+## Allocations are reported as the megabytes copied into a new chunk
+## object per SEgetData call (memoryview slices of the buffer copy nothing)
+## and, on Python 3, as the peak memory traced by tracemalloc during a
+## second run of every variant.
+##
+## Usage: python bench_resultsequence.py [item size] [item count]
+##############################################################################
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakelibsedna
+fakelibsedna.install()
+import sedna
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+libsedna = fakelibsedna
+
+def legacyResultSequence(conn, bufferSize=4096):
+    """resultSequence as it was before the buffer-protocol path."""
+    proccessor = sedna.SednaConnectionDefaultProccessor()
+    hook = proccessor.hook
+    buf = b'\000' * bufferSize
+    state = proccessor.initial()
+    status = libsedna.SEnext(conn.sednaConnection)
+    while status == libsedna.SEDNA_NEXT_ITEM_SUCCEEDED:
+        while True:
+            status = libsedna.SEgetData(conn.sednaConnection, buf, bufferSize)
+            if status == 0:
+                break
+            state = proccessor.combine(state, hook(buf[:status]))
+        (state, result) = proccessor.postproccess(state)
+        yield result
+        status = libsedna.SEnext(conn.sednaConnection)
+
+def consume(conn, retrieve):
+    """Runs the query and retrieves its result. Returns the number of bytes
+    retrieved, of SEgetData calls and of bytes copied into chunk objects."""
+    conn.execute('bench')
+    calls = [0]
+    copied = [0]
+    getData = fakelibsedna.SEgetData
+    def countingGetData(*args):
+        calls[0] += 1
+        return getData(*args)
+    proccessor = sedna.SednaConnectionDefaultProccessor
+    combine = proccessor.combine
+    def countingCombine(self, state, value):
+        if isinstance(value, bytes):
+            copied[0] += len(value)
+        return combine(self, state, value)
+    fakelibsedna.SEgetData = countingGetData
+    proccessor.combine = countingCombine
+    total = 0
+    try:
+        for result in retrieve(conn):
+            total += len(result)
+    finally:
+        fakelibsedna.SEgetData = getData
+        proccessor.combine = combine
+    return (total, calls[0], copied[0])
+
+def peakMemory(conn, retrieve):
+    """Peak memory in KB traced while retrieving the result."""
+    tracemalloc.start()
+    try:
+        consume(conn, retrieve)
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+def run(name, retrieve, itemSize, itemCount):
+    item = b'x' * itemSize
+    fakelibsedna.results = lambda query: [item] * itemCount
+    conn = sedna.SednaConnection('localhost', 'bench')
+    start = time.time()
+    (total, calls, copied) = consume(conn, retrieve)
+    elapsed = time.time() - start
+    sys.stdout.write("%-10s %10.1f MB/s %8d items %8d SEgetData calls %8.1f MB copied" %
+                     (name, total / elapsed / 1048576.0, itemCount, calls, copied / 1048576.0))
+    if tracemalloc != None:
+        sys.stdout.write(" %8d KB peak" % peakMemory(conn, retrieve))
+    sys.stdout.write("\n")
+
+if __name__ == '__main__':
+    itemSize = len(sys.argv) > 1 and int(sys.argv[1]) or 4 * 1048576
+    itemCount = len(sys.argv) > 2 and int(sys.argv[2]) or 50
+    run('legacy', legacyResultSequence, itemSize, itemCount)
+    run('buffer', lambda conn: conn.resultSequence(), itemSize, itemCount)
@@ -0,0 +1,92 @@
+##############################################################################
+## File:  bench_threads.py
+##
+## Apache License 2.0
+##
+## Multi-threaded scaling of independent SednaConnection sessions over the
+## real SWIG wrapper. libsedna.i is built against stubsedna/, a C stub of
+## the Sedna C API whose server calls sleep for the round-trip latency.
+## The stub knows nothing about the GIL, so only the wrapper decides whether
+## other threads run meanwhile. Two builds are compared:
+##
+##   threads    libsedna.i as shipped, which releases the GIL around calls
+##              that wait for the server
+##   nothreads  the same wrapper compiled with SWIG_PYTHON_NO_THREADS, which
+##              keeps the GIL during every call
+##
+## With the GIL released throughput should grow close to linearly with the
+## number of threads; without it it stays flat. Needs SWIG and a C compiler
+## (SWIG 4.1 and later no longer build wrappers for Python 2).
+##
+## Usage: python bench_threads.py [queries per thread] [latency in ms]
+##############################################################################
+
+import os
+import sys
+import time
+import threading
+import subprocess
+import shutil
+
+here = os.path.dirname(os.path.abspath(__file__))
+stub = os.path.join(here, 'stubsedna')
+
+variants = [
+    ('threads', []),
+    ('nothreads', ['--define', 'SWIG_PYTHON_NO_THREADS']),
+]
+
+def build(name, options):
+    """Builds the wrapper into stubsedna/build/NAME and returns that folder."""
+    target = os.path.join(stub, 'build', name)
+    devnull = open(os.devnull, 'w')
+    try:
+        subprocess.check_call([sys.executable, 'setup.py', '-q', 'build_ext', '--build-lib', target,
+                               '--build-temp', os.path.join(stub, 'build', 'temp.' + name)] + options,
+                              cwd=stub, stdout=devnull)
+    finally:
+        devnull.close()
+    shutil.copy(os.path.join(stub, 'build', 'libsedna.py'), target)
+    return target
+
+def worker(queries):
+    conn = sedna.SednaConnection('localhost', 'bench')
+    for i in range(queries):
+        for item in conn.execute('bench').resultSequence():
+            pass
+    conn.close()
+
+def measure(name, queries, latency):
+    """Runs in a child process with one of the builds on sys.path."""
+    global sedna
+    import libsedna
+    import sedna
+    libsedna.SEstubConfigure(int(latency * 1000), 10, 64)
+    worker(1)
+    base = None
+    for count in (1, 2, 4, 8, 16, 32):
+        threads = [threading.Thread(target=worker, args=(queries,)) for i in range(count)]
+        start = time.time()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        throughput = count * queries / (time.time() - start)
+        if base == None:
+            base = throughput
+        sys.stdout.write("%-9s %2d threads %10.1f queries/s %6.2fx\n" % (name, count, throughput, throughput / base))
+        sys.stdout.flush()
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--measure':
+        (name, path, queries, latency) = sys.argv[2:]
+        sys.path.insert(0, path)
+        sys.path.insert(1, os.path.dirname(here))
+        measure(name, int(queries), float(latency))
+        sys.exit(0)
+    queries = len(sys.argv) > 1 and int(sys.argv[1]) or 100
+    latency = len(sys.argv) > 2 and float(sys.argv[2]) or 2.0
+    for (name, options) in variants:
+        path = build(name, options)
+        # libsedna can only be imported once per process
+        subprocess.check_call([sys.executable, os.path.abspath(__file__), '--measure', name, path, str(queries), str(latency)])
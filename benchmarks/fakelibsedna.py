@@ -0,0 +1,271 @@
+##############################################################################
+## File:  fakelibsedna.py
+##
+## Apache License 2.0
+##
+## Pure Python stand-in for the SWIG generated libsedna module. It keeps
+## everything in memory and lets benchmarks drive sedna.py without a server.
+##
+## Use install() before importing sedna:
+##
+##     import fakelibsedna
+##     fakelibsedna.install()
+##     import sedna
+##
+## fail() makes calls return errors, as the server does for failing
+## queries, loads and lost sessions; reset() undoes what a test changed.
+##############################################################################
+
+import re
+import sys
+import time
+import zlib
+import threading
+
+SEDNA_SESSION_OPEN = 1
+SEDNA_SESSION_CLOSED = 2
+SEDNA_SET_ATTRIBUTE_SUCCEEDED = 3
+SEDNA_BEGIN_TRANSACTION_SUCCEEDED = 4
+SEDNA_COMMIT_TRANSACTION_SUCCEEDED = 5
+SEDNA_ROLLBACK_TRANSACTION_SUCCEEDED = 6
+SEDNA_QUERY_SUCCEEDED = 7
+SEDNA_UPDATE_SUCCEEDED = 8
+SEDNA_BULK_LOAD_SUCCEEDED = 9
+SEDNA_DATA_CHUNK_LOADED = 10
+SEDNA_NEXT_ITEM_SUCCEEDED = 11
+SEDNA_RESULT_END = 12
+SEDNA_NO_ITEM = 13
+SEDNA_CONNECTION_OK = 14
+SEDNA_CONNECTION_CLOSED = 15
+SEDNA_CONNECTION_FAILED = 16
+SEDNA_TRANSACTION_ACTIVE = 17
+SEDNA_NO_TRANSACTION = 18
+SEDNA_ERROR = -1
+SEDNA_AUTHENTICATION_FAILED = -3
+
+SEDNA_ATTR_AUTOCOMMIT = 1
+SEDNA_AUTOCOMMIT_OFF = 0
+SEDNA_AUTOCOMMIT_ON = 1
+SEDNA_ATTR_CONCURRENCY_TYPE = 4
+SEDNA_READONLY_TRANSACTION = 1
+SEDNA_UPDATE_TRANSACTION = 0
+
+# Result items returned by every query: a function taking the query text
+# (bytes) and returning a list of strings. Benchmarks replace it as they need.
+results = lambda query: []
+
+# Seconds every call talking to the server sleeps, to simulate a round-trip.
+latency = 0.0
+
+# Bytes per second SEgetData and SEloadData transfer, None for no limit.
+bandwidth = None
+
+# Queries passed to SEexecute, in order.
+queries = []
+
+# Pending failures injected with fail(), see failing().
+failures = []
+failuresLock = threading.Lock()
+
+# Statements the server answers with SEDNA_UPDATE_SUCCEEDED; other LOAD
+# statements are bulk loads.
+updatePattern = re.compile(br'(UPDATE|CREATE|DROP|LOAD\s+(OR\s+REPLACE\s+)?MODULE)\b', re.I)
+prologuePattern = re.compile(br'^\s*((import|declare)\b[^;]*;\s*)*')
+
+def fail(call, message=b'injected failure', code=1, match=None, lost=False, rollback=False, times=1, status=SEDNA_ERROR):
+    """Make the next times calls of the function named call return status.
+
+    match: only fail calls whose query or document name contains it
+    lost: the session is lost, SEconnectionStatus reports a failure
+    rollback: the server rolls back the transaction, as for most errors"""
+    failuresLock.acquire()
+    try:
+        failures.append([call, message, code, match, lost, rollback, times, status])
+    finally:
+        failuresLock.release()
+
+def failing(conn, call, subject=None):
+    """The status a failing call returns, None if it does not fail. Sets
+    the error of conn."""
+    failuresLock.acquire()
+    try:
+        for failure in failures:
+            (name, message, code, match, lost, rollback, times, status) = failure
+            if name != call or (match != None and (subject == None or match not in subject)):
+                continue
+            failure[6] -= 1
+            if failure[6] <= 0:
+                failures.remove(failure)
+            break
+        else:
+            return None
+    finally:
+        failuresLock.release()
+    conn.error = message
+    conn.code = code
+    if lost:
+        conn.status = SEDNA_CONNECTION_FAILED
+    if lost or rollback:
+        conn.transaction = False
+    return status
+
+def reset():
+    """Restore the module level settings and forget failures and queries."""
+    global results, latency, bandwidth
+    results = lambda query: []
+    latency = 0.0
+    bandwidth = None
+    del queries[:]
+    failuresLock.acquire()
+    del failures[:]
+    failuresLock.release()
+
+def roundTrip():
+    if latency:
+        time.sleep(latency)
+
+def transfer(size):
+    if bandwidth:
+        time.sleep(float(size) / bandwidth)
+
+def checkBytes(*args):
+    # Like the wrapper built with SWIG_PYTHON_STRICT_BYTE_CHAR on Python 3
+    for arg in args:
+        if arg is not None and not isinstance(arg, bytes):
+            raise TypeError("expected bytes, got %s" % type(arg).__name__)
+
+def toBytes(item):
+    if isinstance(item, bytes):
+        return item
+    return item.encode('utf-8')
+
+class SednaConnection(object):
+    def __init__(self):
+        self.status = SEDNA_CONNECTION_CLOSED
+        self.transaction = False
+        self.items = []
+        self.current = b''
+        self.offset = 0
+        self.loaded = 0
+        self.checksum = 0 # CRC-32 of the loaded data
+        self.error = b''
+        self.code = 0
+        self.attributes = {}
+
+def SEconnect(conn, host, db, login, passwd):
+    checkBytes(host, db, login, passwd)
+    status = failing(conn, 'SEconnect', db)
+    if status != None:
+        conn.status = SEDNA_CONNECTION_FAILED
+        return status
+    conn.status = SEDNA_CONNECTION_OK
+    return SEDNA_SESSION_OPEN
+
+def SEclose(conn):
+    conn.status = SEDNA_CONNECTION_CLOSED
+    return SEDNA_SESSION_CLOSED
+
+def SEsetConnectionAttrInt(conn, attr, value):
+    conn.attributes[attr] = value
+    return SEDNA_SET_ATTRIBUTE_SUCCEEDED
+
+def SEconnectionStatus(conn):
+    return conn.status
+
+def SEtransactionStatus(conn):
+    if conn.transaction:
+        return SEDNA_TRANSACTION_ACTIVE
+    return SEDNA_NO_TRANSACTION
+
+def SEbegin(conn):
+    roundTrip()
+    status = failing(conn, 'SEbegin')
+    if status != None:
+        return status
+    conn.transaction = True
+    return SEDNA_BEGIN_TRANSACTION_SUCCEEDED
+
+def SEcommit(conn):
+    roundTrip()
+    status = failing(conn, 'SEcommit')
+    if status != None:
+        return status
+    conn.transaction = False
+    return SEDNA_COMMIT_TRANSACTION_SUCCEEDED
+
+def SErollback(conn):
+    roundTrip()
+    conn.transaction = False
+    return SEDNA_ROLLBACK_TRANSACTION_SUCCEEDED
+
+def SEexecute(conn, query):
+    checkBytes(query)
+    roundTrip()
+    queries.append(query)
+    status = failing(conn, 'SEexecute', query)
+    if status != None:
+        return status
+    conn.items = []
+    conn.current = b''
+    conn.offset = 0
+    statement = query[prologuePattern.match(query).end():]
+    if updatePattern.match(statement):
+        return SEDNA_UPDATE_SUCCEEDED
+    if statement[:4].upper() == b'LOAD':
+        return SEDNA_BULK_LOAD_SUCCEEDED
+    conn.items = [toBytes(item) for item in results(query)]
+    conn.items.reverse()
+    return SEDNA_QUERY_SUCCEEDED
+
+def SEnext(conn):
+    if not conn.items:
+        return SEDNA_RESULT_END
+    conn.current = conn.items.pop()
+    conn.offset = 0
+    return SEDNA_NEXT_ITEM_SUCCEEDED
+
+def SEgetData(conn, buf, size=None):
+    """Copies the next chunk of the current item into buf. Passing size keeps
+    the old calling convention, where buf is immutable bytes the real
+    wrapper wrote into; nothing is copied then."""
+    if size == None:
+        size = len(buf)
+    n = min(size, len(conn.current) - conn.offset)
+    if n > 0 and not isinstance(buf, bytes):
+        buf[:n] = conn.current[conn.offset:conn.offset + n]
+    conn.offset += n
+    transfer(n)
+    return n
+
+def SEloadData(conn, buf, doc, collection):
+    checkBytes(doc, collection)
+    if len(buf) > 2147483647:
+        # like the wrapper, whose length argument is an int
+        raise OverflowError("buffer is longer than INT_MAX bytes")
+    status = failing(conn, 'SEloadData', doc)
+    if status != None:
+        return status
+    # Read every byte, as sending the chunk to the server would, so that
+    # mapped pages are faulted in and benchmarks see the real cost.
+    if sys.version_info[0] < 3 and isinstance(buf, memoryview):
+        buf = buf.tobytes() # the Python 2 zlib does not take memoryviews
+    conn.checksum = zlib.crc32(buf, conn.checksum) & 0xffffffff
+    conn.loaded += len(buf)
+    transfer(len(buf))
+    return SEDNA_DATA_CHUNK_LOADED
+
+def SEendLoadData(conn):
+    status = failing(conn, 'SEendLoadData')
+    if status != None:
+        return status
+    return SEDNA_BULK_LOAD_SUCCEEDED
+
+def SEgetLastErrorMsg(conn):
+    return conn.error
+
+def SEgetLastErrorCode(conn):
+    return conn.code
+
+def install():
+    """Register this module as libsedna."""
+    sys.modules['libsedna'] = sys.modules[__name__]
@@ -0,0 +1,208 @@
+##############################################################################
+## File:  run.py
+##
+## Apache License 2.0
+##
+## Benchmark suite for the hot paths of sedna.py, run against the in-memory
+## fake libsedna so that no server is needed. Results are written as JSON
+## and can be compared with the results of another commit:
+##
+##     python benchmarks/run.py -o before.json
+##     ... change the driver ...
+##     python benchmarks/run.py -o after.json --compare before.json
+##
+## --compare exits with status 1 if a benchmark got slower than the
+## tolerance allows. Pass benchmark names to run only some of them.
+##############################################################################
+
+import os
+import sys
+import time
+import json
+import platform
+import tempfile
+import optparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakelibsedna
+fakelibsedna.install()
+import sedna
+
+benchmarks = []
+
+def benchmark(fn):
+    """Registers fn as a benchmark. fn runs the measured code and returns
+    the number of operations it performed."""
+    benchmarks.append(fn)
+    return fn
+
+def connect():
+    return sedna.SednaConnection('localhost', 'bench')
+
+@benchmark
+def connection_setup():
+    for i in range(2000):
+        connect().close()
+    return 2000
+
+@benchmark
+def transaction():
+    conn = connect()
+    for i in range(20000):
+        conn.beginTransaction()
+        conn.commit()
+    return 20000
+
+@benchmark
+def transaction_nested():
+    conn = connect()
+    for i in range(20000):
+        with conn.transaction(readonly=True):
+            with conn.transaction(readonly=True):
+                pass
+    return 20000
+
+@benchmark
+def execute_plain():
+    conn = connect()
+    for i in range(20000):
+        conn.execute("doc('bench')/items/item")
+    return 20000
+
+@benchmark
+def execute_escaping():
+    conn = connect()
+    for i in range(20000):
+        conn.execute("doc('%(doc)s')/items/item[@id='%(id)s' and @tag='%(tag)s']",
+                     doc='bench', id="<a & 'b'>", tag='"quoted"')
+    return 20000
+
+@benchmark
+def execute_prologue():
+    conn = connect()
+    for i in range(5):
+        conn.loadModule('m%d' % i, 'http://example.com/module%d' % i)
+    for i in range(20000):
+        conn.execute("m0:f(doc('bench'))")
+    return 20000
+
+@benchmark
+def execute_prepared():
+    conn = connect()
+    for i in range(5):
+        conn.loadModule('m%d' % i, 'http://example.com/module%d' % i)
+    statement = conn.prepare("m0:f(doc('bench'))")
+    for i in range(20000):
+        statement.execute()
+    return 20000
+
+def retrieve(itemSize, itemCount):
+    item = 'x' * itemSize
+    fakelibsedna.results = lambda query: [item] * itemCount
+    conn = connect()
+    conn.execute('bench')
+    for result in conn.resultSequence():
+        pass
+    fakelibsedna.results = lambda query: []
+    return itemCount
+
+@benchmark
+def resultsequence_small_items():
+    return retrieve(100, 100000)
+
+@benchmark
+def resultsequence_medium_items():
+    return retrieve(16384, 5000)
+
+@benchmark
+def resultsequence_large_items():
+    return retrieve(4 * 1048576, 20)
+
+@benchmark
+def load_strings():
+    conn = connect()
+    data = '<item>' + 'x' * 10000 + '</item>'
+    for i in range(5000):
+        conn.loadDocument(data, 'doc%d' % i)
+    return 5000
+
+@benchmark
+def load_file():
+    (fd, path) = tempfile.mkstemp('.xml')
+    try:
+        f = os.fdopen(fd, 'wb')
+        line = b'<item>' + b'x' * 1017 + b'</item>\n'
+        for i in range(64 * 1024):
+            f.write(line)
+        f.close()
+        conn = connect()
+        for i in range(10):
+            f = open(path, 'rb')
+            conn.loadDocument(f, 'bench')
+            f.close()
+    finally:
+        os.unlink(path)
+    return 10
+
+def run(selected, repeat):
+    results = {}
+    for fn in benchmarks:
+        if selected and fn.__name__ not in selected:
+            continue
+        best = None
+        for i in range(repeat):
+            start = time.time()
+            ops = fn()
+            elapsed = time.time() - start
+            if best == None or elapsed < best:
+                best = elapsed
+        results[fn.__name__] = {'seconds': best, 'operations': ops, 'ops_per_second': ops / best}
+        sys.stderr.write("%-30s %12.1f ops/s\n" % (fn.__name__, ops / best))
+    return results
+
+def compare(results, baseline, tolerance):
+    """Prints the speed ratio of every benchmark against the baseline and
+    returns the names of the ones which got slower than tolerance allows."""
+    regressions = []
+    for name in sorted(results):
+        if name not in baseline:
+            continue
+        ratio = results[name]['ops_per_second'] / baseline[name]['ops_per_second']
+        flag = ''
+        if ratio < 1.0 - tolerance:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        sys.stderr.write("%-30s %6.2fx%s\n" % (name, ratio, flag))
+    return regressions
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser(usage="%prog [options] [benchmark ...]")
+    parser.add_option('-o', '--output', help="write results as JSON to this file (default: stdout)")
+    parser.add_option('-r', '--repeat', type='int', default=3, help="runs per benchmark, the best one counts")
+    parser.add_option('-c', '--compare', help="JSON results of a previous run to compare with")
+    parser.add_option('-t', '--tolerance', type='float', default=0.1,
+                      help="slowdown accepted by --compare before failing (default 0.1 = 10%)")
+    parser.add_option('-l', '--latency', type='float', default=0.0,
+                      help="simulated round-trip time of the fake server in ms")
+    parser.add_option('-b', '--bandwidth', type='float',
+                      help="simulated transfer rate of the fake server in MB/s")
+    (options, args) = parser.parse_args()
+    fakelibsedna.latency = options.latency / 1000.0
+    if options.bandwidth:
+        fakelibsedna.bandwidth = options.bandwidth * 1048576
+    results = run(args, options.repeat)
+    document = {'python': platform.python_version(), 'time': time.time(),
+                'latency': options.latency, 'bandwidth': options.bandwidth, 'results': results}
+    if options.output:
+        out = open(options.output, 'w')
+        json.dump(document, out, indent=1, sort_keys=True)
+        out.close()
+    else:
+        json.dump(document, sys.stdout, indent=1, sort_keys=True)
+        sys.stdout.write('\n')
+    if options.compare:
+        baseline = json.load(open(options.compare))['results']
+        if compare(results, baseline, options.tolerance):
+            sys.exit(1)
@@ -0,0 +1,77 @@
+/*
+ * File:  libsedna.h
+ *
+ * Apache License 2.0
+ *
+ * The part of the Sedna C API the Python driver uses, for the stub server
+ * in stubsedna.c. libsedna.i is built against it instead of the real
+ * header, so the benchmarks measure the real wrapper without a server.
+ */
+
+#ifndef _LIBSEDNA_STUB_H
+#define _LIBSEDNA_STUB_H
+
+#define SEDNA_SESSION_OPEN                    1
+#define SEDNA_SESSION_CLOSED                  2
+#define SEDNA_AUTHENTICATION_FAILED          -3
+#define SEDNA_OPEN_SESSION_FAILED            -4
+#define SEDNA_QUERY_SUCCEEDED                 6
+#define SEDNA_QUERY_FAILED                   -7
+#define SEDNA_UPDATE_SUCCEEDED                8
+#define SEDNA_BULK_LOAD_SUCCEEDED            10
+#define SEDNA_BULK_LOAD_FAILED              -11
+#define SEDNA_BEGIN_TRANSACTION_SUCCEEDED    12
+#define SEDNA_ROLLBACK_TRANSACTION_SUCCEEDED 14
+#define SEDNA_COMMIT_TRANSACTION_SUCCEEDED   16
+#define SEDNA_NEXT_ITEM_SUCCEEDED            18
+#define SEDNA_NO_ITEM                       -20
+#define SEDNA_RESULT_END                    -21
+#define SEDNA_DATA_CHUNK_LOADED              23
+#define SEDNA_ERROR                         -24
+#define SEDNA_TRANSACTION_ACTIVE             25
+#define SEDNA_NO_TRANSACTION                 26
+#define SEDNA_CONNECTION_OK                  27
+#define SEDNA_CONNECTION_CLOSED              28
+#define SEDNA_CONNECTION_FAILED             -29
+#define SEDNA_AUTOCOMMIT_OFF                 30
+#define SEDNA_AUTOCOMMIT_ON                  31
+#define SEDNA_SET_ATTRIBUTE_SUCCEEDED        32
+#define SEDNA_READONLY_TRANSACTION           35
+#define SEDNA_UPDATE_TRANSACTION             36
+
+enum SEattr {
+    SEDNA_ATTR_AUTOCOMMIT,
+    SEDNA_ATTR_SESSION_DIRECTORY,
+    SEDNA_ATTR_DEBUG,
+    SEDNA_ATTR_CONCURRENCY_TYPE
+};
+
+struct SednaConnection {
+    int status;
+    int transaction;
+    int items;      /* items left in the result */
+    int offset;     /* bytes of the current item already read */
+};
+
+int SEconnect(struct SednaConnection *conn, const char *url, const char *db_name, const char *login, const char *password);
+int SEclose(struct SednaConnection *conn);
+int SEbegin(struct SednaConnection *conn);
+int SEcommit(struct SednaConnection *conn);
+int SErollback(struct SednaConnection *conn);
+int SEconnectionStatus(struct SednaConnection *conn);
+int SEtransactionStatus(struct SednaConnection *conn);
+int SEexecute(struct SednaConnection *conn, const char *query);
+int SEnext(struct SednaConnection *conn);
+int SEgetData(struct SednaConnection *conn, char *buf, int bytes_to_read);
+int SEloadData(struct SednaConnection *conn, const char *buf, int bytes_to_write, const char *doc_name, const char *col_name);
+int SEendLoadData(struct SednaConnection *conn);
+int SEgetLastErrorCode(struct SednaConnection *conn);
+const char *SEgetLastErrorMsg(struct SednaConnection *conn);
+int SEsetConnectionAttr(struct SednaConnection *conn, enum SEattr attr, const void *attrValue, int attrValueLength);
+
+/* Not part of the Sedna API: every round-trip to the stub server takes
+   latency_us microseconds, and every query returns items items of
+   item_size bytes. */
+void SEstubConfigure(int latency_us, int items, int item_size);
+
+#endif /* _LIBSEDNA_STUB_H */
@@ -0,0 +1,34 @@
+##############################################################################
+## File:  setup.py
+##
+## Apache License 2.0
+##
+## Builds the driver's libsedna.i against the stub C API in stubsedna.c,
+## for bench_threads.py, which runs it as:
+##
+##     python setup.py build_ext --build-lib DIR [--define SWIG_PYTHON_NO_THREADS]
+##
+## The SWIG generated libsedna.py is left in build/, next to the copy of
+## libsedna.i, so that none lands in the driver's own folder.
+##############################################################################
+
+import os
+import shutil
+try:
+    from setuptools import setup, Extension
+except ImportError:
+    from distutils.core import setup, Extension
+
+here = os.path.dirname(os.path.abspath(__file__))
+os.chdir(here)
+if not os.path.isdir('build'):
+    os.makedirs('build')
+shutil.copy(os.path.join('..', '..', 'libsedna.i'), 'build')
+
+libsedna = Extension('_libsedna',
+                     sources = [os.path.join('build', 'libsedna.i'), 'stubsedna.c'],
+                     swig_opts = ['-threads', '-I' + here],
+                     include_dirs = [here])
+
+setup(name = 'stubsedna',
+      ext_modules = [libsedna])
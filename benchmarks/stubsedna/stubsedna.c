@@ -0,0 +1,139 @@
+/*
+ * File:  stubsedna.c
+ *
+ * Apache License 2.0
+ *
+ * Stub implementation of the Sedna C API declared in libsedna.h. Calls
+ * that talk to a real server sleep for the configured latency instead.
+ * Like the real library it knows nothing about Python: whether other
+ * threads run during the sleep depends only on the wrapper built from
+ * libsedna.i releasing the GIL.
+ */
+
+#include <string.h>
+#include <time.h>
+#include "libsedna.h"
+
+static int latency_us = 1000;
+static int result_items = 10;
+static int item_size = 64;
+
+void SEstubConfigure(int latency, int items, int size)
+{
+    latency_us = latency;
+    result_items = items;
+    item_size = size;
+}
+
+static void round_trip(void)
+{
+    struct timespec ts;
+    ts.tv_sec = latency_us / 1000000;
+    ts.tv_nsec = (latency_us % 1000000) * 1000L;
+    while (nanosleep(&ts, &ts) != 0)
+        ;
+}
+
+int SEconnect(struct SednaConnection *conn, const char *url, const char *db_name, const char *login, const char *password)
+{
+    round_trip();
+    conn->status = SEDNA_CONNECTION_OK;
+    conn->transaction = 0;
+    conn->items = 0;
+    conn->offset = 0;
+    return SEDNA_SESSION_OPEN;
+}
+
+int SEclose(struct SednaConnection *conn)
+{
+    round_trip();
+    conn->status = SEDNA_CONNECTION_CLOSED;
+    return SEDNA_SESSION_CLOSED;
+}
+
+int SEbegin(struct SednaConnection *conn)
+{
+    round_trip();
+    conn->transaction = 1;
+    return SEDNA_BEGIN_TRANSACTION_SUCCEEDED;
+}
+
+int SEcommit(struct SednaConnection *conn)
+{
+    round_trip();
+    conn->transaction = 0;
+    return SEDNA_COMMIT_TRANSACTION_SUCCEEDED;
+}
+
+int SErollback(struct SednaConnection *conn)
+{
+    round_trip();
+    conn->transaction = 0;
+    return SEDNA_ROLLBACK_TRANSACTION_SUCCEEDED;
+}
+
+int SEconnectionStatus(struct SednaConnection *conn)
+{
+    return conn->status == SEDNA_CONNECTION_OK ? SEDNA_CONNECTION_OK : SEDNA_CONNECTION_CLOSED;
+}
+
+int SEtransactionStatus(struct SednaConnection *conn)
+{
+    return conn->transaction ? SEDNA_TRANSACTION_ACTIVE : SEDNA_NO_TRANSACTION;
+}
+
+int SEexecute(struct SednaConnection *conn, const char *query)
+{
+    round_trip();
+    conn->items = result_items;
+    conn->offset = -1;
+    return SEDNA_QUERY_SUCCEEDED;
+}
+
+int SEnext(struct SednaConnection *conn)
+{
+    if (conn->items == 0)
+        return SEDNA_RESULT_END;
+    conn->items--;
+    conn->offset = 0;
+    return SEDNA_NEXT_ITEM_SUCCEEDED;
+}
+
+int SEgetData(struct SednaConnection *conn, char *buf, int bytes_to_read)
+{
+    int n;
+    if (conn->offset < 0)
+        return 0;
+    n = item_size - conn->offset;
+    if (n > bytes_to_read)
+        n = bytes_to_read;
+    memset(buf, 'x', n);
+    conn->offset += n;
+    return n;
+}
+
+int SEloadData(struct SednaConnection *conn, const char *buf, int bytes_to_write, const char *doc_name, const char *col_name)
+{
+    return SEDNA_DATA_CHUNK_LOADED;
+}
+
+int SEendLoadData(struct SednaConnection *conn)
+{
+    round_trip();
+    return SEDNA_BULK_LOAD_SUCCEEDED;
+}
+
+int SEgetLastErrorCode(struct SednaConnection *conn)
+{
+    return 0;
+}
+
+const char *SEgetLastErrorMsg(struct SednaConnection *conn)
+{
+    return "";
+}
+
+int SEsetConnectionAttr(struct SednaConnection *conn, enum SEattr attr, const void *attrValue, int attrValueLength)
+{
+    return SEDNA_SET_ATTRIBUTE_SUCCEEDED;
+}
@@ -23,7 +23,7 @@ try:
     conn.beginTransaction()
     
     # Load document "categories.xml" into database 'testdb'
-    cat = file('data/categories.xml', 'rb')
+    cat = open('data/categories.xml', 'rb')
     conn.loadDocument(cat, 'categories')
     cat.close()
     sys.stdout.write("File 'categories.xml' has been successfully loaded\n")
@@ -35,7 +35,7 @@ try:
     counter = 0;
     for f in os.listdir("data"):
         if f.startswith("page") and f.endswith(".xml"):
-            page = file(os.path.join('data', f), 'rb')
+            page = open(os.path.join('data', f), 'rb')
             conn.loadDocument(page, 'page%d' % counter, 'wikidb')
             page.close()
             sys.stdout.write("Document %s has been successfully loaded\n" % f)
@@ -48,9 +48,10 @@ try:
     # Execute query ...
     conn.execute(query)
     
-    # ... and write result
+    # ... and write result. Items are bytes, written as they are.
+    out = getattr(sys.stderr, 'buffer', sys.stderr)
     for res in conn.resultSequence():
-        sys.stderr.write(res)
+        out.write(res)
     
     # Commit transaction after executing a query
     conn.endTransaction('commit')
@@ -1,5 +1,13 @@
-%module libsedna
+%module(threads="1") libsedna
+/* On Python 3 every char * argument (queries, host, database and document
+   names) must be bytes and every char * result (error messages) is returned
+   as bytes, so that query text and data are never decoded on the way. Names
+   are encoded and messages decoded by sedna.py. */
+%begin %{
+#define SWIG_PYTHON_STRICT_BYTE_CHAR
+%}
 %{
+#include <limits.h>
 #include "libsedna.h"
 int SEsetConnectionAttrInt(struct SednaConnection * conn, enum SEattr attr, int value)
 {
@@ -10,6 +18,69 @@ int SEsetConnectionAttrStr(struct SednaConnection * conn, enum SEattr attr, char
         return SEsetConnectionAttr(conn,attr,value,strlen(value));
 }
 %}
+/* The GIL is released around every call, so sessions used from different
+   threads do not serialise each other while waiting for the server
+   (SEconnect, SEexecute, SEnext, SEgetData, SEloadData, SEbegin, SEcommit...).
+   Calls which only look at the local connection structure keep the GIL, as
+   releasing it would cost more than the call itself. */
+%nothread SEconnectionStatus;
+%nothread SEtransactionStatus;
+%nothread SEgetLastErrorCode;
+%nothread SEgetLastErrorMsg;
+%nothread SednaConnection::SednaConnection;
+%nothread SednaConnection::~SednaConnection;
+
+/* SEgetData writes straight into any writable buffer (bytearray, memoryview
+   slice, ...). The number of bytes to read is the size of the buffer, so the
+   Python signature is SEgetData(conn, buffer). */
+%typemap(in) (char *buf, int bytes_to_read) (Py_buffer view, int have_view = 0) {
+        if (PyObject_GetBuffer($input, &view, PyBUF_WRITABLE) != 0)
+                SWIG_fail;
+        have_view = 1;
+        $1 = (char *) view.buf;
+        $2 = view.len > INT_MAX ? INT_MAX : (int) view.len;
+}
+%typemap(freearg) (char *buf, int bytes_to_read) {
+        if (have_view$argnum)
+                PyBuffer_Release(&view$argnum);
+}
+/* SEloadData reads from any object exposing a buffer (str, bytearray,
+   memoryview, mmap, ...), so large chunks can be passed without copies. The
+   Python signature is SEloadData(conn, buffer, doc_name, col_name). Buffers
+   longer than INT_MAX are refused rather than truncated; sedna.py splits
+   them. */
+%typemap(in) (const char *buf, int bytes_to_write) (Py_buffer view, int have_view = 0) {
+%#if PY_VERSION_HEX < 0x03000000
+        /* mmap and buffer objects only have the old buffer interface */
+        if (!PyObject_CheckBuffer($input)) {
+                const void *data;
+                Py_ssize_t len;
+                if (PyObject_AsReadBuffer($input, &data, &len) != 0)
+                        SWIG_fail;
+                if (len > INT_MAX) {
+                        PyErr_SetString(PyExc_OverflowError, "buffer is longer than INT_MAX bytes");
+                        SWIG_fail;
+                }
+                $1 = ($1_ltype) data;
+                $2 = (int) len;
+        } else
+%#endif
+        {
+                if (PyObject_GetBuffer($input, &view, PyBUF_SIMPLE) != 0)
+                        SWIG_fail;
+                have_view = 1;
+                if (view.len > INT_MAX) {
+                        PyErr_SetString(PyExc_OverflowError, "buffer is longer than INT_MAX bytes");
+                        SWIG_fail;
+                }
+                $1 = ($1_ltype) view.buf;
+                $2 = (int) view.len;
+        }
+}
+%typemap(freearg) (const char *buf, int bytes_to_write) {
+        if (have_view$argnum)
+                PyBuffer_Release(&view$argnum);
+}
 /* Note that this is not smart because we introduce some private stuff this way. */ 
 %include "libsedna.h"
 int SEsetConnectionAttrInt(struct SednaConnection *,enum SEattr,int);
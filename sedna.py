@@ -15,70 +15,1149 @@ This exports:
 SednaConnection - class which provides transactions
 and query execution facilities.
 
-SednaException  - encapsulates Sedna errors. 
+SednaConnectionXMLProccessor - parses result items incrementally while
+they are retrieved.
+
+SednaStatement - prepared query.
+
+SednaQueryCache - client-side cache of read-only query results.
+
+SednaXML - marks XML fragments bound as query variables.
+
+SednaResultSet - lazy, pageable query result.
+
+SednaItemStream - file-like access to a single result item.
+
+SednaConnectionPool - thread-safe pool of SednaConnection sessions.
+
+SednaStats - timings, counters and tracing hooks of instrumented sessions.
+
+SednaConnectionThread - runs the calls of one session on a dedicated
+thread and returns SednaFuture objects, so that callers never block.
+The aiosedna module builds an asyncio front-end on it.
+
+SednaBulkLoader - loads many documents in parallel over pooled sessions.
+
+SednaException  - encapsulates Sedna errors. SednaConnectionException
+(lost sessions, worth retrying) and SednaQueryException derive from it;
+SednaLoginException (refused logins) from SednaConnectionException.
+
+SednaRetryPolicy - retry and backoff settings for runTransaction. 
+
+SednaMetadataRegistry - modules, documents and collections of a database,
+shared by all sessions of the process (see metadataRegistry).
 """
 
-import uuid
-import libsedna
-import cStringIO
+import io
+import threading
+import time
+import re
+import math
+import itertools
+import array
+import os
+import mmap
+from contextlib import contextmanager
+from collections import OrderedDict
+try:
+	import Queue as queue
+except ImportError:
+	import queue
+
+# Modules that are slow to import (the native libsedna, uuid, random,
+# ElementTree, gzip, bz2) are imported where they are first used, so that
+# "import sedna" stays cheap for tools which may never connect.
+
+class _LazyModule:
+	"""Stands in for a module until one of its attributes is used, then
+	imports it and puts it in place of itself in this module's globals."""
+	def __init__(self, name):
+		self.__name = name
+	def __getattr__(self, attr):
+		module = __import__(self.__name)
+		globals()[self.__name] = module
+		return getattr(module, attr)
+
+libsedna = _LazyModule('libsedna')
+
+def _uuid4():
+	import uuid
+	return uuid.uuid4()
+
+# Queries, results and loaded data are bytes on both Python 2 and 3. Names
+# (documents, collections, modules) and error messages are native strings.
+if bytes is str:
+	_text = unicode
+	_integerTypes = (int, long)
+	_fileTypes = (file, io.IOBase)
+	_mappableTypes = (file, io.BufferedReader, io.FileIO)
+else:
+	_text = str
+	_integerTypes = (int,)
+	_fileTypes = (io.IOBase,)
+	_mappableTypes = (io.BufferedReader, io.FileIO)
+
+def _bytes(value):
+	"""UTF-8 bytes of text, bytes unchanged."""
+	if isinstance(value, _text):
+		return value.encode("utf-8")
+	return value
+
+def _str(value):
+	"""Native string of text or of UTF-8 bytes."""
+	if isinstance(value, str):
+		return value
+	if isinstance(value, bytes):
+		return value.decode("utf-8")
+	return value.encode("utf-8")
 
 class SednaException(Exception):
+	"""Sedna error. code is the Sedna error code when it is known."""
+	# Whether retrying on a new session may succeed (see SednaRetryPolicy).
+	transient = False
+	def __init__(self, message, code=None):
+		Exception.__init__(self, message)
+		self.code = code
+
+class SednaConnectionException(SednaException):
+	"""The session could not be established, failed or was closed."""
+	transient = True
+
+class SednaLoginException(SednaConnectionException):
+	"""The server refused the login or password. Retrying does not help."""
+	transient = False
+
+class SednaQueryException(SednaException):
+	"""The server rejected a statement or a transaction on a working session."""
 	pass
 
+class SednaRetryPolicy:
+	"""How SednaConnection.runTransaction retries transient failures: up to
+	maxAttempts attempts, waiting initialDelay seconds after the first
+	failure and multiplier times longer after every next one, up to maxDelay.
+	Each delay is randomized between half and all of its value so that
+	clients failing together do not retry together.
+
+	Errors are transient when the session was lost, or when their Sedna
+	error code is listed in transientCodes. Refused logins and errors whose
+	code is listed in permanentCodes (say, that of a missing database) are
+	never retried."""
+
+	def __init__(self,maxAttempts=5,initialDelay=0.1,maxDelay=10.0,multiplier=2.0,transientCodes=(),permanentCodes=()):
+		self.maxAttempts = maxAttempts
+		self.initialDelay = initialDelay
+		self.maxDelay = maxDelay
+		self.multiplier = multiplier
+		self.transientCodes = set(transientCodes)
+		self.permanentCodes = set(permanentCodes)
+	
+	def isTransient(self,ex):
+		if ex.code in self.permanentCodes:
+			return False
+		return ex.transient or ex.code in self.transientCodes
+	
+	def delay(self,attempt):
+		"""Seconds to wait after the given (1 based) failed attempt."""
+		import random
+		delay = min(self.maxDelay, self.initialDelay * self.multiplier ** (attempt - 1))
+		return delay * random.uniform(0.5, 1.0)
+
+_escapeTable = {b'&': b'&amp;', b'"': b'&quot;', b"'": b'&apos;', b'<': b'&lt;', b'>': b'&gt;'}
+_escapePattern = re.compile(b'[&"\'<>]')
+
+def _pyEscape(value):
+	"""XML-escape a query argument in a single pass."""
+	if isinstance(value, _text):
+		value = value.encode("utf-8")
+	elif not isinstance(value, bytes):
+		value = _text(value).encode("utf-8")
+	if _escapePattern.search(value) == None:
+		return value
+	return _escapePattern.sub(lambda m: _escapeTable[m.group(0)], value)
+
+def _pyAssemble(prologue, query, kwargs):
+	"""prologue + (query % kwargs), with every argument escaped."""
+	escaped = {}
+	for arg in kwargs:
+		escaped[_bytes(arg)] = _pyEscape(kwargs[arg])
+	return prologue + (query % escaped)
+
+# The C accelerator produces the same output as the Python versions.
+try:
+	from _sednaspeedups import escape as _escape, assemble as _assemble
+except ImportError:
+	_escape = _pyEscape
+	_assemble = _pyAssemble
+
 class SednaConnectionDefaultProccessor:
+	# combine() receives memoryview slices of the retrieval buffer instead of
+	# copies. They are only valid until the next call.
+	acceptsBuffer = True
 	def initial(self):
-		return cStringIO.StringIO()
+		return io.BytesIO()
 	def combine(self,state,value):
 		state.write(value)
 		return state
 	def postproccess(self,state):
 		temp = state.getvalue();
-		state.truncate(0)
+		state.seek(0)
+		state.truncate()
 		return (state,temp)
 	def hook(self,value):
 		return value;
 
+class SednaConnectionXMLProccessor:
+	"""Processor for resultSequence which feeds every chunk into an
+	incremental expat parser as soon as it arrives, so parsing overlaps with
+	retrieval and the serialized item is never joined into one string.
+
+	XML items come out as ElementTree elements, or as whatever the close()
+	method of target returns when a parser target is given (its start, end
+	and data callbacks are called while the item is being read, SAX style).
+	Atomic items are decoded to int, float or str."""
+
+	__integer = re.compile(r'^[+-]?\d+$')
+	__double = re.compile(r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$')
+
+	def __init__(self,target=None):
+		self.target = target
+	def initial(self):
+		return {'parser': None, 'text': [], 'atomic': False}
+	def combine(self,state,value):
+		if state['parser'] != None:
+			state['parser'].feed(value)
+			return state
+		state['text'].append(value)
+		# The kind of the item is only known once its first non-whitespace
+		# byte arrived, which may be several chunks of whitespace later.
+		if state['atomic'] or not value.strip():
+			return state
+		if value.lstrip().startswith(b'<'):
+			from xml.etree import ElementTree
+			state['parser'] = ElementTree.XMLParser(target=self.target)
+			for chunk in state['text']:
+				state['parser'].feed(chunk)
+			state['text'] = []
+		else:
+			state['atomic'] = True
+		return state
+	def postproccess(self,state):
+		if state['parser'] != None:
+			result = state['parser'].close()
+		else:
+			result = self.decode(_str(b''.join(state['text'])))
+		return (self.initial(),result)
+	def hook(self,value):
+		return value;
+	def decode(self,text):
+		"""Convert the text of an atomic item to int, float or str."""
+		stripped = text.strip()
+		if self.__integer.match(stripped):
+			return int(stripped)
+		if self.__double.match(stripped):
+			return float(stripped)
+		return text
+
+class SednaXML(str):
+	"""Marks a string bound with executeBound as an XML fragment rather than as an xs:string."""
+	pass
+
+_variableName = re.compile(r'^[A-Za-z_][\w.-]*$')
+
+def _xqueryLiteral(value):
+	"""Returns (sequence type, XQuery literal) for a bound Python value."""
+	if isinstance(value, bool):
+		return ('xs:boolean', value and 'fn:true()' or 'fn:false()')
+	if isinstance(value, _integerTypes):
+		return ('xs:integer', str(value))
+	if isinstance(value, float):
+		if value != value:
+			return ('xs:double', 'xs:double("NaN")')
+		if value in (float('inf'), float('-inf')):
+			return ('xs:double', 'xs:double("%sINF")' % (value < 0 and '-' or ''))
+		literal = repr(value)
+		if 'e' not in literal:
+			literal += 'e0' # without an exponent it would be an xs:decimal
+		return ('xs:double', literal)
+	if isinstance(value, SednaXML):
+		return ('node()', value)
+	if isinstance(value, (bytes, _text)):
+		value = _str(value)
+		return ('xs:string', '"%s"' % value.replace('&', '&amp;').replace('"', '""'))
+	if value == None:
+		return ('empty-sequence()', '()')
+	if isinstance(value, (list, tuple)):
+		types = set()
+		literals = []
+		for item in value:
+			(itemType, literal) = _xqueryLiteral(item)
+			if itemType == 'empty-sequence()' or (isinstance(item, (list, tuple)) and not item):
+				continue
+			# sequences are flat, the items of a nested list join the outer one
+			types.add(itemType.rstrip('*'))
+			literals.append(literal)
+		if len(types) == 1:
+			itemType = types.pop()
+		else:
+			itemType = 'item()'
+		return (itemType + '*', '(%s)' % ', '.join(literals))
+	raise SednaException("cannot bind value of type %s" % type(value).__name__)
+
+class _DeclarationCache:
+	"""LRU cache of variable declaration prologues, keyed by the names and types of the bound variables."""
+
+	def __init__(self,size):
+		self.size = size
+		self.__templates = OrderedDict()
+		self.__lock = threading.Lock()
+	
+	def prologue(self,variables):
+		names = sorted(variables)
+		literals = []
+		types = []
+		for name in names:
+			(varType, literal) = _xqueryLiteral(variables[name])
+			types.append(varType)
+			literals.append(literal)
+		key = tuple(zip(names, types))
+		self.__lock.acquire()
+		try:
+			template = self.__templates.pop(key, None)
+			if template == None:
+				template = self.__build(key)
+				if len(self.__templates) >= self.size:
+					self.__templates.popitem(last=False)
+			self.__templates[key] = template
+		finally:
+			self.__lock.release()
+		return _bytes(template % tuple(literals))
+	
+	def __build(self,key):
+		template = ""
+		for (name, varType) in key:
+			if not _variableName.match(name):
+				raise SednaException("invalid variable name %s" % repr(name))
+			template += "declare variable $%s as %s := %%s;\n" % (name, varType)
+		return template
+
+_declarations = _DeclarationCache(256)
+
+_readPattern = re.compile(br'''\b(doc|collection)\s*\(\s*(['"])([^'"]*)\2(?:\s*,\s*(['"])([^'"]*)\4)?''')
+_ddlPattern = re.compile(br'''\b(document|collection)\s+(['"])([^'"]*)\2(?:\s+in\s+collection\s+(['"])([^'"]*)\4)?''', re.I)
+
+def _tags(pattern, query):
+	tags = set()
+	for m in pattern.finditer(query):
+		kind = _str(m.group(1).lower())
+		if kind == 'document':
+			kind = 'doc'
+		tags.add('%s:%s' % (kind, _str(m.group(3))))
+		if m.group(5) != None:
+			tags.add('collection:' + _str(m.group(5)))
+	return tags
+
+def _readTags(query):
+	"""Cache tags of the documents and collections a query reads; '*' if none can be found."""
+	return _tags(_readPattern, query) or set(['*'])
+
+class SednaQueryCache:
+	"""Client-side cache of query results shared by any number of connections.
+
+	Entries are evicted least recently used first once the total size of the
+	cached items exceeds maxBytes, and expire after ttl seconds (None keeps
+	them until evicted or invalidated). Every entry is tagged with the
+	documents and collections its query mentions, so that committed writes
+	only invalidate what they may have changed."""
+
+	def __init__(self,maxBytes=16777216,ttl=None):
+		self.maxBytes = maxBytes
+		self.ttl = ttl
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.size = 0
+		self.__entries = OrderedDict() # query -> (items, size, expiry, tags)
+		self.__tagged = {} # tag -> set of queries
+		self.__generation = 0 # counts the invalidations, so that a result fetched meanwhile is not cached
+		self.__lock = threading.Lock()
+	
+	def get(self,query):
+		"""Cached items of query, or None."""
+		self.__lock.acquire()
+		try:
+			entry = self.__entries.pop(query, None)
+			if entry == None or (entry[2] != None and entry[2] < time.time()):
+				if entry != None:
+					self.__forget(query, entry)
+				self.misses += 1
+				return None
+			self.__entries[query] = entry
+			self.hits += 1
+			return entry[0]
+		finally:
+			self.__lock.release()
+	
+	def generation(self):
+		"""Number of invalidations so far. Read it before running a query
+			and pass it to put, so that a result which may predate a
+			concurrent invalidation is not cached."""
+		return self.__generation
+	
+	def put(self,query,items,tags,generation=None):
+		size = len(query)
+		for item in items:
+			size += len(item)
+		if size > self.maxBytes:
+			return
+		expiry = None
+		if self.ttl != None:
+			expiry = time.time() + self.ttl
+		self.__lock.acquire()
+		try:
+			if generation != None and generation != self.__generation:
+				return
+			old = self.__entries.pop(query, None)
+			if old != None:
+				self.__forget(query, old)
+			while self.size + size > self.maxBytes:
+				(oldest, entry) = self.__entries.popitem(last=False)
+				self.__forget(oldest, entry)
+				self.evictions += 1
+			self.__entries[query] = (items, size, expiry, tags)
+			self.size += size
+			for tag in tags:
+				self.__tagged.setdefault(tag, set()).add(query)
+		finally:
+			self.__lock.release()
+	
+	def invalidate(self,tags=None):
+		"""Drop the entries tagged with any of tags, and the entries whose
+			tags are unknown. Without tags the whole cache is flushed."""
+		self.__lock.acquire()
+		try:
+			self.__generation += 1
+			if tags == None:
+				self.__entries.clear()
+				self.__tagged.clear()
+				self.size = 0
+				return
+			queries = set(self.__tagged.get('*', ()))
+			for tag in tags:
+				queries.update(self.__tagged.get(tag, ()))
+			for query in queries:
+				entry = self.__entries.pop(query, None)
+				if entry != None:
+					self.__forget(query, entry)
+		finally:
+			self.__lock.release()
+	
+	def stats(self):
+		"""Dictionary of the hit, miss and eviction counters and of the cache size."""
+		return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+		        'entries': len(self.__entries), 'bytes': self.size}
+	
+	def __forget(self,query,entry):
+		self.size -= entry[1]
+		for tag in entry[3]:
+			queries = self.__tagged.get(tag)
+			if queries != None:
+				queries.discard(query)
+				if not queries:
+					del self.__tagged[tag]
+
+class SednaMetadataRegistry:
+	"""Metadata of one database shared by all sessions of the process, see metadataRegistry.
+
+	Modules registered with registerModule are imported into the queries of
+	every session of the database, without calling loadModule on each of
+	them. Document and collection lists are fetched on first use and kept
+	up to date with the loads and the DDL statements committed through the
+	driver; changes made by other processes are only seen after invalidate().
+	Lists fetched by a session with an open transaction are not kept, as they
+	include the changes of the transaction."""
+
+	def __init__(self,host,db):
+		self.host = host
+		self.db = db
+		self.version = 0 # changes with the registered modules
+		self.__modules = {}
+		self.__documents = {} # collection name (None for standalone documents) -> set of names
+		self.__collections = None # set of names, None until fetched
+		self.__changes = 0 # counts the changes of the lists, so that a list fetched meanwhile is not cached
+		self.__installed = set() # module files installed with installModule
+		self.__lock = threading.Lock()
+	
+	def registerModule(self,name,namespace):
+		"""Import namespace as name into the queries of all sessions."""
+		self.__lock.acquire()
+		try:
+			self.__modules[name] = namespace
+			self.version += 1
+		finally:
+			self.__lock.release()
+		return self
+	
+	def unregisterModule(self,name):
+		self.__lock.acquire()
+		try:
+			if name not in self.__modules:
+				raise SednaException("Module not registered")
+			del self.__modules[name]
+			self.version += 1
+		finally:
+			self.__lock.release()
+		return self
+	
+	def modules(self):
+		"""Dictionary of the registered module names and namespaces."""
+		self.__lock.acquire()
+		try:
+			return dict(self.__modules)
+		finally:
+			self.__lock.release()
+	
+	def isInstalled(self,module):
+		"""Whether the module file was installed with installModule by this process."""
+		return module in self.__installed
+	
+	def documents(self,conn,collection=None):
+		"""Set of the names of the documents in collection, or of the
+			standalone documents. conn fetches the list if it is not known."""
+		self.__lock.acquire()
+		try:
+			names = self.__documents.get(collection)
+			if names != None:
+				return set(names)
+		finally:
+			self.__lock.release()
+		(names, changes) = self.__fetch(conn, lambda: conn.documentNames(collection))
+		self.__lock.acquire()
+		try:
+			if changes == self.__changes:
+				self.__documents[collection] = names
+		finally:
+			self.__lock.release()
+		return set(names)
+	
+	def hasDocument(self,conn,doc,collection=None):
+		self.__lock.acquire()
+		try:
+			names = self.__documents.get(collection)
+			if names != None:
+				return doc in names
+		finally:
+			self.__lock.release()
+		return doc in self.documents(conn, collection)
+	
+	def collections(self,conn):
+		"""Set of the names of the collections. conn fetches the list if it is not known."""
+		self.__lock.acquire()
+		try:
+			if self.__collections != None:
+				return set(self.__collections)
+		finally:
+			self.__lock.release()
+		(names, changes) = self.__fetch(conn, conn.collectionNames)
+		self.__lock.acquire()
+		try:
+			if changes == self.__changes:
+				self.__collections = names
+		finally:
+			self.__lock.release()
+		return set(names)
+	
+	def __fetch(self, conn, query):
+		"""Set of the names query returns, and the value of the change
+			counter the set may be cached for (None if it may not)."""
+		if conn.isTransactionActive():
+			# The names would include what the transaction did not commit yet.
+			return (set(query()), None)
+		changes = self.__changes
+		with conn.transaction(readonly=True):
+			names = set(query())
+		return (names, changes)
+	
+	def invalidate(self,tags=None):
+		"""Forget the lists tagged with any of tags ('doc:name' forgets the
+			standalone documents, 'collection:name' the collection and the
+			list of collections). Without tags everything but the registered
+			modules is forgotten."""
+		self.__lock.acquire()
+		try:
+			self.__changes += 1
+			if tags == None or '*' in tags:
+				self.__documents.clear()
+				self.__collections = None
+				self.__installed.clear()
+				return
+			for tag in tags:
+				(kind, name) = tag.split(':', 1)
+				if kind == 'doc':
+					self.__documents.pop(None, None)
+				else:
+					self.__documents.pop(name, None)
+					self.__collections = None
+		finally:
+			self.__lock.release()
+	
+	def _apply(self,changes):
+		"""Record the changes a session committed, see SednaConnection.endTransaction."""
+		for change in changes:
+			if change[0] == 'load':
+				(kind, doc, collection) = change
+				self.__lock.acquire()
+				try:
+					self.__changes += 1
+					names = self.__documents.get(collection)
+					if names != None:
+						names.add(doc)
+					if collection != None and self.__collections != None:
+						self.__collections.add(collection)
+				finally:
+					self.__lock.release()
+			elif change[0] == 'install':
+				self.__installed.add(change[1])
+			elif change[0] == 'remove':
+				self.__installed.clear()
+			else:
+				self.invalidate(change[1])
+
+_registries = {}
+_registriesLock = threading.Lock()
+
+def metadataRegistry(host, db):
+	"""The SednaMetadataRegistry shared by all sessions of db on host."""
+	registry = _registries.get((host, db))
+	if registry != None:
+		return registry
+	_registriesLock.acquire()
+	try:
+		registry = _registries.get((host, db))
+		if registry == None:
+			registry = _registries[(host, db)] = SednaMetadataRegistry(host, db)
+		return registry
+	finally:
+		_registriesLock.release()
+
+class SednaHistogram:
+	"""Timing histogram with power-of-two millisecond buckets."""
+
+	def __init__(self):
+		self.count = 0
+		self.total = 0.0
+		self.max = 0.0
+		self.buckets = {} # upper bound in ms -> count
+	
+	def add(self,seconds):
+		self.count += 1
+		self.total += seconds
+		if seconds > self.max:
+			self.max = seconds
+		bound = 1 << max(math.frexp(seconds * 1000.0)[1], 0)
+		self.buckets[bound] = self.buckets.get(bound, 0) + 1
+	
+	def merge(self,other):
+		self.count += other.count
+		self.total += other.total
+		self.max = max(self.max, other.max)
+		# other may be recording on another thread, copying is atomic
+		for (bound, count) in other.buckets.copy().items():
+			self.buckets[bound] = self.buckets.get(bound, 0) + count
+	
+	def snapshot(self):
+		mean = 0.0
+		if self.count:
+			mean = self.total / self.count
+		return {'count': self.count, 'total': self.total, 'mean': mean, 'max': self.max,
+		        'buckets': dict(self.buckets)}
+
+class SednaStats:
+	"""Counters, timing histograms and tracing hooks of an instrumented SednaConnection."""
+
+	timers = ('connect', 'begin', 'execute', 'firstItem', 'loadData', 'commit', 'rollback', 'transaction')
+	counters = ('items', 'getDataCalls', 'getDataBytes', 'loadDataBytes')
+	events = ('beforeQuery', 'afterQuery', 'item')
+
+	def __init__(self):
+		self.__timers = dict((name, SednaHistogram()) for name in self.timers)
+		self.__counters = dict.fromkeys(self.counters, 0)
+		self.__hooks = dict((event, []) for event in self.events)
+	
+	def time(self,name,seconds):
+		self.__timers[name].add(seconds)
+	
+	def count(self,name,n=1):
+		self.__counters[name] += n
+	
+	def addHook(self,event,fn):
+		if event not in self.__hooks:
+			raise SednaException("unknown event %s" % repr(event))
+		self.__hooks[event].append(fn)
+	
+	def fire(self,event,*args):
+		for fn in self.__hooks[event]:
+			fn(*args)
+	
+	def merge(self,other):
+		for name in self.timers:
+			self.__timers[name].merge(other.__timers[name])
+		for name in self.counters:
+			self.__counters[name] += other.__counters[name]
+	
+	def snapshot(self):
+		result = dict(self.__counters)
+		for name in self.timers:
+			result[name] = self.__timers[name].snapshot()
+		return result
+
+class SednaStatement:
+	"""Query prepared with SednaConnection.prepare.
+
+	The encoded query text and its module import prologue are cached; they
+	are only rebuilt when modules are loaded or unloaded on the connection."""
+
+	def __init__(self,conn,query):
+		self.connection = conn
+		self.query = _bytes(query)
+		self.__prologue = None
+		self.__text = None # prologue + query, when no arguments are used
+	
+	def text(self,**kwargs):
+		"""Query text as sent to the server."""
+		prologue = self.connection._prologue()
+		if kwargs:
+			return _assemble(prologue, self.query, kwargs)
+		if prologue is not self.__prologue:
+			self.__prologue = prologue
+			self.__text = prologue + (self.query % kwargs)
+		return self.__text
+	
+	def execute(self,**kwargs):
+		"""Execute the statement. Arguments are escaped as in SednaConnection.execute."""
+		return self.connection._execute(self.text(**kwargs))
+	
+	def executeBound(self,variables):
+		"""Execute the statement with typed variable bindings, see SednaConnection.executeBound."""
+		return self.connection._execute(self.connection._prologue() + _declarations.prologue(variables) + self.query)
+
+class SednaBatchResult:
+	"""Outcome of SednaConnection.runBatch and executeMany."""
+
+	def __init__(self):
+		self.executed = 0
+		self.failures = [] # (statement index, arguments, error message)
+
+class SednaBatch:
+	"""Statements collected by SednaConnection.batch."""
+
+	def __init__(self,conn):
+		self.connection = conn
+		self.statements = []
+		self.result = None
+	
+	def add(self,query,**kwargs):
+		"""Queue query, arguments are escaped as in SednaConnection.execute."""
+		self.statements.append((self.connection._queryText(query, dict(kwargs)), kwargs))
+		return self
+
+# Queries starting with a prologue cannot be wrapped in another expression.
+_prologuePattern = re.compile(br'^\s*(declare|import|xquery)\s', re.I)
+
+class SednaResultSet:
+	"""Lazy result of SednaConnection.query.
+
+	first, take, page and count push the limit into the query, wrapping it
+	in subsequence() or count(), so the server only sends what is needed.
+	Queries with their own prologue (declare/import) cannot be wrapped; for
+	them the full result is fetched and cut on the client. Iterating runs
+	the whole query and fetches items as they are consumed; close() stops
+	fetching. Like resultSequence, a result set must be consumed before the
+	connection executes another query."""
+
+	def __init__(self,conn,query,kwargs):
+		self.connection = conn
+		self.query = _assemble(b'', _bytes(query), kwargs)
+		self.__pushdown = _prologuePattern.match(self.query) == None
+		self.__items = None
+	
+	def __run(self,query):
+		return self.connection._execute(self.connection._prologue() + query).resultSequence()
+	
+	def __iter__(self):
+		self.close()
+		self.__items = self.__run(self.query)
+		return self.__items
+	
+	def page(self,offset,size):
+		"""List of at most size items, starting with item number offset (0 based)."""
+		self.close()
+		if size <= 0:
+			return []
+		if not self.__pushdown:
+			return list(itertools.islice(self.__run(self.query), offset, offset + size))
+		return list(self.__run(b"subsequence((%s), %d, %d)" % (self.query, offset + 1, size)))
+	
+	def take(self,n):
+		"""List of the first n items."""
+		return self.page(0, n)
+	
+	def first(self):
+		"""First item, or None if the result is empty."""
+		items = self.take(1)
+		if items:
+			return items[0]
+		return None
+	
+	def count(self):
+		"""Number of items in the result."""
+		self.close()
+		if not self.__pushdown:
+			n = 0
+			for item in self.__run(self.query):
+				n += 1
+			return n
+		return int(list(self.__run(b"count((%s))" % self.query))[0])
+	
+	def close(self):
+		"""Stop fetching the items of a running iteration."""
+		if self.__items != None:
+			self.__items.close()
+			self.__items = None
+
+_integerCodes = 'bBhHiIlLqQ'
+_floatCodes = 'fd'
+
+class _ColumnParser:
+	"""Parses rows of delimited numbers into one array per column, see SednaConnection.fetchColumns."""
+
+	def __init__(self,dtypes,delimiter,numpy=None):
+		self.delimiter = _bytes(delimiter)
+		self.rows = 0
+		self.__numpy = numpy
+		if numpy != None:
+			dtypes = [numpy.dtype(dtype) for dtype in dtypes]
+			# One parse for all columns: exact for integers unless a column is fractional
+			self.__parseType = numpy.int64
+			for dtype in dtypes:
+				if dtype.kind not in 'iu':
+					self.__parseType = numpy.float64
+			self.columns = [numpy.empty(1024, dtype) for dtype in dtypes]
+		else:
+			self.__convert = []
+			for dtype in dtypes:
+				if dtype in _integerCodes:
+					self.__convert.append(int)
+				elif dtype in _floatCodes:
+					self.__convert.append(float)
+				else:
+					raise SednaException("unsupported column type %s" % repr(dtype))
+			self.columns = [array.array(dtype) for dtype in dtypes]
+	
+	def feed(self,data):
+		"""Parse data, which holds complete rows separated by newlines."""
+		if not data.strip():
+			return
+		rows = data.count(b'\n') + 1
+		width = len(self.columns)
+		text = data.replace(self.delimiter, b' ')
+		if self.__numpy != None:
+			try:
+				values = self.__numpy.fromstring(text, self.__parseType, sep=' ')
+			except ValueError as ex:
+				# NumPy 2 raises instead of stopping at the first bad value
+				raise SednaException("cannot parse rows: %s" % ex)
+			if values.size != rows * width:
+				raise SednaException("expected %d values in each of %d rows, got %d" % (width, rows, values.size))
+			values = values.reshape(rows, width)
+			self.__reserve(self.rows + rows)
+			for (i, column) in enumerate(self.columns):
+				column[self.rows:self.rows + rows] = values[:, i]
+		else:
+			tokens = text.split()
+			if len(tokens) != rows * width:
+				raise SednaException("expected %d values in each of %d rows, got %d" % (width, rows, len(tokens)))
+			try:
+				for (i, column) in enumerate(self.columns):
+					column.extend(map(self.__convert[i], tokens[i::width]))
+			except (ValueError, OverflowError) as ex:
+				raise SednaException("cannot parse column %d: %s" % (i, ex))
+		self.rows += rows
+	
+	def __reserve(self,size):
+		# numpy arrays double, array.array grows geometrically on its own
+		capacity = len(self.columns[0])
+		if size > capacity:
+			capacity = max(size, capacity * 2)
+			for column in self.columns:
+				column.resize(capacity, refcheck=False)
+	
+	def result(self):
+		if self.__numpy != None:
+			for column in self.columns:
+				column.resize(self.rows, refcheck=False)
+		return self.columns
+
+class SednaItemStream:
+	"""File-like object reading one result item lazily, chunk by chunk.
+
+	Returned by SednaConnection.iterItems. The stream is only valid until the
+	iterator advances; the unread rest of the item is then skipped."""
+
+	def __init__(self,conn,buf):
+		self.__conn = conn
+		self.__buf = buf
+		self.__pending = b''
+		self.__exhausted = False
+		self.closed = False
+	
+	def __nextChunk(self):
+		if self.__exhausted:
+			return b''
+		status = self.__conn._getData(self.__buf)
+		if status == 0:
+			self.__exhausted = True
+			return b''
+		return self.__buf[:status].tobytes()
+	
+	def read(self,size=-1):
+		"""Read up to size bytes, or the rest of the item if size is negative."""
+		parts = [self.__pending]
+		have = len(self.__pending)
+		while size < 0 or have < size:
+			chunk = self.__nextChunk()
+			if not chunk:
+				break
+			parts.append(chunk)
+			have += len(chunk)
+		data = b''.join(parts)
+		if size < 0 or have <= size:
+			self.__pending = b''
+			return data
+		self.__pending = data[size:]
+		return data[:size]
+	
+	def readinto(self,b):
+		"""Read directly into the writable buffer b. Returns the number of bytes read, 0 at the end of the item."""
+		view = memoryview(b)
+		if self.__pending:
+			n = min(len(view), len(self.__pending))
+			view[:n] = self.__pending[:n]
+			self.__pending = self.__pending[n:]
+			return n
+		if self.__exhausted or len(view) == 0:
+			return 0
+		status = self.__conn._getData(view)
+		if status == 0:
+			self.__exhausted = True
+		return status
+	
+	def __iter__(self):
+		"""Iterate over the remaining chunks of the item."""
+		if self.__pending:
+			chunk = self.__pending
+			self.__pending = b''
+			yield chunk
+		while True:
+			chunk = self.__nextChunk()
+			if not chunk:
+				break
+			yield chunk
+	
+	def close(self):
+		"""Skip the rest of the item."""
+		self.__pending = b''
+		while not self.__exhausted:
+			if self.__conn._getData(self.__buf) == 0:
+				self.__exhausted = True
+		self.closed = True
+
+# Largest chunk SEloadData accepts, its length is an int.
+_maxLoadData = 2147483647
+
 class SednaConnection:
 
-	def __init__(self,host,db,login="SYSTEM",passwd="MANAGER"):
+	def __init__(self,host,db,login="SYSTEM",passwd="MANAGER",instrument=False):
 		"""Initializes new SednaConnection
 
 			host: host name or IP address
 			db: database name
 			login: user name (default SYSTEM)
 			passwd: user password (default MANAGER)
+			instrument: collect timings and counters from the start (see stats)
 
 			Raises SednaException if connection could not be established."""
+		self._stats = None
+		if instrument:
+			self._stats = SednaStats()
+		self.host = host
+		self.db = db
+		self.__login = (login, passwd)
+		self.__connect()
+		self.__executedAt = None
+		self.__modules = {}
+		self.__prologue = None
+		self.metadata = metadataRegistry(host, db)
+		self.__metadataVersion = None # registry version the prologue was built for
+		self.__metadataChanges = [] # changes of the current transaction, see SednaMetadataRegistry._apply
+		self.__temp_documents = set() # standalone temporary documents
+		self.__temp_collection = None # name of the scratch collection, once used
+		self.__temp_collection_used = False
+		self.__temp_collection_created = False
+		self.bytesLoaded = 0
+		self.cache = None
+		self.__writeTags = None # cache tags written in the current transaction
+		self.__readonly = None # concurrency mode set on the session, None for the server default
+		self.__begunAt = None
+	
+	def __connect(self):
+		start = time.time()
 		self.sednaConnection = libsedna.SednaConnection()
-		if libsedna.SEconnect(self.sednaConnection,host,db,login,passwd) != libsedna.SEDNA_SESSION_OPEN:
+		status = libsedna.SEconnect(self.sednaConnection,_bytes(self.host),_bytes(self.db),_bytes(self.__login[0]),_bytes(self.__login[1]))
+		if status == libsedna.SEDNA_AUTHENTICATION_FAILED:
+			self.__raiseException(SednaLoginException)
+		if status != libsedna.SEDNA_SESSION_OPEN:
 			self.__raiseException()
 		if libsedna.SEsetConnectionAttrInt(self.sednaConnection,libsedna.SEDNA_ATTR_AUTOCOMMIT,libsedna.SEDNA_AUTOCOMMIT_OFF) != libsedna.SEDNA_SET_ATTRIBUTE_SUCCEEDED:
 			self.__raiseException()
-		self.__modules = {}
-		self.__temp_documents = []
+		if self._stats != None:
+			self._stats.time('connect', time.time() - start)
+	
+	def reconnect(self):
+		"""Replace the session with a new one. Loaded modules are kept, the
+			state of the old transaction (temporary documents) is forgotten."""
+		try:
+			if libsedna.SEconnectionStatus(self.sednaConnection) == libsedna.SEDNA_CONNECTION_OK:
+				libsedna.SEclose(self.sednaConnection)
+		except Exception:
+			pass
+		self.__temp_documents = set()
+		self.__temp_collection_created = False
+		self.__writeTags = None
+		self.__metadataChanges = []
+		self.__readonly = None
+		self.__connect()
+		return self
+	
+	def runTransaction(self, fn, policy=None):
+		"""Run fn(connection) in a transaction and commit, retrying on transient errors.
+
+			fn: function doing the work of the transaction; it may be called
+			    several times, so it must not have side effects outside of
+			    the database
+			policy: SednaRetryPolicy (defaults to SednaRetryPolicy())
+
+			When a transient error occurs the transaction is rolled back, or
+			the session is replaced if it was lost, and fn is run again after
+			a delay. Returns what fn returned.
+
+			When a transaction is already active fn simply joins it, as with
+			transaction(): it is run once, and neither committed nor retried
+			nor rolled back, as that is left to the code that started the
+			outer transaction."""
+		if self.status() == 'ok' and self.isTransactionActive():
+			return fn(self)
+		if policy == None:
+			policy = SednaRetryPolicy()
+		attempt = 0
+		while True:
+			attempt += 1
+			began = False
+			try:
+				if self.status() != 'ok':
+					self.reconnect()
+				self.beginTransaction()
+				began = True
+				result = fn(self)
+				self.commit()
+				return result
+			except SednaException as ex:
+				if began:
+					self.__abandon()
+				if attempt >= policy.maxAttempts or not policy.isTransient(ex):
+					raise
+			except:
+				if began:
+					self.__abandon()
+				raise
+			time.sleep(policy.delay(attempt))
+	
+	def __abandon(self):
+		try:
+			if self.status() == 'ok' and self.isTransactionActive():
+				self.rollback()
+		except SednaException:
+			pass
 	
 	def close(self):
 		"""Close the connection. A closed connection cannot be used for further operations."""
 		if libsedna.SEclose(self.sednaConnection)!= libsedna.SEDNA_SESSION_CLOSED:
 			self.__raiseException()
 	
-	def beginTransaction(self):
-		"""Start a new transaction."""
+	def beginTransaction(self, readonly=False):
+		"""Start a new transaction.
+
+			readonly: run it as a read-only transaction, which the server
+			          does not have to lock for updates. Only servers whose
+			          C API has SEDNA_ATTR_CONCURRENCY_TYPE support it; others
+			          run an ordinary transaction."""
+		self.__setReadOnly(readonly)
+		start = time.time()
 		if libsedna.SEbegin(self.sednaConnection)!= libsedna.SEDNA_BEGIN_TRANSACTION_SUCCEEDED:
 			self.__raiseException()
+		if self._stats != None:
+			self.__begunAt = time.time()
+			self._stats.time('begin', self.__begunAt - start)
 		return self
+	
+	def __setReadOnly(self, readonly):
+		# The mode sticks to the session, so it is only sent when it changes.
+		if readonly == bool(self.__readonly):
+			return
+		attr = getattr(libsedna, 'SEDNA_ATTR_CONCURRENCY_TYPE', None)
+		if attr == None:
+			return
+		if readonly:
+			mode = libsedna.SEDNA_READONLY_TRANSACTION
+		else:
+			mode = libsedna.SEDNA_UPDATE_TRANSACTION
+		if libsedna.SEsetConnectionAttrInt(self.sednaConnection, attr, mode) != libsedna.SEDNA_SET_ATTRIBUTE_SUCCEEDED:
+			self.__raiseException()
+		self.__readonly = readonly
 
 	def endTransaction(self,how):
 		"""Finish the transaction.
 
 			how: either 'commit' or 'rollback'"""
-		for doc in self.__temp_documents:
-			self.dropDocument(doc)
-		self.__temp_documents = []
 		if how not in ['commit','rollback']:
 			raise SednaException("expecting %s or %s, not %s"%(repr('commit'),repr('rollback'),repr(how)))
+		# Temporary documents were created by this transaction, a rollback removes them anyway.
+		if how == 'commit':
+			if self.__temp_collection_created:
+				self.execute('DROP COLLECTION "%s"' % self.__temp_collection)
+			for doc in self.__temp_documents:
+				self.dropDocument(doc)
+		self.__temp_documents = set()
+		self.__temp_collection_created = False
+		writeTags = self.__writeTags
+		self.__writeTags = None
+		metadataChanges = self.__metadataChanges
+		self.__metadataChanges = []
+		start = time.time()
 		if {'commit':libsedna.SEcommit, 'rollback':libsedna.SErollback}[how](self.sednaConnection) not in [libsedna.SEDNA_COMMIT_TRANSACTION_SUCCEEDED, libsedna.SEDNA_ROLLBACK_TRANSACTION_SUCCEEDED]:
 			self.__raiseException()
+		if self._stats != None:
+			end = time.time()
+			self._stats.time(how, end - start)
+			if self.__begunAt != None:
+				self._stats.time('transaction', end - self.__begunAt)
+				self.__begunAt = None
+		if how == 'commit' and metadataChanges:
+			self.metadata._apply(metadataChanges)
+		if how == 'commit' and writeTags != None and self.cache != None:
+			if '*' in writeTags:
+				self.cache.invalidate()
+			else:
+				self.cache.invalidate(writeTags)
 		return self
 
 	def commit(self):
@@ -86,40 +1165,171 @@ class SednaConnection:
 	
 	def rollback(self):
 		return self.endTransaction('rollback')
+	
+	@contextmanager
+	def transaction(self, readonly=False):
+		"""Context manager running the block in a transaction, committed on
+			success and rolled back on error.
+
+			readonly: start a read-only transaction, see beginTransaction
+
+			When a transaction is already active the block simply joins it:
+			nothing is begun or committed, and errors are left to the code
+			that started the outer transaction. Nested blocks therefore cost
+			no round-trips; a read-only outer transaction stays read-only."""
+		if self.isTransactionActive():
+			yield self
+			return
+		self.beginTransaction(readonly)
+		try:
+			yield self
+		except:
+			if self.status() == 'ok' and self.isTransactionActive():
+				self.rollback()
+			raise
+		self.commit()
 
 	def installModule(self, module, replace = False):
+		# Modules this process installed before are known to be there.
+		if not replace and self.metadata.isInstalled(module):
+			return self
 		qs = 'LOAD'
 		if replace: qs += ' OR REPLACE'
 		qs += ' MODULE "%s"' % module
-		return self.execute(qs)
+		self.execute(qs)
+		self.__metadataChanges.append(('install', module))
+		return self
 	
 	def removeModule(self, namespace):
-		return self.execute("DROP MODULE '%s'" % namespace)
+		self.execute("DROP MODULE '%s'" % namespace)
+		self.__metadataChanges.append(('remove',))
+		return self
 
 	def execute(self,query,**kwargs):
 		"""Execute query.
 
 			query: query to execute (string)"""
-		if isinstance(query, unicode):
-			query = query.encode("utf-8")
-		
-		for arg in kwargs:
-			kwargs[arg] = kwargs[arg].encode("utf-8").replace('&', '&amp;').replace('"', '&quot;').\
-			                                          replace("'", "&apos;").replace('<', '&lt;').\
-			                                          replace('>', '&gt;')
-		
-		imports = ""
-		for name in self.__modules:
-			imports += "import module namespace %s = '%s';\n" % (name, self.__modules[name])
-		
-		query = imports + (query % kwargs)
+		return self._execute(self._queryText(query, kwargs))
+	
+	def _queryText(self, query, kwargs):
+		return _assemble(self._prologue(), _bytes(query), kwargs)
+	
+	def setCache(self, cache):
+		"""Use cache (a SednaQueryCache, which may be shared between
+			connections) for cachedQuery. None disables caching."""
+		self.cache = cache
+		return self
+	
+	def cachedQuery(self, query, **kwargs):
+		"""Execute a read-only query and return its result as a list.
+
+			query, kwargs: as for execute
+
+			The result is served from the cache set with setCache when
+			possible. The cache is bypassed while the current transaction
+			has written anything. Entries are invalidated when updates or
+			loads issued through the driver are committed."""
+		text = self._queryText(query, kwargs)
+		if self.cache == None or self.__writeTags != None:
+			return list(self._execute(text).resultSequence())
+		generation = self.cache.generation()
+		items = self.cache.get(text)
+		if items == None:
+			items = list(self._execute(text).resultSequence())
+			if self.__writeTags != None:
+				return items
+			self.cache.put(text, items, _readTags(text), generation)
+		return list(items)
+	
+	def __wrote(self, tags):
+		if self.__writeTags == None:
+			self.__writeTags = set()
+		if tags:
+			self.__writeTags.update(tags)
+		else:
+			self.__writeTags.add('*')
+	
+	def executeBound(self,query,variables):
+		"""Execute query with typed variable bindings.
+
+			query: query to execute (string). It is sent as is (no %
+			       interpolation) and refers to the bindings as $name.
+			variables: dictionary of variable names to values: int, long,
+			           float, bool, bytes, text, SednaXML fragments, None
+			           (empty sequence) or lists and tuples of these
+
+			Every binding becomes a typed "declare variable" in the query
+			prologue, so the query body stays the same across calls and
+			nothing needs escaping by the caller. The query itself must not
+			contain prologue declarations that have to precede variable
+			declarations (namespace declarations, imports)."""
+		return self._execute(self._prologue() + _declarations.prologue(variables) + _bytes(query))
+	
+	def query(self,query,**kwargs):
+		"""Lazy result of query, see SednaResultSet.
+
+			query, kwargs: as for execute
 
-		if libsedna.SEexecute(self.sednaConnection,query) not in [libsedna.SEDNA_QUERY_SUCCEEDED, libsedna.SEDNA_UPDATE_SUCCEEDED, libsedna.SEDNA_BULK_LOAD_SUCCEEDED]:
+			Nothing is sent to the server until the result set is used."""
+		return SednaResultSet(self, query, kwargs)
+	
+	def prepare(self,query):
+		"""Prepare query for repeated execution.
+
+			query: query to execute (string), with the same %(name)s
+			       placeholders execute accepts
+
+			Returns a SednaStatement."""
+		return SednaStatement(self, query)
+	
+	def _prologue(self):
+		"""Module imports prepended to every query, rebuilt only when the set of loaded modules changes."""
+		if self.__prologue == None or self.__metadataVersion != self.metadata.version:
+			self.__metadataVersion = self.metadata.version
+			modules = self.metadata.modules()
+			modules.update(self.__modules)
+			imports = ""
+			for name in modules:
+				imports += "import module namespace %s = '%s';\n" % (name, modules[name])
+			self.__prologue = _bytes(imports)
+		return self.__prologue
+	
+	def _execute(self,query):
+		stats = self._stats
+		if stats != None:
+			stats.fire('beforeQuery', self, query)
+			start = time.time()
+		status = libsedna.SEexecute(self.sednaConnection,query)
+		if stats != None:
+			self.__executedAt = time.time()
+			stats.time('execute', self.__executedAt - start)
+			stats.fire('afterQuery', self, query, self.__executedAt - start)
+		if status not in [libsedna.SEDNA_QUERY_SUCCEEDED, libsedna.SEDNA_UPDATE_SUCCEEDED, libsedna.SEDNA_BULK_LOAD_SUCCEEDED]:
 			self.__raiseException()
+		if status != libsedna.SEDNA_QUERY_SUCCEEDED:
+			ddl = _tags(_ddlPattern, query)
+			self.__wrote(_tags(_readPattern, query) | ddl)
+			if status == libsedna.SEDNA_BULK_LOAD_SUCCEEDED:
+				self.__metadataChanges.append(('invalidate', None))
+			elif ddl:
+				self.__ddlExecuted(ddl)
 		return self
 	
+	def __ddlExecuted(self, tags):
+		# The scratch collection and temporary documents never outlive the transaction.
+		temporary = set('doc:' + doc for doc in self.__temp_documents)
+		if self.__temp_collection != None:
+			temporary.add('collection:' + self.__temp_collection)
+		tags = tags - temporary
+		if tags:
+			self.__metadataChanges.append(('invalidate', tags))
+	
 	def update(self, query, begin_transaction = True, commit_transaction = True,
 	                 close_connection = False, **kwargs):
+		if begin_transaction and self.isTransactionActive():
+			# Part of a running transaction, which its owner commits.
+			self.execute(query, **kwargs)
+			return self
 		if begin_transaction:
 			self.beginTransaction()
 		self.execute(query, **kwargs)
@@ -130,6 +1340,79 @@ class SednaConnection:
 				return None
 		return self
 	
+	def executeMany(self, query, params, maxBatchSize=1048576):
+		"""Execute query once for every set of arguments.
+
+			query: update statement with %(name)s placeholders, as for execute
+			params: iterable of dictionaries of arguments
+			maxBatchSize: number of bytes of statement text run per transaction
+
+			See runBatch for how transactions and failures are handled.
+			Returns a SednaBatchResult."""
+		statement = self.prepare(query)
+		return self.runBatch(((statement.text(**dict(args)), args) for args in params), maxBatchSize)
+	
+	@contextmanager
+	def batch(self, maxBatchSize=1048576):
+		"""Context manager collecting statements with add(query, **kwargs)
+			and running them with runBatch when the block ends. The
+			SednaBatch keeps the SednaBatchResult in its result attribute."""
+		batch = SednaBatch(self)
+		yield batch
+		batch.result = self.runBatch(batch.statements, maxBatchSize)
+	
+	def runBatch(self, statements, maxBatchSize=1048576):
+		"""Execute many statements with as few transactions as possible.
+
+			statements: iterable of (query text, arguments) pairs; the
+			            arguments only identify the statement in failures
+			maxBatchSize: number of bytes of statement text run per transaction
+
+			Statements are grouped and every group runs in one transaction,
+			instead of paying SEbegin and SEcommit per statement. A failing
+			statement is reported in the result and left out; if the server
+			rolled the transaction back because of it, the rest of its group
+			is run again. When a transaction is already active all statements
+			run in it and nothing is committed."""
+		result = SednaBatchResult()
+		if self.isTransactionActive():
+			for (index, (text, args)) in enumerate(statements):
+				try:
+					self._execute(text)
+					result.executed += 1
+				except SednaException as ex:
+					result.failures.append((index, args, str(ex)))
+			return result
+		group = []
+		size = 0
+		for (index, (text, args)) in enumerate(statements):
+			if group and size + len(text) > maxBatchSize:
+				self.__runGroup(group, result)
+				group = []
+				size = 0
+			group.append((index, text, args))
+			size += len(text)
+		if group:
+			self.__runGroup(group, result)
+		return result
+	
+	def __runGroup(self, group, result):
+		self.beginTransaction()
+		pos = 0
+		while pos < len(group):
+			(index, text, args) = group[pos]
+			try:
+				self._execute(text)
+				pos += 1
+			except SednaException as ex:
+				result.failures.append((index, args, str(ex)))
+				del group[pos]
+				if not self.isTransactionActive():
+					self.beginTransaction()
+					pos = 0
+		self.commit()
+		result.executed += len(group)
+	
 	def status(self):
 		"""status(self) -> string
 
@@ -145,33 +1428,207 @@ class SednaConnection:
 	def isTransactionActive(self):
 		return True if libsedna.SEtransactionStatus(self.sednaConnection) == libsedna.SEDNA_TRANSACTION_ACTIVE else False
 	
-	def resultSequence(self,hook=None,proccessor=None,bufferSize=4096):
-		"""Retrieve result of query execution"""
+	def resultSequence(self,hook=None,proccessor=None,bufferSize=4096,maxBufferSize=1048576,encoding=None):
+		"""Retrieve result of query execution
+
+			hook: function applied to every retrieved chunk
+			proccessor: object combining chunks into items (see SednaConnectionDefaultProccessor)
+			bufferSize: initial size of the retrieval buffer
+			maxBufferSize: the buffer doubles, up to this size, after every item
+			               that did not fit in it
+			encoding: decode the items the processor returns as bytes to text
+			          with this encoding (by default they stay bytes)
+
+			Chunks are read into a single reusable buffer. Processors that set
+			acceptsBuffer (and do not use a custom hook) get memoryview slices of
+			it, others get copies as bytes."""
 		if proccessor == None:
 			proccessor = SednaConnectionDefaultProccessor()
 		if hook == None:
 			hook = proccessor.hook
-		buf = '\000' * bufferSize
+		zeroCopy = getattr(proccessor, 'acceptsBuffer', False) and hook == proccessor.hook
+		stats = self._stats
+		buf = memoryview(bytearray(bufferSize))
 		state = proccessor.initial()
 		status = libsedna.SEnext(self.sednaConnection)
+		if stats != None:
+			self.__firstItem(stats, status)
 		while status == libsedna.SEDNA_NEXT_ITEM_SUCCEEDED:
+			chunks = 0
+			size = 0
 			while True:
-				status = libsedna.SEgetData(self.sednaConnection, buf, bufferSize)
+				status = libsedna.SEgetData(self.sednaConnection, buf)
 				if status == 0:
 					break
 				if status < 0:
 					self.__raiseException()
-				state = proccessor.combine(state,hook(buf[:status]))
+				if zeroCopy:
+					state = proccessor.combine(state,hook(buf[:status]))
+				else:
+					state = proccessor.combine(state,hook(buf[:status].tobytes()))
+				chunks += 1
+				size += status
 			(state,result) = proccessor.postproccess(state)
+			if encoding != None and isinstance(result, bytes):
+				result = result.decode(encoding)
+			if stats != None:
+				stats.count('items')
+				stats.count('getDataCalls', chunks + 1)
+				stats.count('getDataBytes', size)
+				stats.fire('item', self, result)
 			yield result
+			if chunks > 1 and bufferSize < maxBufferSize:
+				bufferSize = min(bufferSize * 2, maxBufferSize)
+				buf = memoryview(bytearray(bufferSize))
+			status = libsedna.SEnext(self.sednaConnection)
+		if status not in [libsedna.SEDNA_RESULT_END, libsedna.SEDNA_NO_ITEM]:
+			self.__raiseException()
+	
+	
+	def iterItems(self,bufferSize=65536):
+		"""Retrieve result of query execution as SednaItemStream objects,
+			one per item, so that huge items never have to fit in memory.
+
+			bufferSize: size of the retrieval buffer shared by all items"""
+		stats = self._stats
+		buf = memoryview(bytearray(bufferSize))
+		status = libsedna.SEnext(self.sednaConnection)
+		if stats != None:
+			self.__firstItem(stats, status)
+		while status == libsedna.SEDNA_NEXT_ITEM_SUCCEEDED:
+			item = SednaItemStream(self, buf)
+			if stats != None:
+				stats.count('items')
+				stats.fire('item', self, item)
+			yield item
+			item.close()
 			status = libsedna.SEnext(self.sednaConnection)
 		if status not in [libsedna.SEDNA_RESULT_END, libsedna.SEDNA_NO_ITEM]:
 			self.__raiseException()
 	
+	def fetchColumns(self, query, dtypes, delimiter=',', asNumpy=False, bufferSize=1048576, **kwargs):
+		"""Execute a query returning rows of numbers and return the result by column.
+
+			query, kwargs: as for execute. Every item of the result is one
+			               row of values separated by delimiter, e.g.
+			               string-join((@id, @price), ',')
+			dtypes: array typecodes of the columns, e.g. ('l', 'd'), or
+			        numpy dtypes with asNumpy
+			delimiter: separator of the values of a row
+			asNumpy: return numpy arrays instead of array.array objects
+			bufferSize: size of the retrieval buffer and of the batches the
+			            rows are parsed in
+
+			The server joins the rows into a single newline separated item,
+			which is parsed batch by batch as it arrives, so no Python string
+			is built per row. Queries with their own prologue cannot be
+			wrapped; their items are joined on the client instead.
+
+			Returns a list holding one array per column."""
+		numpy = None
+		if asNumpy:
+			import numpy
+		parser = _ColumnParser(dtypes, delimiter, numpy)
+		body = _assemble(b'', _bytes(query), kwargs)
+		if _prologuePattern.match(body) != None:
+			batch = []
+			size = 0
+			for item in self._execute(self._prologue() + body).resultSequence(bufferSize=bufferSize):
+				batch.append(item)
+				size += len(item)
+				if size >= bufferSize:
+					parser.feed(b'\n'.join(batch))
+					batch = []
+					size = 0
+			parser.feed(b'\n'.join(batch))
+			return parser.result()
+		joined = b"string-join(for $row in (%s) return string($row), codepoints-to-string(10))" % body
+		for item in self._execute(self._prologue() + joined).iterItems(bufferSize):
+			pending = b''
+			for chunk in item:
+				data = pending + chunk
+				end = data.rfind(b'\n')
+				if end < 0:
+					pending = data
+				else:
+					parser.feed(data[:end])
+					pending = data[end + 1:]
+			parser.feed(pending)
+		return parser.result()
+	
+	def _getData(self, buf):
+		status = libsedna.SEgetData(self.sednaConnection, buf)
+		if status < 0:
+			self.__raiseException()
+		if self._stats != None:
+			self._stats.count('getDataCalls')
+			self._stats.count('getDataBytes', status)
+		return status
+	
+	def __firstItem(self, stats, status):
+		if self.__executedAt != None:
+			if status == libsedna.SEDNA_NEXT_ITEM_SUCCEEDED:
+				stats.time('firstItem', time.time() - self.__executedAt)
+			self.__executedAt = None
+	
+	def enableInstrumentation(self):
+		"""Start collecting timings and counters (see stats)."""
+		if self._stats == None:
+			self._stats = SednaStats()
+		return self
+	
+	def disableInstrumentation(self):
+		"""Stop collecting timings and counters and drop the hooks."""
+		self._stats = None
+		return self
+	
+	def addHook(self, event, fn):
+		"""Register a tracing callback, enabling instrumentation if needed.
+
+			event: 'beforeQuery' -- fn(connection, query)
+			       'afterQuery'  -- fn(connection, query, seconds)
+			       'item'        -- fn(connection, item), for every result item
+			                        (a SednaItemStream with iterItems)"""
+		self.enableInstrumentation()
+		self._stats.addHook(event, fn)
+		return self
+	
+	def stats(self):
+		"""Snapshot of the collected timings and counters as a dictionary,
+			empty when instrumentation is disabled."""
+		if self._stats == None:
+			return {}
+		return self._stats.snapshot()
 	
 	def _feed_data(self, data, doc, collection):
-		if libsedna.SEloadData(self.sednaConnection, data, len(data), doc, collection) not in [libsedna.SEDNA_DATA_CHUNK_LOADED]:
+		if len(data) > _maxLoadData:
+			self.__feedSplit(data, doc, collection)
+			return
+		stats = self._stats
+		if stats != None:
+			start = time.time()
+		if libsedna.SEloadData(self.sednaConnection, data, doc, collection) not in [libsedna.SEDNA_DATA_CHUNK_LOADED]:
 			self.__raiseException()
+		self.bytesLoaded += len(data)
+		if stats != None:
+			stats.time('loadData', time.time() - start)
+			stats.count('loadDataBytes', len(data))
+	
+	def __feedSplit(self, data, doc, collection):
+		try:
+			view = memoryview(data)
+		except TypeError:
+			view = None # Python 2 buffer objects
+		for pos in range(0, len(data), _maxLoadData):
+			if view == None:
+				self._feed_data(buffer(data, pos, _maxLoadData), doc, collection)
+				continue
+			chunk = view[pos:pos + _maxLoadData]
+			try:
+				self._feed_data(chunk, doc, collection)
+			finally:
+				if hasattr(chunk, 'release'):
+					chunk.release()
 	
 	def loadTemporaryDocument(self, data):
 		"""Load tempory document. The document will be dropped at the end of
@@ -179,59 +1636,183 @@ class SednaConnection:
 
 			data: either file object, or string with XML to load
 			
-			Returns the (unique) name of the document.
+			Returns the (unique) name of the document. With
+			useTemporaryCollection it lives in the collection named by
+			temporaryCollection(), use doc(name, collection) to query it.
 			"""
 		return self._loadDocument(data)
 	
-	def loadDocument(self, data, doc, collection=None):
+	def useTemporaryCollection(self, enabled=True):
+		"""Load temporary documents into a scratch collection of this session.
+
+			The collection is created with the first temporary document of a
+			transaction and dropped with a single statement at commit, instead
+			of one DROP DOCUMENT per temporary document. Its name stays the
+			same for the whole session."""
+		# Disabling keeps the name, so that a collection created by the
+		# current transaction is still dropped at commit.
+		self.__temp_collection_used = enabled
+		if enabled and self.__temp_collection == None:
+			self.__temp_collection = 'tmp%s' % _uuid4().hex
+		return self
+	
+	def temporaryCollection(self):
+		"""Name of the scratch collection temporary documents go to, or None."""
+		if not self.__temp_collection_used:
+			return None
+		return self.__temp_collection
+	
+	def loadDocument(self, data, doc, collection=None, chunkSize=1048576):
 		"""Load document.
 
 			data: either file object, or string with XML to load
 			doc: database document name data is loaded as.
 			collection: collection name data is loaded into
+			chunkSize: size of the chunks a file object is fed in. Regular
+			           files are memory-mapped and fed without copies.
+
+			"""
+		self._loadDocument(data, doc, collection, chunkSize)
+	
+	def loadDocumentFile(self, path, doc, collection=None, chunkSize=1048576, compression=None):
+		"""Load document from a file.
+
+			path: name of the file
+			doc: database document name data is loaded as.
+			collection: collection name data is loaded into
+			chunkSize: size of the chunks the file is fed in
+			compression: 'gzip', 'bz2' or None for an uncompressed file. By
+			             default it is guessed from the .gz/.bz2 extension.
+			             Compressed files are decompressed incrementally.
 
 			"""
-		self._loadDocument(data, doc, collection)
+		if compression == None:
+			compression = {'.gz': 'gzip', '.bz2': 'bz2'}.get(os.path.splitext(path)[1])
+		if compression == 'gzip':
+			import gzip
+			f = gzip.GzipFile(path, 'rb')
+		elif compression == 'bz2':
+			import bz2
+			f = bz2.BZ2File(path, 'rb')
+		elif compression == None:
+			f = open(path, 'rb')
+		else:
+			raise SednaException("unknown compression %s" % repr(compression))
+		try:
+			if compression == None:
+				self._loadDocument(f, doc, collection, chunkSize)
+			else:
+				self._loadDocument(_readChunks(f, chunkSize), doc, collection)
+		finally:
+			f.close()
 		
-	def _loadDocument(self, data, doc=None, collection=None):
+	def _loadDocument(self, data, doc=None, collection=None, chunkSize=1048576):
 		"""Load document.
 
 			data: either file object, or string with XML to load
 			doc: database document name data is loaded as, if not given a temporary document with a random name will be created.
 			     if doc is not given the document will be dropped when the transaction ends (commit or rollback).
 			collection: collection name data is loaded into
+			chunkSize: size of the chunks a file object is read in
 			
 			Returns the name of the document.
 			"""
 		temp = False
-		if doc == None:
+		if collection != None:
+			collection = _str(collection)
+		if doc != None:
+			doc = _str(doc)
+		else:
 			temp = True
-			doc = str(uuid.uuid4().int)
-			while doc in self.__temp_documents:
-				doc = str(uuid.uuid4().int)
-			self.__temp_documents.append(doc)
-		if isinstance(data,file):
-			while True:
-				d = data.read(4096)
-				if d == "":
-					break
-				self._feed_data(d, doc, collection)
-		elif isinstance(data, str):
-			self._feed_data(data, doc, collection)
-		elif isinstance(data, unicode):
-			data = data.encode("utf-8")
-			self._feed_data(data, doc, collection)
+			doc = str(_uuid4().int)
+			if self.__temp_collection_used:
+				if not self.__temp_collection_created:
+					self.execute('CREATE COLLECTION "%s"' % self.__temp_collection)
+					self.__temp_collection_created = True
+				collection = self.__temp_collection
+			else:
+				while doc in self.__temp_documents:
+					doc = str(_uuid4().int)
+				self.__temp_documents.add(doc)
+		docName = _bytes(doc)
+		collectionName = _bytes(collection)
+		if isinstance(data, _fileTypes):
+			if not (isinstance(data, _mappableTypes) and self.__feedMapped(data, docName, collectionName, chunkSize)):
+				for d in _readChunks(data, chunkSize):
+					self._feed_data(_bytes(d), docName, collectionName)
+		elif isinstance(data, bytes):
+			self._feed_data(data, docName, collectionName)
+		elif isinstance(data, _text):
+			self._feed_data(data.encode("utf-8"), docName, collectionName)
 		else: #assume itreator
 			for d in data:
-				if isinstance(d, unicode):
-					d = d.encode("utf-8")
-				self._feed_data(d, doc, collection)
+				self._feed_data(_bytes(d), docName, collectionName)
 		if libsedna.SEendLoadData(self.sednaConnection) not in [libsedna.SEDNA_BULK_LOAD_SUCCEEDED]:
 			if temp:
-				del self.__temp_documents[self.__temp_documents.index(doc)]
+				self.__temp_documents.discard(doc)
 			self.__raiseException()
+		if temp:
+			return doc
+		if collection == None:
+			self.__wrote(['doc:' + doc])
+		else:
+			self.__wrote(['doc:' + doc, 'collection:' + collection])
+		self.__metadataChanges.append(('load', doc, collection))
 		return doc
 	
+	def __feedMapped(self, f, doc, collection, chunkSize):
+		"""Feed the rest of a regular file through mmap. Returns False if the
+			file cannot be mapped (pipes, sockets, empty files)."""
+		try:
+			m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		except (EnvironmentError, ValueError, mmap.error):
+			return False
+		view = None
+		try:
+			pos = f.tell()
+			size = len(m)
+			try:
+				view = memoryview(m)
+			except TypeError:
+				view = None # Python 2 mmap objects only have the old buffer interface
+			while pos < size:
+				if view != None:
+					# Released even when loading fails: the traceback would
+					# keep the slice, and the map could not be closed.
+					chunk = view[pos:pos + chunkSize]
+					try:
+						self._feed_data(chunk, doc, collection)
+					finally:
+						chunk.release()
+				else:
+					self._feed_data(buffer(m, pos, chunkSize), doc, collection)
+				pos += chunkSize
+			f.seek(0, os.SEEK_END)
+		finally:
+			if view != None and hasattr(view, 'release'):
+				view.release() # Python 3 cannot close a map while it is exported
+			m.close()
+		return True
+	
+	def documentNames(self, collection=None):
+		"""documentNames(self, collection=None) -> list
+
+			Names of the documents in collection, or of the standalone
+			documents if no collection is given. Must be called in a transaction."""
+		if collection == None:
+			query = "doc('$documents')/documents/document/@name/string()"
+		else:
+			query = "doc('$documents')/documents/collection[@name='%s']/document/@name/string()" % \
+			        collection.replace("'", "''")
+		return [_str(name) for name in self._execute(self._prologue() + _bytes(query)).resultSequence()]
+	
+	def collectionNames(self):
+		"""collectionNames(self) -> list
+
+			Names of the collections. Must be called in a transaction."""
+		query = b"doc('$documents')/documents/collection/@name/string()"
+		return [_str(name) for name in self._execute(self._prologue() + query).resultSequence()]
+	
 	def dropDocument(self, doc):
 		return self.execute("""DROP DOCUMENT "%(doc)s" """ % {'doc': doc})
 	
@@ -239,13 +1820,732 @@ class SednaConnection:
 		if name in self.__modules:
 			raise SednaException("Module already loaded")
 		self.__modules[name] = namespace
+		self.__prologue = None
 		return self
 	
 	def unLoadModule(self, name):
 		if name not in self.__modules:
 			raise SednaException("Module not loaded")
 		del self.__modules[name]
+		self.__prologue = None
 		return self
 	
-	def __raiseException(self):
-		raise SednaException(libsedna.SEgetLastErrorMsg(self.sednaConnection))
+	def reset(self):
+		"""Bring the session back to a clean state: roll back an open
+			transaction and forget loaded modules and temporary documents."""
+		self.__temp_documents = set()
+		self.__temp_collection_created = False
+		self.__writeTags = None
+		self.__metadataChanges = []
+		if self.isTransactionActive():
+			self.rollback()
+		self.__modules = {}
+		self.__prologue = None
+		return self
+	
+	def __raiseException(self, kind=None):
+		message = libsedna.SEgetLastErrorMsg(self.sednaConnection)
+		if not isinstance(message, str):
+			message = message.decode("utf-8", "replace")
+		code = libsedna.SEgetLastErrorCode(self.sednaConnection)
+		if kind != None:
+			raise kind(message, code)
+		if libsedna.SEconnectionStatus(self.sednaConnection) != libsedna.SEDNA_CONNECTION_OK:
+			raise SednaConnectionException(message, code)
+		raise SednaQueryException(message, code)
+
+def _readChunks(f, chunkSize):
+	while True:
+		d = f.read(chunkSize)
+		if not d:
+			break
+		yield d
+
+class SednaConnectionPool:
+
+	def __init__(self,host,db,login="SYSTEM",passwd="MANAGER",minSize=0,maxSize=10,timeout=None,maxIdle=None,cache=None,instrument=False):
+		"""Initializes new SednaConnectionPool
+
+			host, db, login, passwd: passed to SednaConnection
+			minSize: number of sessions opened up front and never evicted
+			maxSize: maximum number of sessions (idle and checked out)
+			timeout: default number of seconds getConnection waits for a free
+			         session (None waits forever)
+			maxIdle: seconds after which an idle session above minSize is closed
+			         (None keeps idle sessions open)
+			cache: SednaQueryCache given to every session
+			instrument: collect timings and counters on every session (see stats)"""
+		if maxSize < 1 or minSize > maxSize:
+			raise SednaException("invalid pool size: min %d, max %d" % (minSize, maxSize))
+		self.host = host
+		self.db = db
+		self.login = login
+		self.passwd = passwd
+		self.minSize = minSize
+		self.maxSize = maxSize
+		self.timeout = timeout
+		self.maxIdle = maxIdle
+		self.cache = cache
+		self.instrument = instrument
+		self.metadata = metadataRegistry(host, db) # shared with the sessions
+		self.__lock = threading.Condition()
+		self.__connections = set() # every open session, idle or checked out
+		self.__retired = SednaStats() # statistics of closed sessions
+		self.__idle = [] # (connection, time returned), most recently used last
+		self.__size = 0
+		self.__closed = False
+		for i in range(minSize):
+			self.__idle.append((self._connect(), time.time()))
+			self.__size += 1
+	
+	def _connect(self):
+		conn = SednaConnection(self.host, self.db, self.login, self.passwd, self.instrument).setCache(self.cache)
+		self.__lock.acquire()
+		try:
+			self.__connections.add(conn)
+		finally:
+			self.__lock.release()
+		return conn
+	
+	def stats(self):
+		"""Timings and counters of all sessions of the pool, including closed
+			ones, aggregated as returned by SednaConnection.stats."""
+		total = SednaStats()
+		self.__lock.acquire()
+		try:
+			total.merge(self.__retired)
+			for conn in self.__connections:
+				if conn._stats != None:
+					total.merge(conn._stats)
+		finally:
+			self.__lock.release()
+		return total.snapshot()
+	
+	def size(self):
+		"""Number of sessions owned by the pool, including checked out ones."""
+		return self.__size
+	
+	def idle(self):
+		"""Number of sessions waiting in the pool."""
+		return len(self.__idle)
+	
+	def getConnection(self, timeout=None):
+		"""Check out a session. Idle sessions are validated with status()
+			before being handed out; broken ones are replaced transparently.
+
+			timeout: seconds to wait for a free session (defaults to the pool timeout)
+
+			Raises SednaException if no session became available in time."""
+		if timeout == None:
+			timeout = self.timeout
+		deadline = None
+		if timeout != None:
+			deadline = time.time() + timeout
+		self.__lock.acquire()
+		try:
+			while True:
+				if self.__closed:
+					raise SednaException("pool is closed")
+				self.__evictIdle()
+				if self.__idle:
+					conn = self.__idle.pop()[0]
+					if self.__isHealthy(conn):
+						return conn
+					self.__size -= 1
+					continue
+				if self.__size < self.maxSize:
+					self.__size += 1
+					break
+				if deadline == None:
+					self.__lock.wait()
+				else:
+					remaining = deadline - time.time()
+					if remaining <= 0:
+						raise SednaException("timed out waiting for a connection")
+					self.__lock.wait(remaining)
+		finally:
+			self.__lock.release()
+		# Open the new session outside of the lock, the slot is already reserved.
+		try:
+			return self._connect()
+		except:
+			self.__lock.acquire()
+			try:
+				self.__size -= 1
+				self.__lock.notify()
+			finally:
+				self.__lock.release()
+			raise
+	
+	def putConnection(self, conn, discard=False):
+		"""Return a session to the pool. An open transaction is rolled back,
+			loaded modules and temporary documents are reset.
+
+			discard: close the session instead of keeping it"""
+		if not discard:
+			try:
+				if conn.status() == 'ok':
+					conn.reset()
+				else:
+					discard = True
+			except SednaException:
+				discard = True
+		self.__lock.acquire()
+		try:
+			if discard or self.__closed:
+				self.__size -= 1
+				self.__closeQuietly(conn)
+			else:
+				self.__idle.append((conn, time.time()))
+			self.__lock.notify()
+		finally:
+			self.__lock.release()
+	
+	def runTransaction(self, fn, policy=None, timeout=None):
+		"""Check out a session and call its runTransaction(fn, policy)."""
+		conn = self.getConnection(timeout)
+		try:
+			return conn.runTransaction(fn, policy)
+		finally:
+			self.putConnection(conn)
+	
+	@contextmanager
+	def connection(self, timeout=None):
+		"""Context manager checking out a session for the duration of the block."""
+		conn = self.getConnection(timeout)
+		try:
+			yield conn
+		finally:
+			self.putConnection(conn)
+	
+	@contextmanager
+	def transaction(self, timeout=None, readonly=False):
+		"""Context manager checking out a session and running the block in a
+			transaction, committed on success and rolled back on error.
+
+			readonly: start a read-only transaction, see SednaConnection.beginTransaction"""
+		conn = self.getConnection(timeout)
+		try:
+			with conn.transaction(readonly):
+				yield conn
+		finally:
+			self.putConnection(conn)
+	
+	def mapQuery(self, query, params, ordered=True, maxInFlight=None, maxItems=64, readonly=True):
+		"""Run query once for every set of arguments, concurrently on pooled sessions.
+
+			query: query with %(name)s placeholders, as for SednaConnection.execute
+			params: iterable of dictionaries of arguments, e.g. one per shard
+			ordered: yield the results query by query in the order of params;
+			         otherwise items are yielded as soon as any query produces them
+			maxInFlight: number of queries running at once (at most the pool size)
+			maxItems: number of items fetched ahead per running query
+			readonly: run the queries in read-only transactions
+
+			Every query runs in its own transaction on its own session. Yields
+			(index in params, item) pairs. Closing the iterator stops the
+			queries still running."""
+		if maxInFlight == None or maxInFlight > self.maxSize:
+			maxInFlight = self.maxSize
+		slots = threading.Semaphore(maxInFlight)
+		stop = threading.Event()
+		merged = queue.Queue(maxItems) # unordered results
+		started = queue.Queue() # queues of the started queries, in order
+		end = object()
+		def offer(items, entry):
+			while not stop.is_set():
+				try:
+					items.put(entry, True, 0.1)
+					return True
+				except queue.Full:
+					pass
+			return False
+		def work(conn, index, args, items):
+			try:
+				try:
+					with conn.transaction(readonly):
+						for item in conn.execute(query, **args).resultSequence():
+							if not offer(items, (index, item)):
+								return
+					offer(items, (index, end))
+				except Exception as ex:
+					offer(items, (index, ex))
+			finally:
+				self.putConnection(conn)
+				slots.release()
+		def dispatch():
+			count = 0
+			try:
+				for (index, args) in enumerate(params):
+					slots.acquire()
+					if stop.is_set():
+						slots.release()
+						break
+					# Sessions are taken in order here rather than by the workers, so
+					# that an earlier query never waits for one held by a later query.
+					conn = self.getConnection()
+					items = merged
+					if ordered:
+						items = queue.Queue(maxItems)
+						started.put(items)
+					thread = threading.Thread(target=work, args=(conn, index, dict(args), items))
+					thread.daemon = True
+					thread.start()
+					count += 1
+			except Exception as ex:
+				started.put(ex)
+				offer(merged, (None, ex))
+			started.put(end)
+			offer(merged, (None, count))
+		dispatcher = threading.Thread(target=dispatch)
+		dispatcher.daemon = True
+		dispatcher.start()
+		try:
+			if ordered:
+				while True:
+					items = started.get()
+					if items is end:
+						break
+					if isinstance(items, Exception):
+						raise items
+					while True:
+						(index, item) = items.get()
+						if item is end:
+							break
+						if isinstance(item, Exception):
+							raise item
+						yield (index, item)
+			else:
+				finished = 0
+				total = None
+				while total == None or finished < total:
+					(index, item) = merged.get()
+					if index == None:
+						if isinstance(item, Exception):
+							raise item
+						total = item
+					elif item is end:
+						finished += 1
+					elif isinstance(item, Exception):
+						raise item
+					else:
+						yield (index, item)
+		finally:
+			stop.set()
+	
+	def close(self):
+		"""Close all idle sessions. Sessions still checked out are closed when returned."""
+		self.__lock.acquire()
+		try:
+			self.__closed = True
+			for (conn, since) in self.__idle:
+				self.__size -= 1
+				self.__closeQuietly(conn)
+			self.__idle = []
+			self.__lock.notify_all()
+		finally:
+			self.__lock.release()
+	
+	def __isHealthy(self, conn):
+		try:
+			if conn.status() == 'ok' and conn.transactionStatus() == 'none':
+				return True
+		except (SednaException, KeyError):
+			pass
+		self.__closeQuietly(conn)
+		return False
+	
+	def __evictIdle(self):
+		if self.maxIdle == None:
+			return
+		limit = time.time() - self.maxIdle
+		# The least recently used sessions are at the front of the list.
+		while self.__idle and self.__size > self.minSize and self.__idle[0][1] < limit:
+			self.__size -= 1
+			self.__closeQuietly(self.__idle.pop(0)[0])
+	
+	def __closeQuietly(self, conn):
+		self.__lock.acquire()
+		try:
+			if conn in self.__connections:
+				self.__connections.remove(conn)
+				if conn._stats != None:
+					self.__retired.merge(conn._stats)
+		finally:
+			self.__lock.release()
+		try:
+			conn.close()
+		except SednaException:
+			pass
+
+class SednaBulkLoadReport:
+	"""Outcome of SednaBulkLoader.load."""
+
+	def __init__(self):
+		self.loaded = 0
+		self.skipped = 0
+		self.bytes = 0
+		self.errors = [] # (document name, error message)
+		self.elapsed = 0.0
+	
+	def documentsPerSecond(self):
+		if self.elapsed <= 0:
+			return 0.0
+		return self.loaded / self.elapsed
+	
+	def megabytesPerSecond(self):
+		if self.elapsed <= 0:
+			return 0.0
+		return self.bytes / self.elapsed / 1048576.0
+	
+	def __str__(self):
+		return "%d loaded, %d skipped, %d failed in %.1fs (%.1f docs/s, %.2f MB/s)" % \
+		       (self.loaded, self.skipped, len(self.errors), self.elapsed,
+		        self.documentsPerSecond(), self.megabytesPerSecond())
+
+class SednaBulkLoader:
+
+	def __init__(self,pool,collection=None,workers=4,chunkSize=65536,commitEvery=100,resume=False,progress=None):
+		"""Initializes new SednaBulkLoader
+
+			pool: SednaConnectionPool sessions are taken from
+			collection: collection documents are loaded into (None for standalone documents)
+			workers: number of threads, each loading over its own session
+			chunkSize: size of the chunks file sources are read in
+			commitEvery: number of documents each worker loads per transaction
+			resume: skip documents which already exist in the database
+			progress: function called with the SednaBulkLoadReport after every commit"""
+		self.pool = pool
+		self.collection = collection
+		self.workers = workers
+		self.chunkSize = chunkSize
+		self.commitEvery = commitEvery
+		self.resume = resume
+		self.progress = progress
+	
+	def existingDocuments(self, conn):
+		"""Names of the documents already present in the target collection
+			(or of the standalone documents), as known to the metadata
+			registry of the database. Only the first call asks the server."""
+		return conn.metadata.documents(conn, self.collection)
+	
+	def load(self, documents):
+		"""Load documents.
+
+			documents: iterable of (document name, source) pairs, where source
+			           is anything SednaConnection.loadDocument accepts
+
+			Returns a SednaBulkLoadReport. Failing documents do not stop the
+			load, they are reported in its errors."""
+		report = SednaBulkLoadReport()
+		lock = threading.Lock()
+		existing = set()
+		if self.resume:
+			conn = self.pool.getConnection()
+			try:
+				existing = self.existingDocuments(conn)
+			finally:
+				self.pool.putConnection(conn)
+		tasks = queue.Queue(self.workers * 2)
+		start = time.time()
+		threads = [threading.Thread(target=self.__work, args=(tasks, report, lock, start))
+		           for i in range(self.workers)]
+		for t in threads:
+			t.daemon = True
+			t.start()
+		try:
+			for (name, source) in documents:
+				if name in existing:
+					lock.acquire()
+					report.skipped += 1
+					lock.release()
+					continue
+				tasks.put((name, source))
+		finally:
+			for t in threads:
+				tasks.put(None)
+			for t in threads:
+				t.join()
+		report.elapsed = time.time() - start
+		return report
+	
+	def __work(self, tasks, report, lock, start):
+		conn = None
+		pending = [] # documents loaded in the current transaction
+		while True:
+			task = tasks.get()
+			if task == None:
+				break
+			(loading, source) = task
+			try:
+				if conn == None:
+					conn = self.pool.getConnection()
+				if not conn.isTransactionActive():
+					conn.beginTransaction()
+				before = conn.bytesLoaded
+				conn.loadDocument(source, loading, self.collection, self.chunkSize)
+				pending.append((loading, conn.bytesLoaded - before))
+				loading = None
+				if len(pending) >= self.commitEvery:
+					conn.commit()
+					(committed, pending) = (pending, [])
+					self.__commitDone(committed, report, lock, start)
+			except Exception as ex:
+				(conn, pending) = self.__failed(conn, pending, loading, ex, report, lock)
+		if conn != None:
+			try:
+				if conn.isTransactionActive():
+					conn.commit()
+					self.__commitDone(pending, report, lock, start)
+			except Exception as ex:
+				(conn, pending) = self.__failed(conn, pending, None, ex, report, lock)
+		if conn != None:
+			self.pool.putConnection(conn)
+	
+	def __failed(self, conn, pending, doc, ex, report, lock):
+		"""Report the failure of loading doc (None if the commit failed).
+			The documents of the transaction are reported as rolled back
+			unless the transaction survived; a transaction which may be in
+			the middle of a load or commit is rolled back. Returns the
+			session to go on with (None if it was lost) and the documents
+			still pending."""
+		errors = []
+		if doc != None:
+			errors.append((doc, str(ex)))
+			reason = "rolled back after failure of %s" % doc
+		else:
+			reason = "rolled back after failed commit: %s" % ex
+		alive = False
+		survived = False
+		if conn != None:
+			try:
+				alive = conn.status() == 'ok'
+				if alive and conn.isTransactionActive():
+					if doc != None and isinstance(ex, SednaException):
+						survived = True # the server rejected doc alone
+					else:
+						conn.rollback()
+			except SednaException:
+				alive = False
+		if not survived:
+			errors.extend((name, reason) for (name, size) in pending)
+			pending = []
+		if conn != None and not alive:
+			self.pool.putConnection(conn, discard=True)
+			conn = None
+		lock.acquire()
+		report.errors.extend(errors)
+		lock.release()
+		return (conn, pending)
+	
+	def __commitDone(self, pending, report, lock, start):
+		lock.acquire()
+		try:
+			report.loaded += len(pending)
+			for (doc, size) in pending:
+				report.bytes += size
+			report.elapsed = time.time() - start
+			if self.progress != None:
+				self.progress(report)
+		finally:
+			lock.release()
+
+class SednaFuture:
+	"""Result of a call submitted to a SednaConnectionThread."""
+
+	def __init__(self):
+		self.__lock = threading.Lock()
+		self.__done = threading.Event()
+		self.__state = 'pending' # 'running', 'cancelled' or 'finished'
+		self.__result = None
+		self.__exception = None
+		self.__callbacks = []
+	
+	def cancel(self):
+		"""Cancel the call unless it already started. Returns True if it was cancelled."""
+		self.__lock.acquire()
+		try:
+			if self.__state == 'pending':
+				self.__state = 'cancelled'
+			elif self.__state != 'cancelled':
+				return False
+		finally:
+			self.__lock.release()
+		self.__finish()
+		return True
+	
+	def cancelled(self):
+		return self.__state == 'cancelled'
+	
+	def done(self):
+		return self.__state in ('cancelled', 'finished')
+	
+	def result(self,timeout=None):
+		"""Wait for the call and return its result, or raise its exception.
+
+			Raises SednaException if the call was cancelled or did not
+			finish within timeout seconds."""
+		self.__done.wait(timeout)
+		if not self.__done.is_set():
+			raise SednaException("timed out waiting for the result")
+		if self.__state == 'cancelled':
+			raise SednaException("call was cancelled")
+		if self.__exception != None:
+			raise self.__exception
+		return self.__result
+	
+	def exception(self,timeout=None):
+		"""Wait for the call and return the exception it raised, or None."""
+		try:
+			self.result(timeout)
+		except Exception as ex:
+			return ex
+		return None
+	
+	def addDoneCallback(self,fn):
+		"""Call fn(future) once the call finished or was cancelled. Callbacks run on the session thread."""
+		self.__lock.acquire()
+		try:
+			if not self.done():
+				self.__callbacks.append(fn)
+				return
+		finally:
+			self.__lock.release()
+		fn(self)
+	
+	def _start(self):
+		self.__lock.acquire()
+		try:
+			if self.__state != 'pending':
+				return False
+			self.__state = 'running'
+			return True
+		finally:
+			self.__lock.release()
+	
+	def _set(self,result=None,exception=None):
+		self.__result = result
+		self.__exception = exception
+		self.__state = 'finished'
+		self.__finish()
+	
+	def __finish(self):
+		self.__lock.acquire()
+		try:
+			callbacks = self.__callbacks
+			self.__callbacks = []
+		finally:
+			self.__lock.release()
+		self.__done.set()
+		for fn in callbacks:
+			fn(self)
+
+class SednaConnectionThread:
+
+	def __init__(self,host,db,login="SYSTEM",passwd="MANAGER",maxPending=16):
+		"""Initializes new SednaConnectionThread and starts connecting in the background.
+
+			host, db, login, passwd: passed to SednaConnection
+			maxPending: number of calls which may wait for the session; submit
+			            blocks once it is reached (0 for no limit)"""
+		self.connection = None
+		self.__calls = queue.Queue(maxPending)
+		self.__thread = threading.Thread(target=self.__run)
+		self.__thread.daemon = True
+		self.__thread.start()
+		self.connected = self.__submit(self.__connect, (host, db, login, passwd), {}, False)
+	
+	def __connect(self, host, db, login, passwd):
+		self.connection = SednaConnection(host, db, login, passwd)
+		return self.connection
+	
+	def submit(self,fn,*args,**kwargs):
+		"""Call fn(connection, *args, **kwargs) on the session thread. Returns a SednaFuture."""
+		return self.__submit(fn, args, kwargs, True)
+	
+	def __submit(self,fn,args,kwargs,withConnection,timeout=None):
+		future = SednaFuture()
+		try:
+			self.__calls.put((future, fn, args, kwargs, withConnection), True, timeout)
+		except queue.Full:
+			raise SednaException("too many pending calls")
+		return future
+	
+	def execute(self,query,**kwargs):
+		"""Execute query and fetch the whole result. The future's result is the list of items."""
+		return self.submit(lambda conn: list(conn.execute(query, **kwargs).resultSequence()))
+	
+	def update(self,query,**kwargs):
+		"""Run SednaConnection.update on the session thread."""
+		return self.submit(lambda conn: conn.update(query, **kwargs))
+	
+	def results(self,query,maxItems=64,**kwargs):
+		"""Execute query and iterate over its result while it is fetched.
+
+			maxItems: number of items fetched ahead; fetching pauses when the
+			          consumer falls behind
+
+			Closing the iterator early stops fetching."""
+		items = queue.Queue(maxItems)
+		stop = threading.Event()
+		end = object()
+		def offer(item):
+			while not stop.is_set():
+				try:
+					items.put(item, True, 0.1)
+					return True
+				except queue.Full:
+					pass
+			return False
+		def fetch(conn):
+			try:
+				for item in conn.execute(query, **kwargs).resultSequence():
+					if not offer(item):
+						return
+			except Exception as ex:
+				offer(ex)
+				return
+			offer(end)
+		future = self.submit(fetch)
+		try:
+			while True:
+				item = items.get()
+				if item is end:
+					break
+				if isinstance(item, Exception):
+					raise item
+				yield item
+		finally:
+			stop.set()
+			future.cancel()
+	
+	def close(self,timeout=None):
+		"""Close the session once the pending calls are done and stop the thread."""
+		future = self.__submit(None, (), {}, False)
+		self.__thread.join(timeout)
+		return future
+	
+	def __run(self):
+		while True:
+			(future, fn, args, kwargs, withConnection) = self.__calls.get()
+			if fn == None:
+				try:
+					if self.connection != None:
+						self.connection.close()
+					future._set()
+				except Exception as ex:
+					future._set(exception=ex)
+				break
+			if not future._start():
+				continue
+			try:
+				if withConnection:
+					if self.connection == None:
+						raise SednaException("not connected")
+					result = fn(self.connection, *args, **kwargs)
+				else:
+					result = fn(*args, **kwargs)
+			except Exception as ex:
+				future._set(exception=ex)
+			else:
+				future._set(result)
@@ -0,0 +1,187 @@
+##############################################################################
+## File:  sednaexport.py
+##
+## Apache License 2.0
+##
+## Bulk export of Sedna documents to files.
+## Run "python sednaexport.py --help" for command line usage.
+##############################################################################
+
+""" Exports documents of a Sedna database to files, in parallel.
+
+The documents are split across a pool of worker processes, each with its
+own session. Every document is streamed to its file chunk by chunk, so no
+document is ever held in memory as a whole. A manifest with the size and
+SHA-1 checksum of every exported document is written next to the files.
+
+This exports:
+
+exportDocuments - export documents of a collection (or standalone ones).
+
+SednaExportReport - outcome of an export.
+"""
+
+import os
+import sys
+import time
+import json
+import gzip
+import bz2
+import hashlib
+import optparse
+import multiprocessing
+import sedna
+try:
+	from urllib import quote
+except ImportError:
+	from urllib.parse import quote
+
+_extensions = {None: '.xml', 'gzip': '.xml.gz', 'bz2': '.xml.bz2'}
+
+class SednaExportReport:
+	"""Outcome of exportDocuments."""
+
+	def __init__(self):
+		self.exported = 0
+		self.bytes = 0
+		self.errors = [] # (document name, error message)
+		self.elapsed = 0.0
+		self.total = 0
+	
+	def documentsPerSecond(self):
+		if self.elapsed <= 0:
+			return 0.0
+		return self.exported / self.elapsed
+	
+	def megabytesPerSecond(self):
+		if self.elapsed <= 0:
+			return 0.0
+		return self.bytes / self.elapsed / 1048576.0
+	
+	def __str__(self):
+		return "%d/%d exported, %d failed in %.1fs (%.1f docs/s, %.2f MB/s)" % \
+		       (self.exported, self.total, len(self.errors), self.elapsed,
+		        self.documentsPerSecond(), self.megabytesPerSecond())
+
+# Session of the current worker process, see _startWorker.
+_connection = None
+
+def _startWorker(host, db, login, passwd):
+	global _connection
+	_connection = sedna.SednaConnection(host, db, login, passwd)
+
+def _exportDocument(task):
+	"""Stream one document to its file. Runs in a worker process.
+
+	Returns (name, file name, size, sha1, error)."""
+	(name, collection, directory, compression, bufferSize) = task
+	fileName = quote(name, '') + _extensions[compression]
+	path = os.path.join(directory, fileName)
+	if collection == None:
+		query = "doc('%s')" % name.replace("'", "''")
+	else:
+		query = "doc('%s', '%s')" % (name.replace("'", "''"), collection.replace("'", "''"))
+	checksum = hashlib.sha1()
+	size = 0
+	try:
+		if compression == 'gzip':
+			out = gzip.GzipFile(path, 'wb')
+		elif compression == 'bz2':
+			out = bz2.BZ2File(path, 'wb')
+		else:
+			out = open(path, 'wb')
+		try:
+			_connection.beginTransaction()
+			try:
+				for item in _connection.execute(query).iterItems(bufferSize):
+					for chunk in item:
+						checksum.update(chunk)
+						out.write(chunk)
+						size += len(chunk)
+			finally:
+				if _connection.isTransactionActive():
+					_connection.commit()
+		finally:
+			out.close()
+	except (sedna.SednaException, IOError, OSError) as ex:
+		return (name, fileName, size, None, str(ex))
+	return (name, fileName, size, checksum.hexdigest(), None)
+
+def exportDocuments(host, db, directory, collection=None, login="SYSTEM", passwd="MANAGER",
+                    processes=4, compression=None, bufferSize=1048576, progress=None):
+	"""Export documents to files.
+
+		host, db, login, passwd: passed to SednaConnection
+		directory: directory the files and manifest.json are written to
+		collection: collection to export, None for the standalone documents
+		processes: number of worker processes, each using its own session
+		compression: None, 'gzip' or 'bz2'
+		bufferSize: size of the chunks documents are streamed in
+		progress: function called with the SednaExportReport after every document
+
+		Returns a SednaExportReport."""
+	if compression not in _extensions:
+		raise sedna.SednaException("unknown compression %s" % repr(compression))
+	if not os.path.isdir(directory):
+		os.makedirs(directory)
+	conn = sedna.SednaConnection(host, db, login, passwd)
+	try:
+		conn.beginTransaction()
+		names = conn.documentNames(collection)
+		conn.commit()
+	finally:
+		conn.close()
+	report = SednaExportReport()
+	report.total = len(names)
+	manifest = {'collection': collection, 'compression': compression, 'documents': {}}
+	start = time.time()
+	pool = multiprocessing.Pool(processes, _startWorker, (host, db, login, passwd))
+	try:
+		tasks = [(name, collection, directory, compression, bufferSize) for name in names]
+		for (name, fileName, size, sha1, error) in pool.imap_unordered(_exportDocument, tasks, 16):
+			if error != None:
+				report.errors.append((name, error))
+			else:
+				report.exported += 1
+				report.bytes += size
+				manifest['documents'][name] = {'file': fileName, 'bytes': size, 'sha1': sha1}
+			report.elapsed = time.time() - start
+			if progress != None:
+				progress(report)
+		pool.close()
+	except:
+		pool.terminate()
+		raise
+	finally:
+		pool.join()
+	out = open(os.path.join(directory, 'manifest.json'), 'w')
+	try:
+		json.dump(manifest, out, indent=1, sort_keys=True)
+	finally:
+		out.close()
+	report.elapsed = time.time() - start
+	return report
+
+def main(argv=None):
+	parser = optparse.OptionParser(usage="%prog [options] host database directory")
+	parser.add_option('-c', '--collection', help="collection to export (default: standalone documents)")
+	parser.add_option('-u', '--user', default="SYSTEM", help="user name (default SYSTEM)")
+	parser.add_option('-p', '--password', default="MANAGER", help="user password (default MANAGER)")
+	parser.add_option('-j', '--processes', type='int', default=4, help="number of worker processes (default 4)")
+	parser.add_option('-z', '--compression', choices=['gzip', 'bz2'], help="compress files with gzip or bz2")
+	parser.add_option('-q', '--quiet', action='store_true', help="do not report progress")
+	(options, args) = parser.parse_args(argv)
+	if len(args) != 3:
+		parser.error("expecting host, database and directory")
+	def progress(report):
+		sys.stderr.write("\r%s" % report)
+	report = exportDocuments(args[0], args[1], args[2], options.collection, options.user, options.password,
+	                         options.processes, options.compression,
+	                         progress=(not options.quiet and progress or None))
+	sys.stderr.write("\r%s\n" % report)
+	for (name, error) in report.errors:
+		sys.stderr.write("%s: %s\n" % (name, error))
+	return report.errors and 1 or 0
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,291 @@
+/*
+ * File:  sednaspeedups.c
+ *
+ * Apache License 2.0
+ *
+ * Optional accelerator for sedna.py: XML escaping of query arguments and
+ * query text assembly. sedna.py falls back to equivalent pure Python code
+ * when this module is not available.
+ */
+
+#include <Python.h>
+#include <string.h>
+
+/* Replacement of every byte that needs escaping, NULL for the others. */
+static const char *replacement[256];
+static Py_ssize_t replacementLength[256];
+
+static void
+init_tables(void)
+{
+    static const char *chars = "&\"'<>";
+    static const char *entities[] = {"&amp;", "&quot;", "&apos;", "&lt;", "&gt;"};
+    int i;
+    for (i = 0; chars[i]; i++) {
+        replacement[(unsigned char) chars[i]] = entities[i];
+        replacementLength[(unsigned char) chars[i]] = (Py_ssize_t) strlen(entities[i]);
+    }
+}
+
+/* Returns a new reference to the UTF-8 encoded text of value. */
+static PyObject *
+to_bytes(PyObject *value)
+{
+    PyObject *text, *result;
+    if (PyBytes_Check(value)) {
+        Py_INCREF(value);
+        return value;
+    }
+    if (PyUnicode_Check(value))
+        return PyUnicode_AsUTF8String(value);
+#if PY_MAJOR_VERSION >= 3
+    text = PyObject_Str(value);
+#else
+    text = PyObject_Unicode(value);
+#endif
+    if (text == NULL)
+        return NULL;
+    result = PyUnicode_AsUTF8String(text);
+    Py_DECREF(text);
+    return result;
+}
+
+/* Returns a new reference to the escaped copy of value, or to value itself
+   if nothing needs escaping. The output size is computed first so that the
+   result is written in a single pass into a preallocated string. */
+static PyObject *
+escape_value(PyObject *value)
+{
+    PyObject *bytes, *result;
+    const unsigned char *src;
+    char *dst;
+    Py_ssize_t length, size, i;
+
+    bytes = to_bytes(value);
+    if (bytes == NULL)
+        return NULL;
+    src = (const unsigned char *) PyBytes_AS_STRING(bytes);
+    length = PyBytes_GET_SIZE(bytes);
+    size = length;
+    for (i = 0; i < length; i++) {
+        if (replacement[src[i]])
+            size += replacementLength[src[i]] - 1;
+    }
+    if (size == length)
+        return bytes;
+    result = PyBytes_FromStringAndSize(NULL, size);
+    if (result == NULL) {
+        Py_DECREF(bytes);
+        return NULL;
+    }
+    dst = PyBytes_AS_STRING(result);
+    for (i = 0; i < length; i++) {
+        const char *entity = replacement[src[i]];
+        if (entity) {
+            memcpy(dst, entity, replacementLength[src[i]]);
+            dst += replacementLength[src[i]];
+        } else {
+            *dst++ = (char) src[i];
+        }
+    }
+    Py_DECREF(bytes);
+    return result;
+}
+
+static PyObject *
+speedups_escape(PyObject *self, PyObject *value)
+{
+    return escape_value(value);
+}
+
+/* Dictionary of the escaped arguments, keyed by the bytes names that
+   %(name)s in a bytes query looks up. */
+static PyObject *
+escape_arguments(PyObject *kwargs)
+{
+    PyObject *escaped, *key, *value;
+    Py_ssize_t pos = 0;
+
+    escaped = PyDict_New();
+    if (escaped == NULL)
+        return NULL;
+    while (PyDict_Next(kwargs, &pos, &key, &value)) {
+        PyObject *name, *text;
+#if PY_MAJOR_VERSION >= 3
+        if (PyUnicode_Check(key))
+            name = PyUnicode_AsUTF8String(key);
+        else
+#endif
+        {
+            name = key;
+            Py_INCREF(name);
+        }
+        if (name == NULL) {
+            Py_DECREF(escaped);
+            return NULL;
+        }
+        text = escape_value(value);
+        if (text == NULL || PyDict_SetItem(escaped, name, text) != 0) {
+            Py_XDECREF(text);
+            Py_DECREF(name);
+            Py_DECREF(escaped);
+            return NULL;
+        }
+        Py_DECREF(name);
+        Py_DECREF(text);
+    }
+    return escaped;
+}
+
+/* prologue + (query % escaped) for queries using conversions other than
+   %(name)s and %%, so that they behave exactly as in Python. */
+static PyObject *
+assemble_generic(PyObject *prologue, PyObject *query, PyObject *escaped)
+{
+    PyObject *body, *result;
+
+    body = PyNumber_Remainder(query, escaped);
+    if (body == NULL)
+        return NULL;
+    if (!PyBytes_Check(body)) {
+        PyErr_SetString(PyExc_TypeError, "query formatting did not produce bytes");
+        Py_DECREF(body);
+        return NULL;
+    }
+    result = PyBytes_FromStringAndSize(PyBytes_AS_STRING(prologue), PyBytes_GET_SIZE(prologue));
+    if (result != NULL)
+        PyBytes_Concat(&result, body);
+    Py_DECREF(body);
+    return result;
+}
+
+/* Looks up the escaped argument of every %(name)s in query, storing
+   borrowed references in values (NULL for %%), and adds the length of the
+   formatted query to *size. Returns the number of placeholders, -1 on
+   error, or -2 if the query needs assemble_generic. */
+static Py_ssize_t
+scan_query(const char *query, Py_ssize_t length, PyObject *escaped,
+           PyObject **values, Py_ssize_t *size)
+{
+    Py_ssize_t count = 0, i = 0;
+    const char *percent;
+
+    while ((percent = memchr(query + i, '%', length - i)) != NULL) {
+        Py_ssize_t at = percent - query;
+        *size += at - i;
+        if (at + 1 < length && query[at + 1] == '%') {
+            values[count++] = NULL;
+            *size += 1;
+            i = at + 2;
+        } else if (at + 1 < length && query[at + 1] == '(') {
+            const char *close = memchr(query + at + 2, ')', length - at - 2);
+            PyObject *name, *value;
+            if (close == NULL || close + 1 >= query + length || close[1] != 's'
+                    || memchr(query + at + 2, '(', close - query - at - 2) != NULL)
+                return -2; /* nested parentheses, other conversions */
+            name = PyBytes_FromStringAndSize(query + at + 2, close - query - at - 2);
+            if (name == NULL)
+                return -1;
+            value = PyDict_GetItem(escaped, name);
+            Py_DECREF(name);
+            if (value == NULL)
+                return -2; /* raises the KeyError */
+            values[count++] = value;
+            *size += PyBytes_GET_SIZE(value);
+            i = close - query + 2;
+        } else {
+            return -2;
+        }
+    }
+    *size += length - i;
+    return count;
+}
+
+/* The output size is computed first so that the prologue and the formatted
+   query are written in a single pass into one preallocated string. */
+static PyObject *
+speedups_assemble(PyObject *self, PyObject *args)
+{
+    PyObject *prologue, *query, *kwargs, *escaped, *result = NULL;
+    PyObject **values;
+    const char *src, *percent;
+    char *dst;
+    Py_ssize_t length, size, count, limit = 0, i = 0, n = 0;
+
+    if (!PyArg_ParseTuple(args, "SSO!:assemble", &prologue, &query, &PyDict_Type, &kwargs))
+        return NULL;
+    src = PyBytes_AS_STRING(query);
+    length = PyBytes_GET_SIZE(query);
+    for (percent = src; (percent = memchr(percent, '%', length - (percent - src))) != NULL; percent++)
+        limit++;
+    escaped = escape_arguments(kwargs);
+    if (escaped == NULL)
+        return NULL;
+    values = PyMem_New(PyObject *, limit + 1);
+    if (values == NULL) {
+        Py_DECREF(escaped);
+        return PyErr_NoMemory();
+    }
+    size = PyBytes_GET_SIZE(prologue);
+    count = scan_query(src, length, escaped, values, &size);
+    if (count == -2) {
+        result = assemble_generic(prologue, query, escaped);
+        goto done;
+    }
+    if (count < 0)
+        goto done;
+    result = PyBytes_FromStringAndSize(NULL, size);
+    if (result == NULL)
+        goto done;
+    dst = PyBytes_AS_STRING(result);
+    memcpy(dst, PyBytes_AS_STRING(prologue), PyBytes_GET_SIZE(prologue));
+    dst += PyBytes_GET_SIZE(prologue);
+    while ((percent = memchr(src + i, '%', length - i)) != NULL) {
+        Py_ssize_t at = percent - src;
+        memcpy(dst, src + i, at - i);
+        dst += at - i;
+        if (values[n] == NULL) {
+            *dst++ = '%';
+            i = at + 2;
+        } else {
+            memcpy(dst, PyBytes_AS_STRING(values[n]), PyBytes_GET_SIZE(values[n]));
+            dst += PyBytes_GET_SIZE(values[n]);
+            i = (const char *) memchr(src + at, ')', length - at) - src + 2;
+        }
+        n++;
+    }
+    memcpy(dst, src + i, length - i);
+done:
+    PyMem_Free(values);
+    Py_DECREF(escaped);
+    return result;
+}
+
+static PyMethodDef speedups_methods[] = {
+    {"escape", speedups_escape, METH_O,
+     "escape(value) -> bytes\n\nUTF-8 encode value and XML-escape it."},
+    {"assemble", speedups_assemble, METH_VARARGS,
+     "assemble(prologue, query, kwargs) -> bytes\n\n"
+     "prologue + (query % kwargs), with every argument escaped."},
+    {NULL, NULL, 0, NULL}
+};
+
+#if PY_MAJOR_VERSION >= 3
+static struct PyModuleDef speedups_module = {
+    PyModuleDef_HEAD_INIT, "_sednaspeedups", NULL, -1, speedups_methods
+};
+
+PyMODINIT_FUNC
+PyInit__sednaspeedups(void)
+{
+    init_tables();
+    return PyModule_Create(&speedups_module);
+}
+#else
+PyMODINIT_FUNC
+init_sednaspeedups(void)
+{
+    init_tables();
+    Py_InitModule3("_sednaspeedups", speedups_methods, NULL);
+}
+#endif
@@ -10,6 +10,10 @@
 ##############################################################################
 
 
+try:
+    import setuptools # provides distutils on Python 3.12 and later
+except ImportError:
+    pass
 from distutils.core import setup, Extension
 from distutils.spawn import find_executable
 from distutils.command.build_ext import build_ext as _build_ext
@@ -159,14 +163,22 @@ libsedna = Extension('_libsedna',
                      library_dirs = [driver_bin_path],
                      libraries = [sedna_library])
 
+# Optional accelerator for query escaping and assembly, sedna.py works without it
+speedups = Extension('_sednaspeedups',
+                     sources = ['sednaspeedups.c'])
+
+modules = ['libsedna', 'sedna', 'sednaexport']
+if sys.version_info >= (3, 5):
+    modules.append('aiosedna') # asyncio front-end
+
 # Sedna Python driver module definition
 setup (name = 'sedna',
        version = '0.2',
        description = 'Sedna XML Database Python Driver',
-       ext_modules  = [libsedna],
+       ext_modules  = [libsedna, speedups],
        author='Modis Team',
        author_email='modis@ispras.ru',
        url='http://modis.ispras.ru/sedna',
-       py_modules = ['libsedna', 'sedna'],
+       py_modules = modules,
        cmdclass = {'build_ext': build_ext, 'clean': clean},
        license = 'Apache 2.0')
@@ -0,0 +1,153 @@
+##############################################################################
+## File:  aiocases.py
+##
+## Apache License 2.0
+##
+## Tests of the asyncio front-end, imported by test_aiosedna.py on Python 3.
+##############################################################################
+
+import asyncio
+
+from support import SednaTestCase, fakelibsedna, sedna
+import aiosedna
+
+class AsyncTestCase(SednaTestCase):
+
+    def setUp(self):
+        SednaTestCase.setUp(self)
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+        SednaTestCase.tearDown(self)
+
+    def wait(self, coroutine):
+        return self.loop.run_until_complete(asyncio.wait_for(coroutine, 10))
+
+class AsyncConnectionTest(AsyncTestCase):
+
+    def setUp(self):
+        AsyncTestCase.setUp(self)
+        fakelibsedna.results = lambda query: [str(i).encode('ascii') for i in range(10)]
+
+    def testExecute(self):
+        async def run():
+            conn = await aiosedna.connect('localhost', 'test')
+            items = await conn.execute('doc("d")')
+            await conn.close()
+            return items
+        self.assertEqual(self.wait(run()), [str(i).encode('ascii') for i in range(10)])
+
+    def testConnectError(self):
+        fakelibsedna.fail('SEconnect', b'unknown database')
+        self.assertRaises(sedna.SednaException, self.wait, aiosedna.connect('localhost', 'test'))
+
+    def testQueryError(self):
+        async def run():
+            conn = await aiosedna.connect('localhost', 'test')
+            fakelibsedna.fail('SEexecute', b'syntax error')
+            try:
+                await conn.execute('doc(')
+            except sedna.SednaQueryException as ex:
+                return str(ex)
+        self.assertEqual(self.wait(run()), 'syntax error')
+
+    def testResults(self):
+        async def run():
+            conn = await aiosedna.connect('localhost', 'test')
+            items = []
+            async for item in conn.results('doc("d")', maxItems=2):
+                items.append(item)
+            return items
+        self.assertEqual(self.wait(run()), [str(i).encode('ascii') for i in range(10)])
+
+    def testResultsClosedEarly(self):
+        async def run():
+            conn = await aiosedna.connect('localhost', 'test')
+            results = conn.results('doc("d")', maxItems=1)
+            async for item in results:
+                break
+            await results.aclose()
+            # the session is free for the next call
+            return await conn.execute('doc("d")')
+        self.assertEqual(len(self.wait(run())), 10)
+
+    def testTransaction(self):
+        async def run():
+            conn = await aiosedna.connect('localhost', 'test')
+            async with conn.transaction() as same:
+                self.assertTrue(same is conn)
+                async with conn.transaction():
+                    await conn.update('UPDATE delete doc("d")/a')
+                status = await conn.submit(lambda conn: conn.transactionStatus())
+            return (status, await conn.submit(lambda conn: conn.transactionStatus()))
+        self.assertEqual(self.wait(run()), ('active', 'none'))
+
+    def testTransactionRolledBack(self):
+        async def run():
+            conn = await aiosedna.connect('localhost', 'test')
+            try:
+                async with conn.transaction():
+                    raise ValueError()
+            except ValueError:
+                pass
+            return await conn.submit(lambda conn: conn.transactionStatus())
+        self.assertEqual(self.wait(run()), 'none')
+
+    def testCallsRunInOrder(self):
+        async def run():
+            conn = await aiosedna.connect('localhost', 'test', maxPending=2)
+            calls = [conn.submit(lambda conn, i=i: i) for i in range(20)]
+            return await asyncio.gather(*calls)
+        self.assertEqual(self.wait(run()), list(range(20)))
+
+class AsyncPoolTest(AsyncTestCase):
+
+    def testReusesSessions(self):
+        async def run():
+            pool = aiosedna.AsyncSednaPool('localhost', 'test', maxSize=2)
+            await asyncio.gather(*[pool.execute('doc("d")') for i in range(10)])
+            size = pool.size()
+            await pool.close()
+            return (size, pool.size())
+        self.assertEqual(self.wait(run()), (2, 0))
+
+    def testTimeout(self):
+        async def run():
+            pool = aiosedna.AsyncSednaPool('localhost', 'test', maxSize=1)
+            conn = await pool.getConnection()
+            try:
+                await pool.getConnection(0.05)
+            except sedna.SednaException:
+                pass
+            else:
+                self.fail()
+            await pool.putConnection(conn)
+            return await pool.getConnection(0.05) is conn
+        self.assertTrue(self.wait(run()))
+
+    def testTransaction(self):
+        async def run():
+            pool = aiosedna.AsyncSednaPool('localhost', 'test')
+            try:
+                async with pool.transaction() as conn:
+                    await conn.update('UPDATE delete doc("d")/a')
+                    raise ValueError()
+            except ValueError:
+                pass
+            conn = await pool.getConnection()
+            return await conn.submit(lambda conn: conn.transactionStatus())
+        self.assertEqual(self.wait(run()), 'none')
+
+    def testReplacesLostSession(self):
+        async def run():
+            pool = aiosedna.AsyncSednaPool('localhost', 'test')
+            async with pool.connection() as conn:
+                fakelibsedna.fail('SEexecute', b'connection lost', lost=True)
+                try:
+                    await conn.execute('doc("d")')
+                except sedna.SednaConnectionException:
+                    pass
+            async with pool.connection() as other:
+                return (other is conn, pool.size())
+        self.assertEqual(self.wait(run()), (False, 1))
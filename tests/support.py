@@ -0,0 +1,37 @@
+##############################################################################
+## File:  support.py
+##
+## Apache License 2.0
+##
+## Shared setup of the tests: sedna.py runs on top of the fake libsedna
+## from the benchmarks folder, so that no server is needed.
+##############################################################################
+
+import os
+import sys
+import unittest
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root, 'benchmarks'))
+sys.path.insert(0, root)
+
+import fakelibsedna
+fakelibsedna.install()
+import sedna
+
+class SednaTestCase(unittest.TestCase):
+    """Starts every test with a fresh fake server and metadata registries."""
+
+    def setUp(self):
+        fakelibsedna.reset()
+        sedna._registries.clear()
+
+    def tearDown(self):
+        fakelibsedna.reset()
+
+    def connect(self, **kwargs):
+        return sedna.SednaConnection('localhost', 'test', **kwargs)
+
+    def executed(self, text):
+        """Number of queries sent so far that contain text."""
+        return len([query for query in fakelibsedna.queries if text in query])
@@ -0,0 +1,17 @@
+##############################################################################
+## File:  test_aiosedna.py
+##
+## Apache License 2.0
+##
+## The tests of aiosedna.py use async syntax, so they live in aiocases.py
+## and are only imported on Python 3.5 or later.
+##############################################################################
+
+import sys
+import unittest
+
+if sys.version_info >= (3, 5):
+    from aiocases import *
+
+if __name__ == '__main__':
+    unittest.main()
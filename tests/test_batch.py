@@ -0,0 +1,79 @@
+##############################################################################
+## File:  test_batch.py
+##
+## Apache License 2.0
+##
+## Tests of executeMany, batch and runBatch: grouping of statements into
+## transactions and handling of failing statements.
+##############################################################################
+
+import unittest
+
+from support import SednaTestCase, fakelibsedna, sedna
+
+class BatchTest(SednaTestCase):
+
+    query = 'UPDATE insert <x>%(n)s</x> into doc("d")'
+
+    def setUp(self):
+        SednaTestCase.setUp(self)
+        self.conn = self.connect(instrument=True)
+
+    def count(self, timer):
+        return self.conn.stats()[timer]['count']
+
+    def params(self, n):
+        return [{'n': i} for i in range(n)]
+
+    def testGroupedByMaxBatchSize(self):
+        size = len(self.conn.prepare(self.query).text(n=0))
+        result = self.conn.executeMany(self.query, self.params(10), maxBatchSize=3 * size)
+        self.assertEqual((result.executed, result.failures), (10, []))
+        self.assertEqual(self.count('begin'), 4)
+        self.assertEqual(self.count('commit'), 4)
+        self.assertEqual(self.executed(b'UPDATE'), 10)
+
+    def testFailureLeavingTransactionOpen(self):
+        fakelibsedna.fail('SEexecute', b'no such node', match=b'<x>3</x>')
+        result = self.conn.executeMany(self.query, self.params(6))
+        self.assertEqual(result.executed, 5)
+        self.assertEqual([(index, args) for (index, args, message) in result.failures], [(3, {'n': 3})])
+        self.assertTrue('no such node' in result.failures[0][2])
+        # the statements before the failure are not run again
+        self.assertEqual(self.executed(b'<x>0</x>'), 1)
+        self.assertEqual(self.count('begin'), 1)
+        self.assertEqual(self.count('commit'), 1)
+
+    def testGroupReplayedAfterRollback(self):
+        fakelibsedna.fail('SEexecute', b'deadlock', match=b'<x>3</x>', rollback=True)
+        result = self.conn.executeMany(self.query, self.params(6))
+        self.assertEqual(result.executed, 5)
+        self.assertEqual([index for (index, args, message) in result.failures], [3])
+        self.assertEqual(self.executed(b'<x>0</x>'), 2)
+        self.assertEqual(self.executed(b'<x>3</x>'), 1)
+        self.assertEqual(self.executed(b'<x>5</x>'), 1)
+        self.assertEqual(self.count('begin'), 2)
+        self.assertEqual(self.count('commit'), 1)
+
+    def testActiveTransaction(self):
+        fakelibsedna.fail('SEexecute', b'no such node', match=b'<x>1</x>')
+        self.conn.beginTransaction()
+        result = self.conn.executeMany(self.query, self.params(3), maxBatchSize=1)
+        self.assertEqual(result.executed, 2)
+        self.assertEqual([index for (index, args, message) in result.failures], [1])
+        self.assertEqual(self.conn.transactionStatus(), 'active')
+        self.assertEqual(self.count('begin'), 1)
+        self.assertEqual(self.count('commit'), 0)
+        self.conn.commit()
+
+    def testBatch(self):
+        with self.conn.batch() as batch:
+            batch.add(self.query, n=u'<a>')
+            batch.add(self.query, n=2)
+        self.assertEqual(batch.result.executed, 2)
+        self.assertEqual(self.executed(b'<x>&lt;a&gt;</x>'), 1)
+        self.assertEqual(self.count('commit'), 1)
+        self.assertEqual(self.conn.transactionStatus(), 'none')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,184 @@
+##############################################################################
+## File:  test_cache.py
+##
+## Apache License 2.0
+##
+## Tests of SednaQueryCache and SednaMetadataRegistry invalidation.
+##############################################################################
+
+import unittest
+
+from support import SednaTestCase, fakelibsedna, sedna
+
+class QueryCacheTest(SednaTestCase):
+
+    def setUp(self):
+        SednaTestCase.setUp(self)
+        fakelibsedna.results = lambda query: [query[-8:]]
+        self.cache = sedna.SednaQueryCache()
+        self.conn = self.connect().setCache(self.cache)
+
+    def testHit(self):
+        self.assertEqual(self.conn.cachedQuery("doc('a')"), [b"doc('a')"])
+        self.assertEqual(self.conn.cachedQuery("doc('a')"), [b"doc('a')"])
+        self.assertEqual(self.executed(b"doc('a')"), 1)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def testCommittedUpdateInvalidatesTaggedEntries(self):
+        self.conn.cachedQuery("doc('a')")
+        self.conn.cachedQuery("doc('b')")
+        self.conn.cachedQuery("1 + 1")
+        with self.conn.transaction():
+            self.conn.execute("UPDATE insert <x/> into doc('a')/r")
+        self.conn.cachedQuery("doc('a')")
+        self.conn.cachedQuery("doc('b')")
+        self.conn.cachedQuery("1 + 1")
+        self.assertEqual(self.executed(b"doc('a')"), 3)
+        self.assertEqual(self.executed(b"doc('b')"), 1)
+        # entries with unknown tags are always dropped
+        self.assertEqual(self.executed(b"1 + 1"), 2)
+
+    def testRollbackKeepsEntries(self):
+        self.conn.cachedQuery("doc('a')")
+        self.conn.beginTransaction()
+        self.conn.execute("UPDATE insert <x/> into doc('a')/r")
+        self.conn.rollback()
+        self.conn.cachedQuery("doc('a')")
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def testBypassedAfterWrite(self):
+        self.conn.cachedQuery("doc('a')")
+        self.conn.beginTransaction()
+        self.conn.loadDocument(b'<a/>', 'a')
+        self.conn.cachedQuery("doc('a')")
+        self.assertEqual(self.executed(b"doc('a')"), 2)
+        self.assertEqual(self.cache.stats()['hits'], 0)
+        self.conn.commit()
+        self.conn.cachedQuery("doc('a')")
+        self.assertEqual(self.executed(b"doc('a')"), 3)
+        self.assertEqual(self.cache.stats()['misses'], 2)
+
+    def testInvalidatedDuringQueryNotCached(self):
+        other = self.connect().setCache(self.cache)
+        def results(query):
+            if query == b'doc("x")/a' and fakelibsedna.queries.count(query) == 1:
+                # another session commits a write while the query runs
+                with other.transaction():
+                    other.execute('UPDATE insert <b/> into doc("x")/a')
+            return [b'<a/>']
+        fakelibsedna.results = results
+        self.conn.cachedQuery('doc("x")/a')
+        self.assertEqual(self.cache.stats()['entries'], 0)
+        self.conn.cachedQuery('doc("x")/a')
+        self.assertEqual(fakelibsedna.queries.count(b'doc("x")/a'), 2)
+        self.assertEqual(self.cache.stats()['entries'], 1)
+
+    def testEviction(self):
+        cache = sedna.SednaQueryCache(maxBytes=40)
+        self.conn.setCache(cache)
+        self.conn.cachedQuery("doc('a')")
+        self.conn.cachedQuery("doc('b')")
+        self.conn.cachedQuery("doc('c')")
+        self.assertEqual(cache.evictions, 1)
+        self.assertTrue(cache.size <= 40)
+
+class MetadataRegistryTest(SednaTestCase):
+
+    def setUp(self):
+        SednaTestCase.setUp(self)
+        self.names = [b'd0']
+        fakelibsedna.results = lambda query: list(self.names)
+        self.conn = self.connect()
+
+    def testShared(self):
+        other = self.connect()
+        self.assertTrue(other.metadata is self.conn.metadata)
+        self.assertFalse(sedna.SednaConnection('localhost', 'other').metadata is self.conn.metadata)
+
+    def testFetchedOnce(self):
+        self.assertEqual(self.conn.metadata.documents(self.conn, 'c'), set(['d0']))
+        self.assertTrue(self.conn.metadata.hasDocument(self.conn, 'd0', 'c'))
+        self.assertEqual(self.executed(b'$documents'), 1)
+
+    def testCommittedLoadAdded(self):
+        registry = self.conn.metadata
+        registry.documents(self.conn, 'c')
+        with self.conn.transaction():
+            self.conn.loadDocument(b'<a/>', 'd1', 'c')
+        self.conn.beginTransaction()
+        self.conn.loadDocument(b'<a/>', 'd2', 'c')
+        self.conn.rollback()
+        self.assertEqual(registry.documents(self.conn, 'c'), set(['d0', 'd1']))
+        self.assertEqual(self.executed(b'$documents'), 1)
+
+    def testNotCachedInTransaction(self):
+        registry = self.conn.metadata
+        with self.conn.transaction():
+            self.conn.loadDocument(b'<a/>', 'd1', 'c')
+            self.names = [b'd0', b'd1']
+            self.assertEqual(registry.documents(self.conn, 'c'), set(['d0', 'd1']))
+            self.assertEqual(registry.collections(self.conn), set(['d0', 'd1']))
+        self.conn.beginTransaction()
+        self.conn.loadDocument(b'<a/>', 'd2', 'c')
+        registry.documents(self.conn, 'c')
+        self.conn.rollback()
+        self.names = [b'd0', b'd1']
+        self.assertEqual(registry.documents(self.conn, 'c'), set(['d0', 'd1']))
+        self.assertEqual(self.executed(b'$documents'), 4)
+        self.assertEqual(self.conn.transactionStatus(), 'none')
+
+    def testChangeDuringFetchNotLost(self):
+        registry = self.conn.metadata
+        other = self.connect()
+        def results(query):
+            # another session commits a load while the list is fetched
+            if not other.isTransactionActive() and b'd1' not in self.names:
+                self.names.append(b'd1')
+                with other.transaction():
+                    other.loadDocument(b'<a/>', 'd2', 'c')
+            return [b'd0']
+        fakelibsedna.results = results
+        self.assertEqual(registry.documents(self.conn, 'c'), set(['d0']))
+        fakelibsedna.results = lambda query: [b'd0', b'd2']
+        self.assertEqual(registry.documents(self.conn, 'c'), set(['d0', 'd2']))
+
+    def testDdlInvalidates(self):
+        registry = self.conn.metadata
+        registry.documents(self.conn, 'c')
+        registry.documents(self.conn)
+        registry.collections(self.conn)
+        with self.conn.transaction():
+            self.conn.execute('DROP DOCUMENT "d0" IN COLLECTION "c"')
+        self.names = []
+        self.assertEqual(registry.documents(self.conn, 'c'), set())
+        self.assertEqual(registry.collections(self.conn), set())
+        # a document tag cannot tell the collection, standalone documents go too
+        self.assertEqual(registry.documents(self.conn), set())
+        self.assertEqual(self.executed(b'$documents'), 6)
+
+    def testBulkLoadStatementInvalidatesAll(self):
+        registry = self.conn.metadata
+        registry.documents(self.conn)
+        with self.conn.transaction():
+            self.conn.execute("LOAD 'file.xml' 'd1'")
+        registry.documents(self.conn)
+        self.assertEqual(self.executed(b'$documents'), 2)
+
+    def testRegisteredModules(self):
+        other = self.connect()
+        self.conn.metadata.registerModule('m', 'urn:m')
+        other.execute('m:f()')
+        self.assertEqual(self.executed(b"import module namespace m = 'urn:m'"), 1)
+        self.conn.metadata.unregisterModule('m')
+        other.execute('1')
+        self.assertEqual(self.executed(b'urn:m'), 1)
+
+    def testInstalledModulesSkipped(self):
+        with self.conn.transaction():
+            self.conn.installModule('m.xqlib')
+        with self.conn.transaction():
+            self.conn.installModule('m.xqlib')
+        self.assertEqual(self.executed(b'LOAD MODULE'), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+##############################################################################
+## File:  test_columns.py
+##
+## Apache License 2.0
+##
+## Tests of SednaConnection.fetchColumns with array.array and numpy columns.
+##############################################################################
+
+import array
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from support import SednaTestCase, fakelibsedna, sedna
+
+class FetchColumnsTest(SednaTestCase):
+
+    rows = [b'1,1.5', b'2,2.5', b'30,-3.25']
+
+    def setUp(self):
+        SednaTestCase.setUp(self)
+        fakelibsedna.results = self.results
+        self.conn = self.connect()
+
+    def results(self, query):
+        if query.startswith(b'string-join'):
+            return [b'\n'.join(self.rows)]
+        return self.rows
+
+    def fetch(self, query='doc("d")//row', **kwargs):
+        return self.conn.fetchColumns(query, ('l', 'd'), **kwargs)
+
+    def testArrays(self):
+        (ids, prices) = self.fetch()
+        self.assertEqual(ids, array.array('l', [1, 2, 30]))
+        self.assertEqual(prices, array.array('d', [1.5, 2.5, -3.25]))
+        self.assertEqual(fakelibsedna.queries, [b'string-join(for $row in (doc("d")//row) '
+                                                b'return string($row), codepoints-to-string(10))'])
+
+    def testRowsSplitBetweenChunks(self):
+        (ids, prices) = self.fetch(bufferSize=4)
+        self.assertEqual(list(ids), [1, 2, 30])
+        self.assertEqual(list(prices), [1.5, 2.5, -3.25])
+
+    def testPrologueJoinedOnClient(self):
+        query = 'declare variable $d := doc("d");\n$d//row'
+        (ids, prices) = self.fetch(query, bufferSize=8)
+        self.assertEqual(list(ids), [1, 2, 30])
+        self.assertEqual(list(prices), [1.5, 2.5, -3.25])
+        self.assertEqual(fakelibsedna.queries, [query.encode('ascii')])
+
+    def testEmpty(self):
+        self.rows = []
+        self.assertEqual([len(column) for column in self.fetch()], [0, 0])
+
+    def testMalformed(self):
+        self.rows = [b'1,1.5', b'2,x']
+        self.assertRaises(sedna.SednaException, self.fetch)
+        self.rows = [b'1,1.5', b'2']
+        self.assertRaises(sedna.SednaException, self.fetch)
+
+    def testUnsupportedType(self):
+        self.assertRaises(sedna.SednaException, self.conn.fetchColumns, 'doc("d")//row', ('u',))
+
+    @unittest.skipIf(numpy == None, "numpy is not installed")
+    def testNumpy(self):
+        (ids, prices) = self.conn.fetchColumns('doc("d")//row', ('i8', 'f8'), asNumpy=True, bufferSize=4)
+        self.assertEqual(ids.dtype, numpy.dtype('i8'))
+        self.assertEqual(ids.tolist(), [1, 2, 30])
+        self.assertEqual(prices.tolist(), [1.5, 2.5, -3.25])
+        self.rows = [str(i).encode('ascii') for i in range(3000)]
+        (ids,) = self.conn.fetchColumns('declare variable $d := doc("d");\n$d//row', ('i4',), asNumpy=True)
+        self.assertEqual(ids.tolist(), list(range(3000)))
+
+    @unittest.skipIf(numpy == None, "numpy is not installed")
+    def testNumpyMalformed(self):
+        self.rows = [b'1,1.5', b'2,x']
+        self.assertRaises(sedna.SednaException, self.conn.fetchColumns, 'doc("d")//row', ('i8', 'f8'), asNumpy=True)
+        self.rows = [b'1,1.5', b'2']
+        self.assertRaises(sedna.SednaException, self.conn.fetchColumns, 'doc("d")//row', ('i8', 'f8'), asNumpy=True)
+
+if __name__ == '__main__':
+    unittest.main()
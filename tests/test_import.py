@@ -0,0 +1,53 @@
+##############################################################################
+## File:  test_import.py
+##
+## Apache License 2.0
+##
+## Guards the cost of "import sedna": it must not load the modules sedna.py
+## defers until first use, and must stay within a generous time budget.
+## benchmarks/bench_import.py measures the import time precisely.
+##############################################################################
+
+import sys
+import subprocess
+import unittest
+
+from support import root
+
+deferred = ['libsedna', 'uuid', 'random', 'xml.etree.ElementTree', 'gzip', 'bz2']
+
+# Milliseconds; the import takes 10-40 ms, the budget only catches a
+# module imported up front again on a slow machine.
+budget = 1000
+
+script = """
+import sys, time
+sys.path.insert(0, %r)
+start = time.time()
+import sedna
+elapsed = time.time() - start
+loaded = [name for name in %r if name in sys.modules]
+sys.stdout.write('%%f %%s' %% (elapsed, ','.join(loaded)))
+"""
+
+class ImportTest(unittest.TestCase):
+
+    def importSedna(self):
+        """Import time in ms in a fresh interpreter, and the deferred modules it loaded."""
+        process = subprocess.Popen([sys.executable, '-c', script % (root, deferred)], stdout=subprocess.PIPE)
+        output = process.communicate()[0]
+        self.assertEqual(process.returncode, 0)
+        (elapsed, loaded) = output.decode('ascii').split(' ')
+        return (float(elapsed) * 1000, loaded)
+
+    def testDeferredModulesNotLoaded(self):
+        (elapsed, loaded) = self.importSedna()
+        self.assertEqual(loaded, '')
+
+    def testBudget(self):
+        # the best of a few runs, the first one may compile sedna.py
+        elapsed = min([self.importSedna()[0] for i in range(3)])
+        self.assertTrue(elapsed < budget, "import sedna took %.1f ms" % elapsed)
+
+if __name__ == '__main__':
+    unittest.main()
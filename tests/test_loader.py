@@ -0,0 +1,183 @@
+##############################################################################
+## File:  test_loader.py
+##
+## Apache License 2.0
+##
+## Tests of SednaBulkLoader and of loading documents.
+##############################################################################
+
+import os
+import tempfile
+import unittest
+import zlib
+
+from support import SednaTestCase, fakelibsedna, sedna
+
+class BulkLoaderTest(SednaTestCase):
+
+    def setUp(self):
+        SednaTestCase.setUp(self)
+        self.pool = sedna.SednaConnectionPool('localhost', 'test')
+
+    def documents(self, n):
+        return [('d%d' % i, b'<a/>') for i in range(n)]
+
+    def testLoadsAll(self):
+        reports = []
+        loader = sedna.SednaBulkLoader(self.pool, 'c', workers=3, commitEvery=4,
+                                       progress=lambda report: reports.append(report.loaded))
+        report = loader.load(self.documents(20))
+        self.assertEqual(report.loaded, 20)
+        self.assertEqual(report.bytes, 80)
+        self.assertEqual(report.errors, [])
+        self.assertTrue(reports)
+        self.assertEqual(self.pool.idle(), self.pool.size())
+
+    def testFailedDocument(self):
+        fakelibsedna.fail('SEloadData', b'not well-formed', match=b'd2')
+        report = sedna.SednaBulkLoader(self.pool, workers=1).load(self.documents(5))
+        self.assertEqual(report.loaded, 4)
+        self.assertEqual(report.errors, [('d2', 'not well-formed')])
+
+    def testRolledBackTransaction(self):
+        fakelibsedna.fail('SEloadData', b'no space', match=b'd4', rollback=True)
+        report = sedna.SednaBulkLoader(self.pool, workers=1, commitEvery=10).load(self.documents(8))
+        self.assertEqual(report.loaded, 3)
+        self.assertEqual(sorted(doc for (doc, message) in report.errors),
+                         ['d0', 'd1', 'd2', 'd3', 'd4'])
+
+    def testLostSession(self):
+        fakelibsedna.fail('SEloadData', b'connection lost', match=b'd4', lost=True)
+        report = sedna.SednaBulkLoader(self.pool, workers=1, commitEvery=10).load(self.documents(8))
+        self.assertEqual(report.loaded, 3)
+        self.assertEqual(report.errors[0], ('d4', 'connection lost'))
+        self.assertEqual(sorted(report.errors[1:]),
+                         [('d%d' % i, 'rolled back after failure of d4') for i in range(4)])
+        self.assertEqual(self.pool.size(), 1)
+
+    def testClientError(self):
+        # a source failing half way leaves the load unfinished, the transaction is given up
+        def source():
+            yield b'<a>'
+            raise IOError('read error')
+        documents = self.documents(4)
+        documents.insert(2, ('bad', source()))
+        report = sedna.SednaBulkLoader(self.pool, workers=1, commitEvery=10).load(documents)
+        self.assertEqual(report.loaded, 2)
+        self.assertEqual(sorted(doc for (doc, message) in report.errors), ['bad', 'd0', 'd1'])
+        self.assertEqual(self.pool.idle(), 1)
+
+    def testFailedCommit(self):
+        fakelibsedna.fail('SEcommit', b'out of space', rollback=True)
+        report = sedna.SednaBulkLoader(self.pool, workers=1, commitEvery=3).load(self.documents(8))
+        self.assertEqual(report.loaded, 5)
+        self.assertEqual(report.errors, [('d%d' % i, 'rolled back after failed commit: out of space') for i in range(3)])
+
+    def testFailedFinalCommit(self):
+        fakelibsedna.fail('SEcommit', b'out of space', rollback=True)
+        report = sedna.SednaBulkLoader(self.pool, workers=1, commitEvery=10).load(self.documents(2))
+        self.assertEqual(report.loaded, 0)
+        self.assertEqual(len(report.errors), 2)
+
+    def testUnavailableServer(self):
+        fakelibsedna.fail('SEconnect', b'no server', times=2)
+        report = sedna.SednaBulkLoader(self.pool, workers=1).load(self.documents(4))
+        self.assertEqual(report.loaded, 2)
+        self.assertEqual(report.errors, [('d0', 'no server'), ('d1', 'no server')])
+
+    def testResume(self):
+        fakelibsedna.results = lambda query: [b'd0', b'd1']
+        loader = sedna.SednaBulkLoader(self.pool, 'c', workers=2, resume=True)
+        report = loader.load(self.documents(4))
+        self.assertEqual((report.loaded, report.skipped), (2, 2))
+        # the loads are known to the registry, nothing is fetched again
+        report = loader.load(self.documents(4))
+        self.assertEqual((report.loaded, report.skipped), (0, 4))
+        self.assertEqual(self.executed(b'$documents'), 1)
+
+class LoadDocumentTest(SednaTestCase):
+
+    def testSources(self):
+        conn = self.connect()
+        conn.beginTransaction()
+        conn.loadDocument(b'<a/>', 'bytes')
+        conn.loadDocument(u'<a/>', 'text')
+        conn.loadDocument(iter([b'<a>', b'</a>']), 'chunks')
+        (fd, path) = tempfile.mkstemp()
+        try:
+            os.write(fd, b'<a>' + b' ' * 1000 + b'</a>')
+            os.close(fd)
+            conn.loadDocumentFile(path, 'file', chunkSize=100)
+        finally:
+            os.remove(path)
+        conn.commit()
+        self.assertEqual(conn.bytesLoaded, 4 + 4 + 7 + 1007)
+        self.assertEqual(conn.sednaConnection.loaded, conn.bytesLoaded)
+        data = b'<a/><a/><a></a><a>' + b' ' * 1000 + b'</a>'
+        self.assertEqual(conn.sednaConnection.checksum, zlib.crc32(data) & 0xffffffff)
+
+    def testLargeDataSplit(self):
+        conn = self.connect(instrument=True)
+        limit = sedna._maxLoadData
+        sedna._maxLoadData = 10
+        try:
+            conn.beginTransaction()
+            conn.loadDocument(b'<a>' + b' ' * 18 + b'</a>', 'large')
+            conn.loadDocument(b'<a>' + b' ' * 3 + b'</a>', 'small')
+        finally:
+            sedna._maxLoadData = limit
+        self.assertEqual(conn.stats()['loadData']['count'], 4)
+        self.assertEqual(conn.bytesLoaded, 35)
+        self.assertEqual(conn.sednaConnection.loaded, 35)
+
+    def testFileLoadError(self):
+        conn = self.connect()
+        conn.beginTransaction()
+        (fd, path) = tempfile.mkstemp()
+        try:
+            os.write(fd, b'<a/>' * 100)
+            os.close(fd)
+            fakelibsedna.fail('SEloadData', b'not well-formed', match=b'file')
+            try:
+                conn.loadDocumentFile(path, 'file', chunkSize=100)
+                self.fail()
+            except sedna.SednaQueryException as ex:
+                self.assertEqual(str(ex), 'not well-formed')
+        finally:
+            os.remove(path)
+
+    def testTemporaryDocumentsDropped(self):
+        conn = self.connect()
+        conn.beginTransaction()
+        doc = conn.loadTemporaryDocument(b'<a/>')
+        conn.commit()
+        self.assertEqual(self.executed(('DROP DOCUMENT "%s"' % doc).encode('ascii')), 1)
+
+    def testTemporaryCollectionDropped(self):
+        conn = self.connect().useTemporaryCollection()
+        conn.beginTransaction()
+        conn.loadTemporaryDocument(b'<a/>')
+        conn.loadTemporaryDocument(b'<b/>')
+        conn.commit()
+        name = conn.temporaryCollection().encode('ascii')
+        self.assertEqual(self.executed(b'CREATE COLLECTION "' + name), 1)
+        self.assertEqual(self.executed(b'DROP COLLECTION "' + name), 1)
+        self.assertEqual(self.executed(b'DROP DOCUMENT'), 0)
+
+    def testTemporaryCollectionDisabledInTransaction(self):
+        conn = self.connect().useTemporaryCollection()
+        name = conn.temporaryCollection().encode('ascii')
+        conn.beginTransaction()
+        conn.loadTemporaryDocument(b'<a/>')
+        conn.useTemporaryCollection(False)
+        self.assertEqual(conn.temporaryCollection(), None)
+        doc = conn.loadTemporaryDocument(b'<b/>').encode('ascii')
+        conn.commit()
+        self.assertEqual(self.executed(b'DROP COLLECTION "' + name + b'"'), 1)
+        self.assertEqual(self.executed(b'DROP DOCUMENT "' + doc + b'"'), 1)
+        # enabled again, the session keeps its collection name
+        conn.useTemporaryCollection()
+        self.assertEqual(conn.temporaryCollection().encode('ascii'), name)
+
+if __name__ == '__main__':
+    unittest.main()
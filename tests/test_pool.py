@@ -0,0 +1,163 @@
+##############################################################################
+## File:  test_pool.py
+##
+## Apache License 2.0
+##
+## Tests of SednaConnectionPool: checkout, eviction, reset and mapQuery.
+##############################################################################
+
+import re
+import time
+import threading
+import unittest
+
+from support import SednaTestCase, fakelibsedna, sedna
+
+class PoolTest(SednaTestCase):
+
+    def pool(self, **kwargs):
+        return sedna.SednaConnectionPool('localhost', 'test', **kwargs)
+
+    def testReusesIdleSession(self):
+        pool = self.pool()
+        conn = pool.getConnection()
+        pool.putConnection(conn)
+        self.assertTrue(pool.getConnection() is conn)
+        self.assertEqual(pool.size(), 1)
+
+    def testTimeoutWhenExhausted(self):
+        pool = self.pool(maxSize=1)
+        pool.getConnection()
+        self.assertRaises(sedna.SednaException, pool.getConnection, 0.05)
+
+    def testWaitsForReturnedSession(self):
+        pool = self.pool(maxSize=1)
+        conn = pool.getConnection()
+        timer = threading.Timer(0.05, pool.putConnection, (conn,))
+        timer.start()
+        self.assertTrue(pool.getConnection(5) is conn)
+        timer.join()
+
+    def testReplacesBrokenSession(self):
+        pool = self.pool()
+        conn = pool.getConnection()
+        pool.putConnection(conn)
+        conn.sednaConnection.status = fakelibsedna.SEDNA_CONNECTION_FAILED
+        other = pool.getConnection()
+        self.assertFalse(other is conn)
+        self.assertEqual(pool.size(), 1)
+
+    def testFailedConnectFreesSlot(self):
+        pool = self.pool(maxSize=1)
+        fakelibsedna.fail('SEconnect')
+        self.assertRaises(sedna.SednaException, pool.getConnection)
+        self.assertEqual(pool.size(), 0)
+        pool.getConnection(0.05)
+
+    def testEvictsIdleSessions(self):
+        pool = self.pool(minSize=1, maxIdle=0.01)
+        kept = pool.getConnection()
+        extra = pool.getConnection()
+        pool.putConnection(kept)
+        pool.putConnection(extra)
+        time.sleep(0.05)
+        # the least recently used session is closed, down to minSize
+        self.assertTrue(pool.getConnection() is extra)
+        self.assertEqual(pool.size(), 1)
+        self.assertEqual(kept.status(), 'closed')
+        pool.putConnection(extra)
+        time.sleep(0.05)
+        self.assertTrue(pool.getConnection() is extra)
+
+    def testResetOnReturn(self):
+        pool = self.pool()
+        conn = pool.getConnection()
+        conn.beginTransaction()
+        conn.loadModule('m', 'urn:m')
+        pool.putConnection(conn)
+        self.assertEqual(conn.transactionStatus(), 'none')
+        self.assertTrue(pool.getConnection() is conn)
+        conn.execute('1')
+        self.assertEqual(self.executed(b'urn:m'), 0)
+
+    def testDiscardsLostSession(self):
+        pool = self.pool()
+        conn = pool.getConnection()
+        conn.sednaConnection.status = fakelibsedna.SEDNA_CONNECTION_FAILED
+        pool.putConnection(conn)
+        self.assertEqual(pool.size(), 0)
+        self.assertEqual(pool.idle(), 0)
+
+    def testClose(self):
+        pool = self.pool(minSize=2)
+        conn = pool.getConnection()
+        pool.close()
+        self.assertEqual(pool.size(), 1)
+        self.assertRaises(sedna.SednaException, pool.getConnection)
+        pool.putConnection(conn)
+        self.assertEqual(pool.size(), 0)
+        self.assertEqual(conn.status(), 'closed')
+
+    def testTransaction(self):
+        pool = self.pool()
+        with pool.transaction() as conn:
+            conn.execute('UPDATE insert <a/> into doc("d")')
+            self.assertEqual(conn.transactionStatus(), 'active')
+        self.assertEqual(conn.transactionStatus(), 'none')
+        self.assertEqual(pool.idle(), 1)
+
+class MapQueryTest(SednaTestCase):
+
+    def setUp(self):
+        SednaTestCase.setUp(self)
+        def results(query):
+            shard = int(re.search(br'shard\((\d+)\)', query).group(1))
+            return [str(shard * 10 + i).encode('ascii') for i in range(3)]
+        fakelibsedna.results = results
+        self.pool = sedna.SednaConnectionPool('localhost', 'test', maxSize=3)
+
+    def params(self, n):
+        return [{'n': i} for i in range(n)]
+
+    def testOrdered(self):
+        pairs = list(self.pool.mapQuery('shard(%(n)s)', self.params(5), maxItems=1))
+        self.assertEqual([index for (index, item) in pairs], [i // 3 for i in range(15)])
+        self.assertEqual([int(item) for (index, item) in pairs],
+                         [shard * 10 + i for shard in range(5) for i in range(3)])
+
+    def testUnordered(self):
+        pairs = list(self.pool.mapQuery('shard(%(n)s)', self.params(5), ordered=False))
+        self.assertEqual(sorted(int(item) for (index, item) in pairs),
+                         [shard * 10 + i for shard in range(5) for i in range(3)])
+        for (index, item) in pairs:
+            self.assertEqual(int(item) // 10, index)
+
+    def testReadOnlyTransactions(self):
+        list(self.pool.mapQuery('shard(%(n)s)', self.params(2)))
+        self.waitForSessions()
+        conn = self.pool.getConnection()
+        attributes = conn.sednaConnection.attributes
+        self.assertEqual(attributes[fakelibsedna.SEDNA_ATTR_CONCURRENCY_TYPE], fakelibsedna.SEDNA_READONLY_TRANSACTION)
+
+    def testErrorStopsIteration(self):
+        for ordered in [True, False]:
+            fakelibsedna.fail('SEexecute', b'bad shard', match=b'shard(2)')
+            results = self.pool.mapQuery('shard(%(n)s)', self.params(4), ordered=ordered)
+            self.assertRaises(sedna.SednaQueryException, list, results)
+        self.waitForSessions()
+        self.assertEqual(self.pool.idle(), self.pool.size())
+
+    def testClosingReturnsSessions(self):
+        results = self.pool.mapQuery('shard(%(n)s)', self.params(10), maxItems=1)
+        next(results)
+        results.close()
+        self.waitForSessions()
+        self.assertEqual(self.pool.idle(), self.pool.size())
+
+    def waitForSessions(self):
+        deadline = time.time() + 5
+        while self.pool.idle() < self.pool.size() and time.time() < deadline:
+            time.sleep(0.01)
+
+if __name__ == '__main__':
+    unittest.main()
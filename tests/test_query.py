@@ -0,0 +1,105 @@
+##############################################################################
+## File:  test_query.py
+##
+## Apache License 2.0
+##
+## Tests of the query text sent to the server: escaping, bound variables
+## and prepared statements.
+##############################################################################
+
+import unittest
+
+try:
+    import _sednaspeedups
+except ImportError:
+    _sednaspeedups = None
+
+from support import SednaTestCase, fakelibsedna, sedna
+
+class BindingTest(SednaTestCase):
+
+    def prologue(self, **variables):
+        self.connect().executeBound('$x', variables)
+        return fakelibsedna.queries[-1][:-2].decode('utf-8')
+
+    def testDoubles(self):
+        self.assertEqual(self.prologue(x=1.5), 'declare variable $x as xs:double := 1.5e0;\n')
+        self.assertEqual(self.prologue(x=-2.0), 'declare variable $x as xs:double := -2.0e0;\n')
+        self.assertEqual(self.prologue(x=1e100), 'declare variable $x as xs:double := 1e+100;\n')
+        self.assertEqual(self.prologue(x=float('nan')), 'declare variable $x as xs:double := xs:double("NaN");\n')
+        self.assertEqual(self.prologue(x=[0.5, 2.0]), 'declare variable $x as xs:double* := (0.5e0, 2.0e0);\n')
+
+    def testOtherTypes(self):
+        self.assertEqual(self.prologue(x=True), 'declare variable $x as xs:boolean := fn:true();\n')
+        self.assertEqual(self.prologue(x=3), 'declare variable $x as xs:integer := 3;\n')
+        self.assertEqual(self.prologue(x=u'a"&b'), 'declare variable $x as xs:string := "a""&amp;b";\n')
+        self.assertEqual(self.prologue(x=None), 'declare variable $x as empty-sequence() := ();\n')
+        self.assertEqual(self.prologue(x=[1, 'a']), 'declare variable $x as item()* := (1, "a");\n')
+        self.assertEqual(self.prologue(x=[[1, 2], (3,), []]), 'declare variable $x as xs:integer* := ((1, 2), (3));\n')
+        self.assertEqual(self.prologue(x=[[1.5], ['a', None]]), 'declare variable $x as item()* := ((1.5e0), ("a"));\n')
+
+    def testInvalidName(self):
+        self.assertRaises(sedna.SednaException, self.prologue, **{'x y': 1})
+
+class EscapingTest(SednaTestCase):
+
+    def testArguments(self):
+        self.connect().execute('doc(%(name)s)', name=u'<"a">')
+        self.assertEqual(fakelibsedna.queries[-1], b'doc(&lt;&quot;a&quot;&gt;)')
+
+    @unittest.skipIf(_sednaspeedups == None, "_sednaspeedups is not built")
+    def testSpeedups(self):
+        cases = [
+            (b'', b'', {}),
+            (b'declare boundary-space strip;\n', b'%(x)s, %% %(y)s%(x)s', {'x': u'<\u0434>', 'y': 3}),
+            (b'', b'%(x)r', {'x': 'a'}),
+            (b'', b'%(a(b)c)s', {'a(b)c': '&'}),
+        ]
+        for case in cases:
+            self.assertEqual(_sednaspeedups.assemble(*case), sedna._pyAssemble(*case))
+        for query in [b'%(missing)s', b'100%', b'%(x']:
+            self.assertRaises((KeyError, ValueError), _sednaspeedups.assemble, b'', query, {'x': 1})
+
+class StatementTest(SednaTestCase):
+
+    def setUp(self):
+        SednaTestCase.setUp(self)
+        self.conn = self.connect()
+
+    def testTextCached(self):
+        statement = self.conn.prepare('doc("d")//a')
+        text = statement.text()
+        self.assertEqual(text, b'doc("d")//a')
+        self.assertTrue(statement.text() is text)
+        statement.execute()
+        self.assertEqual(fakelibsedna.queries, [b'doc("d")//a'])
+
+    def testArguments(self):
+        statement = self.conn.prepare('doc(%(name)s)//a')
+        statement.execute(name='<d>')
+        statement.execute(name='e')
+        self.assertEqual(fakelibsedna.queries, [b'doc(&lt;d&gt;)//a', b'doc(e)//a'])
+
+    def testPrologueRebuiltAfterLoadModule(self):
+        statement = self.conn.prepare('m:f()')
+        text = statement.text()
+        self.conn.loadModule('m', 'http://example.com/m')
+        self.assertEqual(statement.text(), b"import module namespace m = 'http://example.com/m';\nm:f()")
+        self.assertFalse(statement.text() is text)
+        self.conn.unLoadModule('m')
+        self.assertEqual(statement.text(), b'm:f()')
+
+    def testPrologueRebuiltAfterRegisterModule(self):
+        statement = self.conn.prepare('n:f()')
+        statement.text()
+        self.conn.metadata.registerModule('n', 'http://example.com/n')
+        self.assertEqual(statement.text(), b"import module namespace n = 'http://example.com/n';\nn:f()")
+
+    def testExecuteBound(self):
+        self.conn.loadModule('m', 'http://example.com/m')
+        self.conn.prepare('m:f($x)').executeBound({'x': 1})
+        self.assertEqual(fakelibsedna.queries[-1], b"import module namespace m = 'http://example.com/m';\n"
+                                                   b"declare variable $x as xs:integer := 1;\nm:f($x)")
+
+if __name__ == '__main__':
+    unittest.main()
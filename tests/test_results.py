@@ -0,0 +1,123 @@
+##############################################################################
+## File:  test_results.py
+##
+## Apache License 2.0
+##
+## Tests of retrieving results: item streams returned by iterItems and
+## items parsed by SednaConnectionXMLProccessor.
+##############################################################################
+
+import unittest
+
+from support import SednaTestCase, fakelibsedna, sedna
+
+class ItemStreamTest(SednaTestCase):
+
+    items = [b'<a>' + b'x' * 20 + b'</a>', b'second item', b'', b'last']
+
+    def setUp(self):
+        SednaTestCase.setUp(self)
+        fakelibsedna.results = lambda query: self.items
+        self.conn = self.connect(instrument=True)
+        self.conn.execute('doc("d")//a')
+
+    def testChunks(self):
+        chunks = [list(item) for item in self.conn.iterItems(bufferSize=8)]
+        self.assertEqual([b''.join(item) for item in chunks], self.items)
+        self.assertEqual([len(chunk) for chunk in chunks[0]], [8, 8, 8, 3])
+        self.assertEqual(chunks[2], [])
+
+    def testSkippedItems(self):
+        texts = []
+        for (i, item) in enumerate(self.conn.iterItems(bufferSize=8)):
+            if i == 0:
+                self.assertEqual(item.read(3), b'<a>')
+            elif i == 3:
+                texts.append(item.read())
+        self.assertEqual(texts, [b'last'])
+        self.assertEqual(self.conn.stats()['items'], 4)
+
+    def testRead(self):
+        item = next(self.conn.iterItems(bufferSize=8))
+        self.assertEqual(item.read(5), b'<a>xx')
+        self.assertEqual(item.read(10), b'x' * 10)
+        self.assertEqual(item.read(), b'x' * 8 + b'</a>')
+        self.assertEqual(item.read(), b'')
+        self.assertEqual(item.read(1), b'')
+
+    def testReadinto(self):
+        item = next(self.conn.iterItems(bufferSize=8))
+        self.assertEqual(item.read(2), b'<a')
+        buf = bytearray(16)
+        # what read() left pending comes first
+        self.assertEqual(item.readinto(buf), 6)
+        self.assertEqual(bytes(buf[:6]), b'>xxxxx')
+        data = []
+        while True:
+            n = item.readinto(buf)
+            if n == 0:
+                break
+            data.append(bytes(buf[:n]))
+        self.assertEqual(b''.join(data), b'x' * 15 + b'</a>')
+        self.assertEqual(item.readinto(buf), 0)
+
+    def testClose(self):
+        items = self.conn.iterItems(bufferSize=8)
+        item = next(items)
+        item.read(4)
+        item.close()
+        self.assertTrue(item.closed)
+        self.assertEqual(item.read(), b'')
+        self.assertEqual(next(items).read(), b'second item')
+
+class XMLProccessorTest(SednaTestCase):
+
+    items = [b'<a x="1"><b>t\xc3\xa9</b><b/></a>', b'42', b'-1.5e3', b' text ', b' ' * 10 + b'<c/>']
+
+    def setUp(self):
+        SednaTestCase.setUp(self)
+        fakelibsedna.results = lambda query: self.items
+        self.conn = self.connect()
+
+    def results(self, proccessor, bufferSize=4096):
+        self.conn.execute('doc("d")//a')
+        return list(self.conn.resultSequence(proccessor=proccessor, bufferSize=bufferSize))
+
+    def check(self, results):
+        self.assertEqual(results[0].tag, 'a')
+        self.assertEqual(results[0].get('x'), '1')
+        self.assertEqual([b.text for b in results[0]], [u't\xe9', None])
+        self.assertEqual(results[1:4], [42, -1500.0, ' text '])
+        self.assertEqual(results[4].tag, 'c')
+
+    def testDecoding(self):
+        self.check(self.results(sedna.SednaConnectionXMLProccessor()))
+
+    def testSmallChunks(self):
+        # the last item starts with chunks holding nothing but whitespace
+        self.check(self.results(sedna.SednaConnectionXMLProccessor(), bufferSize=4))
+
+    def testWhitespaceItem(self):
+        self.items = [b' ' * 10]
+        self.assertEqual(self.results(sedna.SednaConnectionXMLProccessor(), bufferSize=4), [' ' * 10])
+
+    def testTarget(self):
+        class Target:
+            def __init__(self):
+                self.events = []
+            def start(self, tag, attrib):
+                self.events.append(tag)
+            def end(self, tag):
+                pass
+            def data(self, data):
+                pass
+            def close(self):
+                events = self.events
+                self.events = []
+                return events
+        results = self.results(sedna.SednaConnectionXMLProccessor(Target()), bufferSize=4)
+        self.assertEqual(results[0], ['a', 'b', 'b'])
+        self.assertEqual(results[4], ['c'])
+
+if __name__ == '__main__':
+    unittest.main()
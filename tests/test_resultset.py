@@ -0,0 +1,73 @@
+##############################################################################
+## File:  test_resultset.py
+##
+## Apache License 2.0
+##
+## Tests of SednaResultSet: limits pushed into the query, the client side
+## fallback for queries with a prologue, and closing an iteration.
+##############################################################################
+
+import unittest
+
+from support import SednaTestCase, fakelibsedna, sedna
+
+class ResultSetTest(SednaTestCase):
+
+    items = [str(i).encode('ascii') for i in range(1, 11)]
+
+    def setUp(self):
+        SednaTestCase.setUp(self)
+        fakelibsedna.results = self.results
+        self.conn = self.connect()
+
+    def results(self, query):
+        if query.startswith(b'count('):
+            return [str(len(self.items)).encode('ascii')]
+        if query.startswith(b'subsequence('):
+            return self.items[2:5]
+        return self.items
+
+    def testPushedDown(self):
+        results = self.conn.query('doc(%(name)s)//a', name='<d>')
+        self.assertEqual(results.page(2, 3), [b'3', b'4', b'5'])
+        self.assertEqual(fakelibsedna.queries[-1], b'subsequence((doc(&lt;d&gt;)//a), 3, 3)')
+        self.assertEqual(results.count(), 10)
+        self.assertEqual(fakelibsedna.queries[-1], b'count((doc(&lt;d&gt;)//a))')
+        self.assertEqual(results.take(0), [])
+        self.assertEqual(len(fakelibsedna.queries), 2)
+
+    def testFirst(self):
+        self.assertEqual(self.conn.query('doc("d")//a').first(), b'3')
+        self.assertEqual(fakelibsedna.queries[-1], b'subsequence((doc("d")//a), 1, 1)')
+        self.items = []
+        self.assertEqual(self.conn.query('doc("d")//a').first(), None)
+
+    def testPrologueCutOnClient(self):
+        query = 'declare variable $n := 10;\n1 to $n'
+        results = self.conn.query(query)
+        self.assertEqual(results.page(2, 3), [b'3', b'4', b'5'])
+        self.assertEqual(results.count(), 10)
+        self.assertEqual(fakelibsedna.queries, [query.encode('ascii')] * 2)
+
+    def testModulePrologueNotWrapped(self):
+        self.conn.metadata.registerModule('m', 'http://example.com/m')
+        self.conn.query('m:f()').page(2, 3)
+        query = fakelibsedna.queries[-1]
+        self.assertTrue(query.startswith(b'import module namespace m'))
+        self.assertTrue(query.endswith(b'subsequence((m:f()), 3, 3)'))
+
+    def testIterate(self):
+        self.assertEqual(list(self.conn.query('doc("d")//a')), self.items)
+        self.assertEqual(fakelibsedna.queries[-1], b'doc("d")//a')
+
+    def testCloseStopsIteration(self):
+        results = self.conn.query('doc("d")//a')
+        items = iter(results)
+        self.assertEqual(next(items), b'1')
+        results.close()
+        self.assertRaises(StopIteration, next, items)
+        # the connection is free for the next query
+        self.assertEqual(self.conn.query('doc("e")//a').count(), 10)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+##############################################################################
+## File:  test_stats.py
+##
+## Apache License 2.0
+##
+## Tests of the instrumentation: histograms and pool statistics.
+##############################################################################
+
+import sys
+import threading
+import unittest
+
+from support import SednaTestCase, fakelibsedna, sedna
+
+class HistogramTest(SednaTestCase):
+
+    def testBuckets(self):
+        histogram = sedna.SednaHistogram()
+        for seconds in [0.0005, 0.003, 0.003, 0.1]:
+            histogram.add(seconds)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['count'], 4)
+        self.assertEqual(snapshot['max'], 0.1)
+        self.assertEqual(histogram.buckets, {1: 1, 4: 2, 128: 1})
+
+    def testMergeWhileRecording(self):
+        histogram = sedna.SednaHistogram()
+        stop = threading.Event()
+        def record():
+            seconds = 1e-6
+            while not stop.is_set():
+                histogram.add(seconds)
+                seconds *= 2
+                if seconds > 1e6:
+                    histogram.buckets.clear()
+                    seconds = 1e-6
+        thread = threading.Thread(target=record)
+        interval = getattr(sys, 'getswitchinterval', None) and sys.getswitchinterval()
+        if interval:
+            sys.setswitchinterval(1e-6) # switch threads as often as possible
+        thread.start()
+        try:
+            for i in range(20000):
+                sedna.SednaHistogram().merge(histogram)
+        finally:
+            stop.set()
+            thread.join()
+            if interval:
+                sys.setswitchinterval(interval)
+
+class PoolStatsTest(SednaTestCase):
+
+    def testAggregated(self):
+        pool = sedna.SednaConnectionPool('localhost', 'test', instrument=True)
+        with pool.transaction() as conn:
+            conn.execute('1')
+        with pool.connection() as first:
+            with pool.connection() as second:
+                second.execute('2')
+        pool.putConnection(pool.getConnection(), discard=True)
+        stats = pool.stats()
+        self.assertEqual(stats['execute']['count'], 2)
+        self.assertEqual(stats['commit']['count'], 1)
+        self.assertEqual(stats['connect']['count'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+##############################################################################
+## File:  test_transaction.py
+##
+## Apache License 2.0
+##
+## Tests of transaction nesting and of retrying transient failures.
+##############################################################################
+
+import unittest
+
+from support import SednaTestCase, fakelibsedna, sedna
+
+class TransactionTest(SednaTestCase):
+
+    def setUp(self):
+        SednaTestCase.setUp(self)
+        self.conn = self.connect(instrument=True)
+
+    def count(self, timer):
+        return self.conn.stats()[timer]['count']
+
+    def testCommit(self):
+        with self.conn.transaction() as conn:
+            self.assertTrue(conn is self.conn)
+            self.assertEqual(conn.transactionStatus(), 'active')
+        self.assertEqual(self.conn.transactionStatus(), 'none')
+        self.assertEqual((self.count('begin'), self.count('commit')), (1, 1))
+
+    def testRollbackOnError(self):
+        def run():
+            with self.conn.transaction():
+                raise ValueError()
+        self.assertRaises(ValueError, run)
+        self.assertEqual(self.conn.transactionStatus(), 'none')
+        self.assertEqual((self.count('commit'), self.count('rollback')), (0, 1))
+
+    def testNestedJoinsOuter(self):
+        with self.conn.transaction():
+            with self.conn.transaction():
+                with self.conn.transaction(readonly=True):
+                    pass
+            self.assertEqual(self.conn.transactionStatus(), 'active')
+        self.assertEqual((self.count('begin'), self.count('commit')), (1, 1))
+
+    def testNestedErrorLeftToOuter(self):
+        with self.conn.transaction():
+            try:
+                with self.conn.transaction():
+                    raise ValueError()
+            except ValueError:
+                pass
+            self.assertEqual(self.conn.transactionStatus(), 'active')
+        self.assertEqual((self.count('commit'), self.count('rollback')), (1, 0))
+
+    def testReadOnlyModeSentOnChange(self):
+        attributes = self.conn.sednaConnection.attributes
+        with self.conn.transaction(readonly=True):
+            self.assertEqual(attributes[fakelibsedna.SEDNA_ATTR_CONCURRENCY_TYPE], fakelibsedna.SEDNA_READONLY_TRANSACTION)
+        del attributes[fakelibsedna.SEDNA_ATTR_CONCURRENCY_TYPE]
+        with self.conn.transaction(readonly=True):
+            self.assertFalse(fakelibsedna.SEDNA_ATTR_CONCURRENCY_TYPE in attributes)
+        with self.conn.transaction():
+            self.assertEqual(attributes[fakelibsedna.SEDNA_ATTR_CONCURRENCY_TYPE], fakelibsedna.SEDNA_UPDATE_TRANSACTION)
+
+    def testUpdateJoinsTransaction(self):
+        with self.conn.transaction():
+            self.conn.update('UPDATE delete doc("d")/a')
+            self.assertEqual(self.conn.transactionStatus(), 'active')
+        self.assertEqual(self.count('commit'), 1)
+
+class RetryTest(SednaTestCase):
+
+    policy = sedna.SednaRetryPolicy(initialDelay=0.0)
+
+    def setUp(self):
+        SednaTestCase.setUp(self)
+        self.conn = self.connect()
+        self.calls = 0
+
+    def work(self, conn):
+        self.calls += 1
+        conn.execute('UPDATE delete doc("d")/a')
+        return self.calls
+
+    def testLostSessionRetried(self):
+        fakelibsedna.fail('SEexecute', b'connection lost', lost=True)
+        session = self.conn.sednaConnection
+        self.assertEqual(self.conn.runTransaction(self.work, self.policy), 2)
+        self.assertFalse(self.conn.sednaConnection is session)
+        self.assertEqual(self.conn.status(), 'ok')
+
+    def testQueryErrorNotRetried(self):
+        fakelibsedna.fail('SEexecute', b'syntax error', rollback=True)
+        self.assertRaises(sedna.SednaQueryException, self.conn.runTransaction, self.work, self.policy)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.conn.transactionStatus(), 'none')
+
+    def testTransientCodeRetried(self):
+        fakelibsedna.fail('SEcommit', b'deadlock', code=42, rollback=True)
+        policy = sedna.SednaRetryPolicy(initialDelay=0.0, transientCodes=[42])
+        self.assertEqual(self.conn.runTransaction(self.work, policy), 2)
+
+    def testGivesUp(self):
+        fakelibsedna.fail('SEexecute', b'connection lost', lost=True, times=3)
+        policy = sedna.SednaRetryPolicy(maxAttempts=3, initialDelay=0.0)
+        self.assertRaises(sedna.SednaConnectionException, self.conn.runTransaction, self.work, policy)
+        self.assertEqual(self.calls, 3)
+
+    def testRefusedLoginNotRetried(self):
+        fakelibsedna.fail('SEexecute', b'connection lost', lost=True)
+        fakelibsedna.fail('SEconnect', b'authentication failed', status=fakelibsedna.SEDNA_AUTHENTICATION_FAILED)
+        self.assertRaises(sedna.SednaLoginException, self.conn.runTransaction, self.work, self.policy)
+        self.assertEqual(self.calls, 1)
+
+    def testRefusedLogin(self):
+        fakelibsedna.fail('SEconnect', b'authentication failed', status=fakelibsedna.SEDNA_AUTHENTICATION_FAILED)
+        try:
+            self.connect()
+            self.fail()
+        except sedna.SednaConnectionException as ex:
+            self.assertTrue(isinstance(ex, sedna.SednaLoginException))
+            self.assertFalse(self.policy.isTransient(ex))
+
+    def testPermanentCodeNotRetried(self):
+        fakelibsedna.fail('SEexecute', b'no such database', code=77, lost=True)
+        policy = sedna.SednaRetryPolicy(initialDelay=0.0, permanentCodes=[77])
+        self.assertRaises(sedna.SednaConnectionException, self.conn.runTransaction, self.work, policy)
+        self.assertEqual(self.calls, 1)
+
+    def testOtherErrorsNotRetried(self):
+        def work(conn):
+            self.calls += 1
+            raise KeyError()
+        self.assertRaises(KeyError, self.conn.runTransaction, work, self.policy)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.conn.transactionStatus(), 'none')
+
+    def testJoinsActiveTransaction(self):
+        with self.conn.transaction():
+            self.conn.execute('UPDATE insert <a/> into doc("d")')
+            self.assertEqual(self.conn.runTransaction(self.work, self.policy), 1)
+            self.assertEqual(self.conn.transactionStatus(), 'active')
+        self.assertEqual(self.executed(b'UPDATE'), 2)
+        self.assertEqual(self.conn.transactionStatus(), 'none')
+
+    def testErrorInActiveTransactionLeftToCaller(self):
+        fakelibsedna.fail('SEexecute', b'connection lost', lost=True, match=b'delete')
+        self.conn.beginTransaction()
+        self.assertRaises(sedna.SednaConnectionException, self.conn.runTransaction, self.work, self.policy)
+        self.assertEqual(self.calls, 1)
+
+    def testPool(self):
+        pool = sedna.SednaConnectionPool('localhost', 'test')
+        fakelibsedna.fail('SEexecute', b'connection lost', lost=True)
+        self.assertEqual(pool.runTransaction(self.work, self.policy), 2)
+        self.assertEqual(pool.idle(), 1)
+
+    def testDelay(self):
+        policy = sedna.SednaRetryPolicy(initialDelay=1.0, maxDelay=3.0)
+        for (attempt, bound) in [(1, 1.0), (2, 2.0), (3, 3.0), (10, 3.0)]:
+            delay = policy.delay(attempt)
+            self.assertTrue(bound / 2 <= delay <= bound)
+
+if __name__ == '__main__':
+    unittest.main()